@@ -0,0 +1,227 @@
+"""
+Data and render path benchmark.
+
+Seeds an in-memory Firestore (benchmarks/fake_firestore.py) with a realistic
+dataset and times the functions behind the home page and the journal pages:
+get_all_journals, get_user_profiles_by_ids, fetch_all_journal_places,
+create_timeline, display_all_journals and _sanitize_for_json.
+
+Datasets: "small" is 1k journals by 1k authors, "large" is 10k journals by 5k
+authors; both include long trips of 50 days with 500 places. Data functions
+are timed with their caches cleared before every run, render functions with
+warm data caches. The fake store has no network latency, so the numbers
+measure the app's own work per call.
+
+Results are written as JSON with the commit they were measured on; pass an
+earlier result file to --compare to flag regressions.
+
+Usage (from the ApaPlan_OJT directory):
+    python benchmarks/bench_data_paths.py
+    python benchmarks/bench_data_paths.py --dataset large --json bench-large.json
+    python benchmarks/bench_data_paths.py --compare bench-main.json --threshold 15
+"""
+import argparse
+import inspect
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fake_firestore
+from datasets import DATASETS, seed_dataset
+
+from dash import Dash
+from src.shared import journal_utils
+from src.components.timeline import create_timeline
+from src.pages.home_page import register_home_callbacks
+
+
+def time_runs(func, repeat, setup=None, warmup=1):
+    """Calls func `repeat` times (after `warmup` untimed calls); returns ms per call."""
+    for _ in range(warmup):
+        if setup:
+            setup()
+        func()
+    timings = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def summarize(timings):
+    timings = sorted(timings)
+    return {
+        "runs": len(timings),
+        "median_ms": round(statistics.median(timings), 3),
+        "min_ms": round(timings[0], 3),
+        "max_ms": round(timings[-1], 3),
+    }
+
+
+def get_callback(app, output):
+    """Returns the undecorated function of the callback writing `output`."""
+    for key, entry in app.callback_map.items():
+        if output in key:
+            return inspect.unwrap(entry["callback"])
+    raise KeyError(output)
+
+
+def clear_caches():
+    journal_utils.discover_cache.clear()
+    journal_utils.user_profile_cache.clear()
+    journal_utils.journal_places_cache.clear()
+    journal_utils.place_cache.clear()
+
+
+def run_benchmarks(dataset, repeat, seed):
+    db = fake_firestore.install(modules=[journal_utils])
+    started = time.perf_counter()
+    ids = seed_dataset(db, seed=seed, **DATASETS[dataset])
+    seed_s = time.perf_counter() - started
+
+    trip_id = ids["trip_ids"][0]
+    trip = journal_utils.get_journal(trip_id)
+    public_journals = journal_utils.get_all_journals()
+    author_ids = [journal.get("user_id") for journal in public_journals]
+    trip_places = journal_utils.fetch_all_journal_places(trip_id)
+
+    app = Dash(__name__)
+    register_home_callbacks(app)
+    display_all_journals = get_callback(app, "all-journal-list-container.children")
+    user_info = {"uid": ids["user_ids"][0]}
+
+    def warm_caches():
+        journal_utils.get_all_journals()
+        journal_utils.get_user_profiles_by_ids(author_ids)
+
+    cases = {
+        "get_all_journals": (
+            journal_utils.get_all_journals,
+            journal_utils.discover_cache.clear,
+        ),
+        "get_all_journals_cached": (journal_utils.get_all_journals, None),
+        "get_user_profiles_by_ids": (
+            lambda: journal_utils.get_user_profiles_by_ids(author_ids),
+            journal_utils.user_profile_cache.clear,
+        ),
+        "fetch_all_journal_places": (
+            lambda: journal_utils.fetch_all_journal_places(trip_id),
+            clear_caches,
+        ),
+        # New revision of a journal whose places are already in place_cache
+        "fetch_all_journal_places_new_revision": (
+            lambda: journal_utils.fetch_all_journal_places(trip_id),
+            journal_utils.journal_places_cache.clear,
+        ),
+        "create_timeline": (
+            lambda: create_timeline(trip["start_date"], trip["days"], trip_places, is_editable=True),
+            None,
+        ),
+        "display_all_journals": (
+            lambda: display_all_journals(user_info, None),
+            warm_caches,
+        ),
+        "_sanitize_for_json": (
+            lambda: journal_utils._sanitize_for_json({**trip, "journalPlaces": trip_places}),
+            None,
+        ),
+    }
+
+    results = {}
+    for name, (func, setup) in cases.items():
+        clear_caches()
+        results[name] = summarize(time_runs(func, repeat, setup=setup))
+
+    return {
+        "dataset": dataset,
+        "documents": len(db),
+        "public_journals": len(public_journals),
+        "authors": len(set(author_ids)),
+        "trip_places": len(trip_places),
+        "seed_seconds": round(seed_s, 2),
+        "results": results,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=PROJECT_ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline, threshold):
+    """Prints the change against a baseline; returns the names that regressed."""
+    regressions = []
+    if baseline.get("dataset") != current["dataset"]:
+        print(f"\nNot comparing: baseline is the {baseline.get('dataset')!r} dataset.")
+        return regressions
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'} (threshold {threshold}%):")
+    for name, result in current["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if not before:
+            continue
+        change = (result["median_ms"] - before["median_ms"]) / max(before["median_ms"], 1e-6) * 100
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"  {name:<28} {before['median_ms']:>10.2f} -> {result['median_ms']:>10.2f} ms ({change:+.1f}%){flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dataset", choices=sorted(DATASETS), default="small")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--compare", help="Earlier result file to compare against")
+    parser.add_argument("--threshold", type=float, default=20.0,
+                        help="Slowdown in percent that counts as a regression")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.dataset, args.repeat, args.seed)
+    report.update({
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "measured_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    })
+
+    print(
+        f"dataset={report['dataset']} documents={report['documents']} "
+        f"public_journals={report['public_journals']} authors={report['authors']} "
+        f"trip_places={report['trip_places']}"
+    )
+    print(f"{'benchmark':<28} {'median ms':>10} {'min ms':>10} {'max ms':>10}")
+    for name, result in report["results"].items():
+        print(f"{name:<28} {result['median_ms']:>10.2f} {result['min_ms']:>10.2f} {result['max_ms']:>10.2f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Itinerary optimizer benchmark.
+
+Times the distance matrix, nearest-neighbour construction and 2-opt
+improvement on random stops spread over a city-sized area, for 10, 100 and
+500 stops, and reports how much shorter the optimized route is than the
+insertion order.
+
+Usage (from the ApaPlan_OJT directory):
+    python benchmarks/bench_itinerary.py
+    python benchmarks/bench_itinerary.py --sizes 10 100 500 1000 --repeat 5 --json itinerary.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from src.shared.itinerary import (
+    distance_matrix,
+    nearest_neighbour_route,
+    two_opt,
+    route_length,
+)
+
+
+def time_call(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def bench_size(n, repeat, seed):
+    rng = np.random.default_rng(seed)
+    timings = {"matrix_ms": [], "nearest_neighbour_ms": [], "two_opt_ms": []}
+    ratios = []
+    for _ in range(repeat):
+        # Roughly a 30 km x 30 km area around Kuala Lumpur
+        lats = 3.0 + rng.random(n) * 0.27
+        lngs = 101.55 + rng.random(n) * 0.27
+        dist, matrix_ms = time_call(distance_matrix, lats, lngs)
+        route, nn_ms = time_call(nearest_neighbour_route, dist)
+        route, opt_ms = time_call(two_opt, route, dist)
+        timings["matrix_ms"].append(matrix_ms)
+        timings["nearest_neighbour_ms"].append(nn_ms)
+        timings["two_opt_ms"].append(opt_ms)
+        ratios.append(route_length(route, dist) / route_length(range(n), dist))
+
+    result = {"stops": n}
+    for name, values in timings.items():
+        result[name] = round(statistics.median(values), 3)
+    result["total_ms"] = round(
+        result["matrix_ms"] + result["nearest_neighbour_ms"] + result["two_opt_ms"], 3
+    )
+    result["length_vs_insertion_order"] = round(statistics.median(ratios), 3)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    results = [bench_size(n, args.repeat, args.seed) for n in args.sizes]
+
+    header = f"{'stops':>6} {'matrix ms':>10} {'nn ms':>8} {'2-opt ms':>9} {'total ms':>9} {'length':>7}"
+    print(header)
+    for r in results:
+        print(
+            f"{r['stops']:>6} {r['matrix_ms']:>10.2f} {r['nearest_neighbour_ms']:>8.2f} "
+            f"{r['two_opt_ms']:>9.2f} {r['total_ms']:>9.2f} {r['length_vs_insertion_order']:>7.2f}"
+        )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
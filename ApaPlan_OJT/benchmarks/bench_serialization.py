@@ -0,0 +1,101 @@
+"""
+Serialization benchmark.
+
+Times the old recursive _sanitize_for_json against src/shared/serialization.py
+on a long trip (50 days, 500 places with their place details merged in, as
+fetch_all_journal_places returns them), with the journal document around it.
+The dispatch-table walk is always measured; the orjson path only when orjson
+is installed. Checks first that the outputs agree.
+
+Usage (from the ApaPlan_OJT directory):
+    python benchmarks/bench_serialization.py
+    python benchmarks/bench_serialization.py --places 2000 --repeat 50
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fake_firestore
+from datasets import TRIP_DAYS, seed_dataset, seed_trip
+
+from google.cloud.firestore_v1.document import DocumentReference
+from src.shared import journal_utils, serialization
+
+
+def legacy_sanitize_for_json(data):
+    """_sanitize_for_json as it was before serialization.py."""
+    if isinstance(data, dict):
+        return {k: legacy_sanitize_for_json(v) for k, v in data.items()}
+    elif isinstance(data, list):
+        return [legacy_sanitize_for_json(i) for i in data]
+    elif isinstance(data, DocumentReference):
+        return data.path
+    elif isinstance(data, datetime):
+        return data.isoformat()
+    return data
+
+
+def median_ms(func, data, repeat):
+    func(data)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(data)
+        timings.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(timings), 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--places", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    db = fake_firestore.install(modules=[journal_utils])
+    ids = seed_dataset(db, journals=1, authors=1, trips=0)
+    seed_trip(db, random.Random(1), "bench", ids["user_ids"][0], ids["place_ids"],
+              days=TRIP_DAYS, places=args.places)
+    journal = journal_utils.get_journal("bench")
+    # The legacy function only knows plain dicts, so compare on those
+    journal["journalPlaces"] = [
+        place.to_dict() for place in journal_utils.fetch_all_journal_places("bench")
+    ]
+
+    # GeoPoints were passed through by the old function; compare everything else
+    expected = legacy_sanitize_for_json(journal)
+    actual = serialization._walk(journal)
+    for place in expected["journalPlaces"]:
+        place.pop("coordinates", None)
+    for place in actual["journalPlaces"]:
+        place.pop("coordinates", None)
+    assert actual == expected, "serialization._walk disagrees with the old function"
+    if serialization.orjson is not None:
+        assert serialization.to_jsonable(journal) == serialization._walk(journal), \
+            "the orjson path disagrees with the dispatch walk"
+
+    results = {
+        "places": len(journal["journalPlaces"]),
+        "legacy_ms": median_ms(legacy_sanitize_for_json, journal, args.repeat),
+        "dispatch_walk_ms": median_ms(serialization._walk, journal, args.repeat),
+    }
+    if serialization.orjson is not None:
+        results["orjson_ms"] = median_ms(serialization.to_jsonable, journal, args.repeat)
+
+    for name, value in results.items():
+        print(f"{name:<18} {value}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
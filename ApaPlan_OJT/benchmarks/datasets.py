@@ -0,0 +1,177 @@
+"""
+Realistic, reproducible datasets for the benchmarks and the load test.
+
+seed_dataset() fills a FakeFirestore with users, a shared pool of places,
+journals spread over the users (about half of them public), and a few long
+trips with every place attached day by day.
+"""
+import random
+from datetime import datetime, timedelta, timezone
+
+from firebase_admin import firestore
+
+from src.shared.geo_index import encode_geohash
+from src.shared.ordering import evenly_spaced_keys
+
+# name: (journals, authors, long trips)
+DATASETS = {
+    "small": {"journals": 1_000, "authors": 1_000, "trips": 1},
+    "large": {"journals": 10_000, "authors": 5_000, "trips": 3},
+}
+TRIP_DAYS = 50
+TRIP_PLACES = 500
+PLACE_POOL = 3_000
+
+CITIES = [
+    ("Kuala Lumpur", "Malaysia", 3.139, 101.687),
+    ("George Town", "Malaysia", 5.414, 100.329),
+    ("Singapore", "Singapore", 1.352, 103.820),
+    ("Bangkok", "Thailand", 13.756, 100.502),
+    ("Tokyo", "Japan", 35.676, 139.650),
+    ("Seoul", "South Korea", 37.567, 126.978),
+]
+CATEGORIES = ["Food", "Museum", "Park", "Shopping", "Temple", "Beach", "Hotel"]
+WORDS = [
+    "hidden", "street", "food", "weekend", "family", "temple", "island",
+    "night", "market", "coffee", "heritage", "mountain", "budget", "road",
+]
+
+
+def _sentence(rng, n):
+    return " ".join(rng.choice(WORDS) for _ in range(n)).capitalize()
+
+
+def _seed_places(db, rng, count):
+    place_ids = []
+    batch = db.batch()
+    for i in range(count):
+        city, country, lat, lng = rng.choice(CITIES)
+        lat += rng.uniform(-0.15, 0.15)
+        lng += rng.uniform(-0.15, 0.15)
+        place_id = f"ChIJ{i:08d}"
+        batch.set(db.collection("places").document(place_id), {
+            "name": f"{_sentence(rng, 2)} {i}",
+            "address": f"{rng.randint(1, 200)} Jalan {rng.choice(WORDS).title()}, "
+                       f"{rng.randint(10000, 99999)} {city}, {country}",
+            "coordinates": firestore.GeoPoint(lat, lng),
+            "geohash": encode_geohash(lat, lng),
+            "google_place_id": place_id,
+            "rating": round(rng.uniform(3, 5), 1),
+            "user_ratings_total": rng.randint(10, 5000),
+            "types": [rng.choice(CATEGORIES).lower()],
+            "created_at": datetime(2024, 1, 1, tzinfo=timezone.utc),
+        })
+        place_ids.append(place_id)
+    batch.commit()
+    return place_ids
+
+
+def _empty_aggregates():
+    return {"place_count": 0, "per_day_counts": {}, "place_names": {}, "category_histogram": {}}
+
+
+def seed_trip(db, rng, journal_id, user_id, place_ids, days=TRIP_DAYS, places=TRIP_PLACES):
+    """Adds a long public trip with `places` places spread over `days` days."""
+    start = datetime(2024, 3, 1)
+    journal_ref = db.collection("travelJournals").document(journal_id)
+    aggregates = _empty_aggregates()
+    per_day = [places // days + (1 if d < places % days else 0) for d in range(days)]
+    batch = db.batch()
+    for day, count in enumerate(per_day):
+        date = (start + timedelta(days=day)).strftime("%Y-%m-%d")
+        for rank in evenly_spaced_keys(count):
+            place_id = rng.choice(place_ids)
+            place_ref = db.collection("places").document(place_id)
+            name = place_ref.get().to_dict()["name"]
+            category = [rng.choice(CATEGORIES)]
+            batch.set(journal_ref.collection("journalPlaces").document(), {
+                "placeRef": place_ref,
+                "rank": rank,
+                "place_id": place_id,
+                "name": name,
+                "date": date,
+                "description": _sentence(rng, 12),
+                "category": category,
+                "friendliness": [],
+            })
+            aggregates["place_count"] += 1
+            aggregates["per_day_counts"][date] = aggregates["per_day_counts"].get(date, 0) + 1
+            aggregates["place_names"][name] = aggregates["place_names"].get(name, 0) + 1
+            aggregates["category_histogram"][category[0]] = (
+                aggregates["category_histogram"].get(category[0], 0) + 1
+            )
+    batch.set(journal_ref, {
+        "user_id": user_id,
+        "title": f"{days} days across Asia",
+        "summary": _sentence(rng, 20),
+        "introduction": _sentence(rng, 40),
+        "status": "public",
+        "start_date": start.strftime("%Y-%m-%dT00:00:00"),
+        "days": days,
+        "nights": days - 1,
+        "total_cost": 12000,
+        "currency": "MYR",
+        "cover_image_url": None,
+        "created_at": datetime(2024, 2, 1, tzinfo=timezone.utc),
+        "revision": 1,
+        "aggregates": aggregates,
+    })
+    batch.commit()
+    return journal_id
+
+
+def seed_dataset(db, journals, authors, trips=1, seed=42):
+    """
+    Seeds users, places, journals and long trips.
+    Returns a dict of the ids the benchmarks need.
+    """
+    rng = random.Random(seed)
+    user_ids = [f"user{i:06d}" for i in range(authors)]
+    batch = db.batch()
+    for user_id in user_ids:
+        name = f"{rng.choice(WORDS).title()} {rng.choice(WORDS).title()}"
+        batch.set(db.collection("users").document(user_id), {
+            "email": f"{user_id}@example.com",
+            "username": user_id,
+            "display_name": name,
+            # Some authors have an avatar, the rest fall back to initials
+            "avatar_url": f"https://example.com/avatars/{user_id}.png" if rng.random() < 0.4 else "",
+        })
+    batch.commit()
+
+    place_ids = _seed_places(db, rng, PLACE_POOL)
+
+    journal_ids = []
+    batch = db.batch()
+    for i in range(journals - trips):
+        journal_id = f"journal{i:06d}"
+        days = rng.randint(1, 14)
+        aggregates = _empty_aggregates()
+        aggregates["place_count"] = rng.randint(0, days * 5)
+        batch.set(db.collection("travelJournals").document(journal_id), {
+            "user_id": rng.choice(user_ids),
+            "title": _sentence(rng, 4),
+            "summary": _sentence(rng, 20),
+            "introduction": _sentence(rng, 30),
+            "status": "public" if rng.random() < 0.5 else "draft",
+            "start_date": "2024-05-01T00:00:00",
+            "days": days,
+            "nights": days - 1,
+            "cover_image_url": None,
+            "created_at": datetime(2024, 4, 1, tzinfo=timezone.utc),
+            "revision": 0,
+            "aggregates": aggregates,
+        })
+        journal_ids.append(journal_id)
+    batch.commit()
+
+    trip_ids = [
+        seed_trip(db, rng, f"trip{i:03d}", rng.choice(user_ids), place_ids)
+        for i in range(trips)
+    ]
+    return {
+        "user_ids": user_ids,
+        "place_ids": place_ids,
+        "journal_ids": journal_ids,
+        "trip_ids": trip_ids,
+    }
@@ -0,0 +1,384 @@
+"""
+In-memory stand-in for the Firestore client, for benchmarks and load tests.
+
+Covers the subset of the API the app uses: collection and document
+references, where/order_by/limit/select queries, collection groups, get_all,
+batches, transactions and recursive_delete, and the Increment, DELETE_FIELD
+and SERVER_TIMESTAMP transforms. Document references are real
+DocumentReference subclasses, so isinstance checks and _sanitize_for_json
+behave as they do against Firestore.
+
+Like Firestore without composite indexes (none are deployed for this app),
+a query that filters on one field and orders by another fails with
+FailedPrecondition.
+
+install() points firebase_admin.firestore.client() at a FakeFirestore.
+"""
+import copy
+import functools
+import itertools
+import threading
+import uuid
+from datetime import datetime, timezone
+
+from firebase_admin import firestore
+from google.api_core.exceptions import FailedPrecondition
+from google.cloud.firestore_v1.document import DocumentReference
+from google.cloud.firestore_v1.field_path import FieldPath
+from google.cloud.firestore_v1.transforms import (
+    DELETE_FIELD,
+    SERVER_TIMESTAMP,
+    Increment,
+)
+
+_MISSING = object()
+
+
+def _split_field(field):
+    if isinstance(field, FieldPath):
+        return field.parts
+    return FieldPath.from_string(field).parts
+
+
+def _get_field(data, parts):
+    for part in parts:
+        if not isinstance(data, dict) or part not in data:
+            return _MISSING
+        data = data[part]
+    return data
+
+
+def _resolve(value):
+    if value is SERVER_TIMESTAMP:
+        return datetime.now(timezone.utc)
+    if isinstance(value, dict):
+        return {k: _resolve(v) for k, v in value.items()}
+    return value
+
+
+def _apply_update(data, updates):
+    for field, value in updates.items():
+        parts = _split_field(field)
+        target = data
+        for part in parts[:-1]:
+            target = target.setdefault(part, {})
+        if value is DELETE_FIELD:
+            target.pop(parts[-1], None)
+        elif isinstance(value, Increment):
+            target[parts[-1]] = target.get(parts[-1], 0) + value.value
+        else:
+            target[parts[-1]] = _resolve(value)
+
+
+class FakeSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        if self._data is None:
+            return None
+        # Firestore deserializes a fresh copy on every read
+        return copy.copy(self._data)
+
+    def get(self, field):
+        value = _get_field(self._data or {}, _split_field(field))
+        return None if value is _MISSING else value
+
+
+class FakeDocumentReference(DocumentReference):
+    def get(self, field_paths=None, transaction=None, **kwargs):
+        return FakeSnapshot(self, self._client._docs.get(self._path))
+
+    def set(self, document_data, merge=False):
+        with self._client._lock:
+            self._client._set(self._path, document_data, merge)
+
+    def update(self, field_updates, **kwargs):
+        with self._client._lock:
+            self._client._update(self._path, field_updates)
+
+    def delete(self, **kwargs):
+        with self._client._lock:
+            self._client._docs.pop(self._path, None)
+
+    def create(self, document_data):
+        self.set(document_data)
+
+    def collection(self, collection_id):
+        return FakeCollectionReference(*self._path, collection_id, client=self._client)
+
+    def collections(self):
+        depth = len(self._path)
+        names = {
+            path[depth]
+            for path in self._client._docs
+            if len(path) > depth + 1 and path[:depth] == self._path
+        }
+        return [self.collection(name) for name in sorted(names)]
+
+
+class FakeQuery:
+    def __init__(self, client, match, filters=(), orders=(), limit=None, projection=None,
+                 collection_path=None):
+        self._client = client
+        self._match = match  # path -> bool, the documents this query is over
+        self._collection_path = collection_path
+        self._filters = filters
+        self._orders = orders
+        self._limit = limit
+        self._projection = projection
+
+    def _copy(self, **changes):
+        fields = dict(
+            filters=self._filters,
+            orders=self._orders,
+            limit=self._limit,
+            projection=self._projection,
+        )
+        fields.update(changes)
+        return FakeQuery(
+            self._client, self._match, collection_path=self._collection_path, **fields
+        )
+
+    def where(self, field_path=None, op_string=None, value=None, filter=None):
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        return self._copy(filters=self._filters + ((field_path, op_string, value),))
+
+    def order_by(self, field_path, direction="ASCENDING"):
+        return self._copy(orders=self._orders + ((field_path, direction),))
+
+    def limit(self, count):
+        return self._copy(limit=count)
+
+    def select(self, field_paths):
+        return self._copy(projection=list(field_paths))
+
+    def _matches(self, path, data):
+        for field, op, value in self._filters:
+            actual = path[-1] if field == "__name__" else _get_field(data, _split_field(field))
+            if actual is _MISSING:
+                return False
+            if op == "==" and actual != value:
+                return False
+            if op == "in" and actual not in value:
+                return False
+            if op == ">=" and not actual >= value:
+                return False
+            if op == "<=" and not actual <= value:
+                return False
+            if op == "array_contains" and value not in actual:
+                return False
+        # Firestore leaves out documents missing an ordered field
+        return all(
+            _get_field(data, _split_field(field)) is not _MISSING
+            for field, _ in self._orders
+        )
+
+    def _candidates(self):
+        for field, op, value in self._filters:
+            if field == "__name__" and op == "in" and self._collection_path:
+                # Look ids up directly instead of scanning the collection
+                docs = self._client._docs
+                paths = [self._collection_path + (doc_id,) for doc_id in value]
+                return [(path, docs[path]) for path in paths if path in docs]
+        return self._client._docs.items()
+
+    def _check_indexes(self):
+        filtered = {field for field, _, _ in self._filters}
+        ordered = {field for field, _ in self._orders}
+        if filtered and ordered - filtered:
+            raise FailedPrecondition("The query requires a composite index")
+
+    def stream(self, transaction=None):
+        self._check_indexes()
+        with self._client._lock:
+            rows = [
+                (path, data)
+                for path, data in self._candidates()
+                if self._match(path) and self._matches(path, data)
+            ]
+        for field, direction in reversed(self._orders):
+            parts = _split_field(field)
+            rows.sort(
+                key=lambda row: _get_field(row[1], parts),
+                reverse=direction == firestore.Query.DESCENDING,
+            )
+        if self._limit is not None:
+            rows = rows[:self._limit]
+        for path, data in rows:
+            if self._projection is not None:
+                projected = {}
+                for field in self._projection:
+                    value = _get_field(data, _split_field(field))
+                    if value is not _MISSING:
+                        _apply_update(projected, {field: value})
+                data = projected
+            yield FakeSnapshot(self._client.document(*path), data)
+
+    def get(self, transaction=None):
+        return list(self.stream())
+
+
+class FakeCollectionReference(FakeQuery):
+    def __init__(self, *path, client):
+        self._path = tuple(path)
+        depth = len(self._path)
+        super().__init__(
+            client,
+            lambda doc_path: len(doc_path) == depth + 1 and doc_path[:depth] == self._path,
+            collection_path=self._path,
+        )
+
+    @property
+    def id(self):
+        return self._path[-1]
+
+    @property
+    def path(self):
+        return "/".join(self._path)
+
+    @property
+    def parent(self):
+        if len(self._path) == 1:
+            return None
+        return self._client.document(*self._path[:-1])
+
+    def document(self, document_id=None):
+        return self._client.document(*self._path, document_id or uuid.uuid4().hex[:20])
+
+    def add(self, document_data):
+        ref = self.document()
+        ref.set(document_data)
+        return None, ref
+
+    def list_documents(self):
+        with self._client._lock:
+            paths = [path for path in self._client._docs if self._match(path)]
+        return [self._client.document(*path) for path in paths]
+
+
+class FakeWriteBatch:
+    def __init__(self, client):
+        self._client = client
+        self._writes = []
+
+    def __len__(self):
+        return len(self._writes)
+
+    def set(self, reference, document_data, merge=False):
+        self._writes.append(("set", reference._path, document_data, merge))
+
+    def update(self, reference, field_updates, **kwargs):
+        self._writes.append(("update", reference._path, field_updates, None))
+
+    def delete(self, reference, **kwargs):
+        self._writes.append(("delete", reference._path, None, None))
+
+    def commit(self, **kwargs):
+        with self._client._lock:
+            for kind, path, data, merge in self._writes:
+                if kind == "set":
+                    self._client._set(path, data, merge)
+                elif kind == "update":
+                    self._client._update(path, data)
+                else:
+                    self._client._docs.pop(path, None)
+        self._writes = []
+        return []
+
+
+class FakeTransaction(FakeWriteBatch):
+    """Writes are applied when the transactional function returns."""
+
+
+class FakeFirestore:
+    def __init__(self):
+        self._docs = {}  # path tuple -> data
+        self._lock = threading.RLock()
+
+    # --- Storage primitives ---
+
+    def _set(self, path, data, merge=False):
+        if merge and path in self._docs:
+            _apply_update(self._docs[path], data)
+        else:
+            self._docs[path] = _resolve(copy.deepcopy(data))
+
+    def _update(self, path, updates):
+        if path not in self._docs:
+            raise KeyError(f"No document to update: {'/'.join(path)}")
+        _apply_update(self._docs[path], updates)
+
+    # --- Client API ---
+
+    def collection(self, *path):
+        return FakeCollectionReference(*path, client=self)
+
+    def document(self, *path):
+        if len(path) == 1:
+            path = tuple(path[0].split("/"))
+        return FakeDocumentReference(*path, client=self)
+
+    def collection_group(self, collection_id):
+        return FakeQuery(
+            self,
+            lambda path: len(path) >= 2 and path[-2] == collection_id,
+        )
+
+    def get_all(self, references, field_paths=None, transaction=None):
+        for reference in references:
+            yield reference.get()
+
+    def batch(self):
+        return FakeWriteBatch(self)
+
+    def transaction(self, **kwargs):
+        return FakeTransaction(self)
+
+    def recursive_delete(self, reference, chunk_size=5000, **kwargs):
+        prefix = reference._path
+        with self._lock:
+            paths = [path for path in self._docs if path[:len(prefix)] == prefix]
+            for path in paths:
+                del self._docs[path]
+        return len(paths)
+
+    def __len__(self):
+        return len(self._docs)
+
+
+def _run_transactional(transactional, transaction, *args, **kwargs):
+    result = transactional.to_wrap(transaction, *args, **kwargs)
+    transaction.commit()
+    return result
+
+
+def install(client=None, modules=()):
+    """
+    Makes firestore.client() return `client` (a new FakeFirestore by
+    default). Functions decorated with @firestore.transactional in the given
+    modules are swapped for versions that run once against the fake
+    transaction. Returns the client.
+    """
+    client = client or FakeFirestore()
+    firestore.client = lambda app=None: client
+    for module in modules:
+        for name, value in list(vars(module).items()):
+            if hasattr(value, "to_wrap") and hasattr(value, "retry_id"):
+                setattr(module, name, functools.partial(_run_transactional, value))
+    return client
+
+
+_ids = itertools.count()
+
+
+def next_id(prefix):
+    """Readable, unique document ids for seeded data."""
+    return f"{prefix}{next(_ids):06d}"
@@ -0,0 +1,534 @@
+"""
+Load test: concurrent virtual users replaying browser sessions.
+
+Each virtual user goes through the session a real user does: load the page,
+log in, see the home page, open a long public trip and idle on it while the
+5 second refresh interval ticks, then open their own journal for editing,
+add a place and save. Every step is a POST to /_dash-update-component with
+the payload the Dash renderer sends, built from /_dash-dependencies; the
+background callbacks (add place, save) are polled with the signed
+cacheKey/job handles until their result arrives, as the browser does.
+
+Firebase is stubbed: the Firestore client is the in-memory fake seeded with
+a benchmark dataset (benchmarks/datasets.py), and logins and ID tokens are
+accepted without calling Firebase Auth. Background jobs run through the app's
+own job manager, in threads of the server process, as in production.
+
+By default the app runs in this process behind the Flask test client. To
+measure gunicorn instead, start the stubbed app with one worker (every
+worker would hold its own copy of the fake store) and pass --url:
+    GUNICORN_WORKERS=1 gunicorn -c gunicorn.conf.py --pythonpath benchmarks \\
+        "loadtest:create_server('small', 20)"
+    python benchmarks/loadtest.py --url http://localhost:8080 --users 20
+
+Reports throughput, p50/p95/p99 latency per callback (as seen by the client,
+including the polling of background callbacks) and Firestore operations per
+session, read from /metrics before and after the run.
+
+Usage (from the ApaPlan_OJT directory):
+    python benchmarks/loadtest.py --users 20 --sessions 3
+    python benchmarks/loadtest.py --users 50 --idle-ticks 12 --think-scale 1
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fake_firestore
+from datasets import DATASETS, seed_dataset, seed_trip
+
+# Seeded journals the virtual users edit: one per user, owned by user{i:06d}
+EDIT_DAYS = 7
+EDIT_PLACES = 28
+DETAIL_INTERVAL_S = 5.0
+PASSWORD = "loadtest-password"
+
+
+def user_id(index):
+    return f"user{index:06d}"
+
+
+def edit_journal_id(index):
+    return f"loadtest{index:04d}"
+
+
+# --- Stubbed server -------------------------------------------------------
+
+class _FakePyrebaseAuth:
+    def sign_in_with_email_and_password(self, email, password):
+        if password != PASSWORD:
+            raise ValueError("INVALID_LOGIN_CREDENTIALS")
+        uid = email.split("@")[0]
+        return {"idToken": f"token-{uid}", "localId": uid, "email": email}
+
+
+def _fake_user_info(id_token):
+    if not id_token or not id_token.startswith("token-"):
+        return None
+    uid = id_token[len("token-"):]
+    return SimpleNamespace(uid=uid, display_name=uid, email=f"{uid}@example.com")
+
+
+def create_server(dataset="small", users=20, seed=42):
+    """
+    Imports the app against a seeded fake Firestore with Firebase Auth
+    stubbed out, and returns its Flask server. Usable as a gunicorn app.
+    """
+    import firebase_config
+    from src.shared import journal_utils
+
+    db = fake_firestore.install(modules=[journal_utils])
+    config = DATASETS[dataset]
+    if users > config["authors"]:
+        raise ValueError(f"The {dataset} dataset has only {config['authors']} users")
+    ids = seed_dataset(db, seed=seed, **config)
+    rng = random.Random(seed)
+    for index in range(users):
+        seed_trip(
+            db, rng, edit_journal_id(index), user_id(index), ids["place_ids"],
+            days=EDIT_DAYS, places=EDIT_PLACES,
+        )
+
+    def init_firebase_admin():
+        firebase_config.db = db
+        return db
+
+    firebase_config.init_firebase_admin = init_firebase_admin
+    firebase_config._pyrebase_auth = _FakePyrebaseAuth()
+    os.environ.setdefault("DASH_CACHE_DIR", tempfile.mkdtemp(prefix="apaplan-loadtest-"))
+
+    from src import main
+    from src.pages import home_page, journal_detail_page
+    from src.pages.journal_edit import callbacks as edit_callbacks
+    for module in (main, home_page, journal_detail_page, edit_callbacks):
+        module.get_user_info = _fake_user_info
+    return main.server
+
+
+# --- Clients --------------------------------------------------------------
+
+class TestClientTransport:
+    def __init__(self, server):
+        self._client = server.test_client()
+
+    def get(self, path):
+        response = self._client.get(path)
+        return response.status_code, response.get_data(as_text=True)
+
+    def post(self, path, body):
+        response = self._client.post(path, json=body)
+        return response.status_code, response.get_data(as_text=True)
+
+
+class HttpTransport:
+    def __init__(self, base_url):
+        self._base_url = base_url.rstrip("/")
+
+    def _send(self, request):
+        try:
+            with urllib.request.urlopen(request, timeout=120) as response:
+                return response.status, response.read().decode()
+        except urllib.error.HTTPError as error:
+            return error.code, error.read().decode()
+
+    def get(self, path):
+        return self._send(urllib.request.Request(self._base_url + path))
+
+    def post(self, path, body):
+        return self._send(urllib.request.Request(
+            self._base_url + path,
+            data=json.dumps(body).encode(),
+            headers={"Content-Type": "application/json"},
+        ))
+
+
+def _split_outputs(output):
+    """Splits a Dash output id ("a.b" or "..a.b...c.d..") into (id, property)."""
+    parts = output[2:-2].split("...") if output.startswith("..") else [output]
+    return [tuple(part.rsplit(".", 1)) for part in parts]
+
+
+def _bare(output_part):
+    component_id, prop = output_part
+    return f"{component_id}.{prop.split('@')[0]}"
+
+
+def _stringify_id(component_id):
+    if isinstance(component_id, dict):
+        return json.dumps(component_id, sort_keys=True, separators=(",", ":"))
+    return component_id
+
+
+def layout_values(tree):
+    """
+    The props of every component with an id in a rendered layout, as
+    {"id.prop": value}: what the browser knows when it builds a request.
+    """
+    values = {}
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(node)
+        elif isinstance(node, dict) and "props" in node:
+            props = node["props"]
+            component_id = props.get("id")
+            for prop, value in props.items():
+                if isinstance(value, (dict, list)) and prop != "data":
+                    stack.append(value)
+                elif isinstance(component_id, str) and prop != "id":
+                    values[f"{component_id}.{prop}"] = value
+            if isinstance(component_id, str) and isinstance(props.get("data"), dict):
+                values[f"{component_id}.data"] = props["data"]
+    return values
+
+
+class Dependencies:
+    """The callback specs from /_dash-dependencies, looked up like the renderer does."""
+
+    def __init__(self, specs):
+        self._specs = specs
+
+    def find(self, output, trigger):
+        """
+        The callback writing `output` ("id.prop") fired by `trigger`; output
+        None finds a callback without outputs.
+        """
+        for spec in self._specs:
+            if spec.get("clientside_function") or bool(spec.get("no_output")) != (output is None):
+                continue
+            outputs = [] if output is None else [_bare(part) for part in _split_outputs(spec["output"])]
+            inputs = [f"{_stringify_id(i['id'])}.{i['property']}" for i in spec["inputs"]]
+            if (output is None or output in outputs) and trigger in inputs:
+                return spec
+        raise KeyError(f"No callback writes {output} on {trigger}")
+
+
+class VirtualUser:
+    def __init__(self, transport, dependencies, end_id, think_scale, timings):
+        self.transport = transport
+        self.dependencies = dependencies
+        self.end_id = end_id
+        self.think_scale = think_scale
+        self.timings = timings  # name -> [ms], shared by all users
+        self.errors = 0
+
+    def _record(self, name, started):
+        self.timings[name].append((time.perf_counter() - started) * 1000)
+
+    def _props(self, specs, values):
+        props = []
+        for spec in specs:
+            value = values.get(f"{_stringify_id(spec['id'])}.{spec['property']}")
+            if isinstance(spec["id"], dict) or spec["id"].startswith("{"):
+                # Wildcard (ALL) dependency, its id stringified in the specs:
+                # the caller passes the matched components
+                props.append([
+                    {"id": component_id, "property": spec["property"], "value": v}
+                    for component_id, v in (value or [])
+                ])
+                continue
+            prop = {"id": spec["id"], "property": spec["property"]}
+            if value is not None:
+                prop["value"] = value
+            props.append(prop)
+        return props
+
+    def call(self, name, output, trigger, values, changed=None):
+        """
+        Fires the callback writing `output` because `trigger` changed, with
+        `values` ("id.prop" -> value) for its inputs and state. Returns the
+        updated props as {"id.prop": value}, or {} when nothing was updated.
+        """
+        spec = self.dependencies.find(output, trigger)
+        outputs = [] if output is None else [
+            {"id": component_id, "property": prop}
+            for component_id, prop in _split_outputs(spec["output"])
+        ]
+        body = {
+            "output": spec["output"],
+            "outputs": outputs if output is None or spec["output"].startswith("..") else outputs[0],
+            "inputs": self._props(spec["inputs"], values),
+            "changedPropIds": [changed or trigger],
+            "state": self._props(spec["state"], values),
+        }
+        query = {"endId": self.end_id} if self.end_id else {}
+        started = time.perf_counter()
+        data = self._post(body, query)
+        if data and "cacheKey" in data and "response" not in data:
+            # Background callback: poll with the signed handles until it is done
+            interval_s = (spec.get("background") or {}).get("interval", 1000) / 1000
+            poll = {**query, "cacheKey": data["cacheKey"], "job": data["job"]}
+            while data is not None and "response" not in data:
+                time.sleep(interval_s * self.think_scale)
+                data = self._post(body, poll)
+        self._record(name, started)
+
+        updated = {}
+        for component_id, props in ((data or {}).get("response") or {}).items():
+            for prop, value in props.items():
+                updated[f"{component_id}.{prop}"] = value
+        return updated
+
+    def _post(self, body, query):
+        path = "/_dash-update-component"
+        if query:
+            path += "?" + urllib.parse.urlencode(query)
+        status, text = self.transport.post(path, body)
+        if status == 204:
+            return None  # PreventUpdate
+        if status != 200:
+            self.errors += 1
+            return None
+        return json.loads(text)
+
+    def think(self, seconds):
+        if self.think_scale:
+            time.sleep(seconds * self.think_scale)
+
+    def run_session(self, index, trip_id, idle_ticks):
+        email = f"{user_id(index)}@example.com"
+        journal_id = edit_journal_id(index)
+
+        started = time.perf_counter()
+        for path in ("/", "/_dash-layout", "/_dash-dependencies"):
+            status, _ = self.transport.get(path)
+            self.errors += status != 200
+        self._record("page_load", started)
+
+        # Login
+        self.call("display_page", "page-content.children", "url.pathname",
+                  {"url.pathname": "/"})
+        self.think(3)
+        auth = self.call("login", "auth-store.data", "login_btn.n_clicks", {
+            "login_btn.n_clicks": 1, "email.value": email, "password.value": PASSWORD,
+        }).get("auth-store.data")
+        if not auth:
+            self.errors += 1
+            return
+        self.call("redirect_logic", "url.pathname", "auth-store.data",
+                  {"auth-store.data": auth, "url.pathname": "/"})
+
+        # Home
+        home = {"url.pathname": "/home", "auth-store.data": auth}
+        self.call("display_page", "page-content.children", "url.pathname", home)
+        user_info = self.call("store_user_info", "user-info-store.data", "auth-store.data",
+                              home).get("user-info-store.data")
+        home["user-info-store.data"] = user_info
+        self.call("update_home_page_content", "home-page-content.children",
+                  "user-info-store.data", home)
+        self.call("display_journals", "journal-list-container.children",
+                  "user-info-store.data", home)
+        self.call("display_all_journals", "all-journal-list-container.children",
+                  "user-info-store.data", home)
+        self.think(5)
+
+        # Open a long public trip and idle on it
+        detail = {"url.pathname": f"/journal/{trip_id}/view", "auth-store.data": auth}
+        page = self.call("display_page", "page-content.children", "url.pathname", detail)
+        detail.update(layout_values(page.get("page-content.children")))
+        self.call("update_journal_detail_view", "timeline-container.children",
+                  "journal-detail-store.data", detail)
+        for tick in range(idle_ticks + 1):
+            if tick:
+                self.think(DETAIL_INTERVAL_S)
+            detail["journal-detail-interval.n_intervals"] = tick
+            refreshed = self.call("refresh_journal_data", "journal-detail-store.data",
+                                  "journal-detail-interval.n_intervals", detail)
+            if "journal-detail-store.data" in refreshed:
+                detail["journal-detail-store.data"] = refreshed["journal-detail-store.data"]
+                self.call("update_journal_detail_view", "timeline-container.children",
+                          "journal-detail-store.data", detail)
+
+        # Edit their own journal
+        edit = {"url.pathname": f"/journal/{journal_id}/edit", "auth-store.data": auth}
+        self.call("display_page", "page-content.children", "url.pathname", edit)
+        edit["journal-edit-page-loaded.data"] = True
+        loaded = self.call("load_journal_data", "journal-edit-store.data",
+                           "journal-edit-page-loaded.data", edit)
+        if not loaded.get("journal-edit-store.data"):
+            self.errors += 1
+            return
+        edit["journal-edit-store.data"] = loaded["journal-edit-store.data"]
+        edit.update(layout_values(loaded.get("journal-edit-content.children")))
+        start_date = edit["journal-start-date-picker.value"]
+        self.call("update_timeline_tabs", "full-timeline-container.children",
+                  "journal-edit-store.data", edit)
+        self.think(10)
+
+        # Add a place on the first day
+        day = start_date.split("T")[0]
+        add_button = {"date": day, "type": "add-place-btn"}
+        edit['{"date":["ALL"],"type":"add-place-btn"}.n_clicks'] = [(add_button, 1)]
+        modal = self.call("open_add_place_modal", "add-place-modal.opened",
+                          '{"date":["ALL"],"type":"add-place-btn"}.n_clicks', edit,
+                          changed=f"{_stringify_id(add_button)}.n_clicks")
+        self.think(8)
+        place_id = f"ChIJloadtest{index:04d}"
+        edit.update({
+            "confirm-add-place-btn.n_clicks": 1,
+            "gmaps-place-data-store.data": json.dumps({
+                "place_id": place_id,
+                "name": f"Load test cafe {index}",
+                "address": "1 Jalan Loadtest, 50000 Kuala Lumpur, Malaysia",
+                "types": ["cafe", "food"],
+                "location": {"lat": 3.139, "lng": 101.687},
+            }),
+            "day-select-multiselect.value": modal.get("day-select-multiselect.value", [day]),
+            "place-description-textarea.value": "Added by the load test.",
+            "place-type-multiselect.value": ["Food"],
+            "place-friendliness-checkbox.value": [],
+        })
+        added = self.call("handle_confirm_add_place", "timeline-update-store.data",
+                          "confirm-add-place-btn.n_clicks", edit)
+        edit["timeline-update-store.data"] = added.get("timeline-update-store.data")
+        edit["journal-changed-store.data"] = added.get("journal-changed-store.data")
+        self.call("sync_changed_journal", None, "journal-changed-store.data", edit)
+        self.call("update_timeline_tabs", "full-timeline-container.children",
+                  "timeline-update-store.data", edit)
+        self.think(5)
+
+        # Save the journal
+        edit["save-journal-changes-btn.n_clicks"] = 1
+        saved = self.call("handle_save_journal", "url.pathname",
+                          "save-journal-changes-btn.n_clicks", edit)
+        edit["journal-changed-store.data"] = saved.get("journal-changed-store.data")
+        self.call("sync_changed_journal", None, "journal-changed-store.data", edit)
+
+
+# --- Runner ---------------------------------------------------------------
+
+OPS_LINE = re.compile(r'^apaplan_backend_ops_total\{.*op="([^"]+)"\} (\S+)$')
+
+
+def backend_ops(transport):
+    """Totals of the apaplan_backend_ops_total counters, by op."""
+    status, text = transport.get("/metrics")
+    totals = defaultdict(float)
+    if status == 200:
+        for line in text.splitlines():
+            match = OPS_LINE.match(line)
+            if match:
+                totals[match.group(1)] += float(match.group(2))
+    return totals
+
+
+def percentile(sorted_values, q):
+    index = max(0, min(len(sorted_values) - 1, round(q / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def run_load(make_transport, users, sessions, idle_ticks, think_scale, trip_id):
+    setup = make_transport()
+    status, text = setup.get("/_dash-dependencies")
+    if status != 200:
+        raise RuntimeError(f"/_dash-dependencies returned {status}")
+    dependencies = Dependencies(json.loads(text))
+    _, page = setup.get("/")
+    # Dash 4 signs a per-page-load id that background callback handles are bound to
+    match = re.search(r'"end_id":\s*"([^"]+)"', page)
+    end_id = match.group(1) if match else None
+
+    timings = defaultdict(list)
+    ops_before = backend_ops(setup)
+    virtual_users = [
+        VirtualUser(make_transport(), dependencies, end_id, think_scale, timings)
+        for _ in range(users)
+    ]
+
+    def run_user(index):
+        for _ in range(sessions):
+            virtual_users[index].run_session(index, trip_id, idle_ticks)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        list(pool.map(run_user, range(users)))
+    elapsed = time.perf_counter() - started
+    ops_after = backend_ops(setup)
+
+    total_sessions = users * sessions
+    requests = sum(len(values) for values in timings.values())
+    return {
+        "users": users,
+        "sessions": total_sessions,
+        "seconds": round(elapsed, 2),
+        "sessions_per_s": round(total_sessions / elapsed, 2),
+        "calls_per_s": round(requests / elapsed, 2),
+        "errors": sum(user.errors for user in virtual_users),
+        "callbacks": {
+            name: {
+                "calls": len(values),
+                "p50_ms": round(percentile(sorted(values), 50), 2),
+                "p95_ms": round(percentile(sorted(values), 95), 2),
+                "p99_ms": round(percentile(sorted(values), 99), 2),
+            }
+            for name, values in timings.items()
+        },
+        "ops_per_session": {
+            op: round((ops_after[op] - ops_before.get(op, 0)) / total_sessions, 1)
+            for op in sorted(ops_after)
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Base URL of a running stubbed server (default: in-process)")
+    parser.add_argument("--dataset", choices=sorted(DATASETS), default="small")
+    parser.add_argument("--users", type=int, default=10, help="Concurrent virtual users")
+    parser.add_argument("--sessions", type=int, default=2, help="Sessions per virtual user")
+    parser.add_argument("--idle-ticks", type=int, default=6,
+                        help="Refresh interval ticks spent on the journal page")
+    parser.add_argument("--think-scale", type=float, default=0.1,
+                        help="Multiplier for think times, the 5 s interval and polling "
+                             "(1 is real time, 0 sends requests back to back)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    if args.url:
+        make_transport = lambda: HttpTransport(args.url)
+    else:
+        server = create_server(args.dataset, args.users, args.seed)
+        make_transport = lambda: TestClientTransport(server)
+
+    report = run_load(make_transport, args.users, args.sessions, args.idle_ticks,
+                      args.think_scale, trip_id="trip000")
+
+    print(
+        f"users={report['users']} sessions={report['sessions']} seconds={report['seconds']} "
+        f"sessions/s={report['sessions_per_s']} calls/s={report['calls_per_s']} "
+        f"errors={report['errors']}"
+    )
+    print(f"{'callback':<28} {'calls':>6} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}")
+    for name, result in report["callbacks"].items():
+        print(
+            f"{name:<28} {result['calls']:>6} {result['p50_ms']:>10.2f} "
+            f"{result['p95_ms']:>10.2f} {result['p99_ms']:>10.2f}"
+        )
+    print("backend ops per session: " + ", ".join(
+        f"{op}={count}" for op, count in report["ops_per_session"].items()
+    ))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Startup-time benchmark.
+
+Imports the app (src.main) in a fresh interpreter under `python -X importtime`
+and reports the total import time plus the slowest modules. With --budget-ms the
+script exits with status 1 when the import takes longer than the budget, so it
+can guard against heavy imports creeping back into the startup path.
+
+Usage (from the ApaPlan_OJT directory):
+    python benchmarks/startup_time.py
+    python benchmarks/startup_time.py --runs 5 --top 30 --budget-ms 2500
+    python benchmarks/startup_time.py --report importtime_report.txt
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def run_import(module):
+    """
+    Imports `module` in a new interpreter with -X importtime.
+    Returns the wall time in milliseconds and the raw importtime output.
+    """
+    env = dict(os.environ, PYTHONPATH=PROJECT_ROOT)
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    return wall_ms, result.stderr
+
+
+def parse_importtime(output):
+    """
+    Parses `-X importtime` lines into (module, self_us, cumulative_us) tuples.
+    """
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        parts = line.split(":", 1)[1].split("|")
+        if len(parts) != 3:
+            continue
+        self_us, cumulative_us, name = parts
+        # Nested imports are indented under their parent; keep the indent
+        rows.append((name.rstrip()[1:], int(self_us), int(cumulative_us)))
+    return rows
+
+
+def format_report(rows, wall_times, top):
+    lines = [
+        f"runs: {len(wall_times)}",
+        f"wall time (ms): min={min(wall_times):.0f} "
+        f"median={statistics.median(wall_times):.0f} max={max(wall_times):.0f}",
+        "",
+        f"top {top} modules by cumulative import time (last run):",
+        f"{'cumulative ms':>14} {'self ms':>9}  module",
+    ]
+    top_level = [row for row in rows if not row[0].startswith(" ")]
+    for name, self_us, cumulative_us in sorted(rows, key=lambda r: r[2], reverse=True)[:top]:
+        lines.append(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name.strip()}")
+    total_us = sum(row[2] for row in top_level)
+    lines.append("")
+    lines.append(f"total top-level import time: {total_us / 1000:.0f} ms")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="src.main", help="Module to import (default: src.main)")
+    parser.add_argument("--runs", type=int, default=3, help="Number of fresh interpreters to time")
+    parser.add_argument("--top", type=int, default=25, help="Number of slowest modules to list")
+    parser.add_argument("--budget-ms", type=float, help="Fail if the median wall time exceeds this")
+    parser.add_argument("--report", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    wall_times = []
+    output = ""
+    for _ in range(args.runs):
+        wall_ms, output = run_import(args.module)
+        wall_times.append(wall_ms)
+
+    report = format_report(parse_importtime(output), wall_times, args.top)
+    print(report)
+    if args.report:
+        with open(args.report, "w") as f:
+            f.write(report + "\n")
+
+    median_ms = statistics.median(wall_times)
+    if args.budget_ms is not None and median_ms > args.budget_ms:
+        print(f"\nFAIL: median startup {median_ms:.0f} ms exceeds budget {args.budget_ms:.0f} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
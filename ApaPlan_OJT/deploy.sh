@@ -5,6 +5,23 @@ set -e
 # Define the image name
 IMAGE_NAME="europe-west1-docker.pkg.dev/apaplan-6a422/apaplan-repo/apaplan"
 
+# VPC network and subnet of the Memorystore (Redis) instance
+VPC_NETWORK="${VPC_NETWORK:-default}"
+VPC_SUBNET="${VPC_SUBNET:-default}"
+
+# With the REDIS_URL secret the caches are shared through Memorystore over
+# Direct VPC egress and the service can scale out. Without it each instance
+# caches on its own (journals not at all), and invalidations cannot reach
+# other instances, so the service is held to a single instance.
+if gcloud secrets describe REDIS_URL > /dev/null 2>&1; then
+  REDIS_SECRET="REDIS_URL=REDIS_URL:latest,"
+  CACHE_FLAGS="--network $VPC_NETWORK --subnet $VPC_SUBNET --vpc-egress private-ranges-only --max-instances default"
+else
+  echo "No REDIS_URL secret: deploying a single instance with local caches."
+  REDIS_SECRET=""
+  CACHE_FLAGS="--clear-network --max-instances 1"
+fi
+
 # 1. Build the Docker image
 echo "Building Docker image..."
 docker build --platform linux/amd64 -t $IMAGE_NAME .
@@ -20,9 +37,12 @@ gcloud run deploy auth \
   --region europe-west1 \
   --platform managed \
   --allow-unauthenticated \
+  --session-affinity \
   --cpu 1 \
   --memory 1Gi \
+  --startup-probe=httpGet.path=/warmup,initialDelaySeconds=0,timeoutSeconds=5,periodSeconds=5,failureThreshold=24 \
   --service-account firebase-adminsdk-fbsvc@apaplan-6a422.iam.gserviceaccount.com \
-  --set-secrets=FIREBASE_WEB_API_KEY=FIREBASE_WEB_API_KEY:latest,SECRET_KEY=SECRET_KEY:latest,AUTH_DOMAIN=AUTH_DOMAIN:latest,PROJECT_ID=PROJECT_ID:latest,STORAGE_BUCKET=STORAGE_BUCKET:latest,MESSAGING_SENDER_ID=MESSAGING_SENDER_ID:latest,APP_ID=APP_ID:latest,MEASUREMENT_ID=MEASUREMENT_ID:latest,GOOGLE_MAPS_API_KEY=GOOGLE_MAPS_API_KEY:latest,GOOGLE_MAP_ID=GOOGLE_MAP_ID:latest
+  $CACHE_FLAGS \
+  --set-secrets=${REDIS_SECRET}FIREBASE_WEB_API_KEY=FIREBASE_WEB_API_KEY:latest,SECRET_KEY=SECRET_KEY:latest,AUTH_DOMAIN=AUTH_DOMAIN:latest,PROJECT_ID=PROJECT_ID:latest,STORAGE_BUCKET=STORAGE_BUCKET:latest,MESSAGING_SENDER_ID=MESSAGING_SENDER_ID:latest,APP_ID=APP_ID:latest,MEASUREMENT_ID=MEASUREMENT_ID:latest,GOOGLE_MAPS_API_KEY=GOOGLE_MAPS_API_KEY:latest,GOOGLE_MAP_ID=GOOGLE_MAP_ID:latest
 
 echo "Deployment successful!"
@@ -1,18 +1,65 @@
 import os
+import logging
 from dotenv import load_dotenv
-import pyrebase
 
 # Load environment variables from .env file only in local development
 if 'K_SERVICE' not in os.environ:
     load_dotenv()
 
 # --- Server-side (firebase-admin) ---
-# This module now only serves as a placeholder for the db client.
-# The initialization is handled in the main application entry point (src/main.py)
-# to ensure correct startup order.
+# This module serves as a placeholder for the db client. It is filled in by
+# init_firebase_admin(), which the application entry point (src/main.py) calls
+# before importing any page module to ensure correct startup order.
 db = None
 
 
+def init_firebase_admin():
+    """
+    Initializes the Firebase Admin SDK once per process and returns the
+    Firestore client. Safe to call again on hot reloads.
+    """
+    global db
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+
+    try:
+        # Check if the app is already initialized to prevent errors on hot reloads
+        firebase_admin.get_app()
+        logging.info("Firebase app already exists.")
+    except ValueError:
+        logging.info("Firebase app does not exist. Initializing now...")
+
+        # Get storage bucket from environment variables.
+        storage_bucket = os.getenv("STORAGE_BUCKET")
+        if not storage_bucket:
+            logging.warning("STORAGE_BUCKET environment variable not set. Storage features may not work.")
+            firebase_options = {}
+        else:
+            # Ensure the bucket name is clean and doesn't contain prefixes
+            if "gs://" in storage_bucket:
+                storage_bucket = storage_bucket.split("gs://")[1]
+            firebase_options = {'storageBucket': storage_bucket}
+
+        # When running in a Google Cloud environment (like Cloud Run),
+        # initialize_app() with no arguments will automatically use
+        # the service account associated with the revision.
+        if 'K_SERVICE' in os.environ:
+            firebase_admin.initialize_app(options=firebase_options)
+            logging.info("Firebase app initialized successfully using Application Default Credentials.")
+        else:
+            # Local or Docker development
+            # Assumes a serviceAccountKey.json file is in your project root directory
+            cred_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'serviceAccountKey.json')
+            cred = credentials.Certificate(cred_path)
+            firebase_admin.initialize_app(cred, options=firebase_options)
+            logging.info("Firebase app initialized successfully using local credentials.")
+
+    # Creating the client does not open a connection; the gRPC channel is
+    # set up on the first request.
+    db = firestore.client()
+    return db
+
+
 # --- Client-side (pyrebase) ---
 def get_pyrebase_config():
     return {
@@ -26,6 +73,20 @@ def get_pyrebase_config():
         "databaseURL": ""
     }
 
-pyrebase_config = get_pyrebase_config()
-pyrebase_app = pyrebase.initialize_app(pyrebase_config)
-pyrebase_auth = pyrebase_app.auth()
+
+_pyrebase_auth = None
+
+
+def get_pyrebase_auth():
+    """
+    Returns the pyrebase auth client, creating it on first use.
+    pyrebase pulls in a large dependency tree, so it is only imported once a
+    user actually logs in or resets a password.
+    """
+    global _pyrebase_auth
+    if _pyrebase_auth is None:
+        import pyrebase
+
+        pyrebase_app = pyrebase.initialize_app(get_pyrebase_config())
+        _pyrebase_auth = pyrebase_app.auth()
+    return _pyrebase_auth
@@ -0,0 +1,117 @@
+# Gunicorn runtime profile for ApaPlan.
+#
+# gunicorn loads this file automatically when started from the project root
+# (see the Dockerfile CMD). Every setting can be overridden with an environment
+# variable so a Cloud Run revision can be tuned without a rebuild.
+#
+# Why these defaults:
+# - Almost all request time is spent waiting on Firestore, Storage and Firebase
+#   Auth, not on the CPU. Threads (gthread) let one process keep serving other
+#   users while a slow call, like a cover upload, is in flight. The default
+#   single sync worker blocked the whole instance.
+# - One process per CPU the revision may use (its --cpu limit, read from the
+#   cgroup quota; the host may show more CPUs) is enough to use the CPU. More
+#   processes mostly cost memory: each worker holds Dash, dmc and the Firebase
+#   SDKs, and the Cloud Run service has 1 GiB.
+# - 8 threads per worker with one worker per vCPU keeps the number of requests
+#   running at once well below Cloud Run's default concurrency of 80. Requests
+#   above that wait in the gunicorn backlog instead of piling up in one process.
+#
+# Measured with benchmarks/loadtest.py (20 users, 2 sessions each, small
+# dataset, in-memory Firestore) against this config on 1 CPU, as deployed:
+#
+#   workers x threads   sessions/s   p95 page load   p95 timeline   p95 add place
+#   1 x 4               0.78         1301 ms         310 ms         219 ms
+#   1 x 8  (default)    0.71          943 ms         311 ms         363 ms
+#   1 x 16              0.72          920 ms         886 ms        1510 ms
+#   2 x 4               0.73         1498 ms         315 ms         469 ms
+#   2 x 8               0.70         1108 ms         963 ms        1197 ms
+#
+# Throughput is CPU bound and flat, so a second worker on one CPU buys nothing
+# and costs about 90 MB (workers measured 230-240 MB RSS, the master 140 MB).
+# 16 threads let callbacks queue on the CPU and triple their p95. The
+# in-memory Firestore answers without network waits, which is what extra
+# threads hide in production, so 8 rather than 4. Re-check these numbers when
+# the instance size or traffic pattern changes.
+import os
+import math
+
+
+def _cgroup_cpu_quota():
+    """
+    CPUs allowed by the container's cgroup CPU quota (the Cloud Run --cpu
+    limit), or None if there is no quota. The host may expose many more CPUs
+    than the revision is allowed to use.
+    """
+    try:
+        # cgroup v2: "<quota> <period>", or "max <period>" without a limit
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()[:2]
+        if quota == "max":
+            return None
+        return int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        # cgroup v1: a quota of -1 means no limit
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        return quota / period if quota > 0 else None
+    except (OSError, ValueError):
+        return None
+
+
+def _cpu_count():
+    """Number of CPUs this container may actually use."""
+    try:
+        available = len(os.sched_getaffinity(0))
+    except AttributeError:
+        available = os.cpu_count() or 1
+    quota = _cgroup_cpu_quota()
+    if quota is None:
+        return available
+    return max(1, min(available, math.ceil(quota)))
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+
+worker_class = "gthread"
+workers = int(os.getenv("GUNICORN_WORKERS", os.getenv("WEB_CONCURRENCY", _cpu_count())))
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+
+# Import the app (Dash layout, callbacks, Firebase Admin init) once in the
+# master and fork the workers from it. Forked workers share those pages, and
+# each new worker starts faster. Nothing may make a Firestore or gRPC call at
+# import time, because gRPC channels must not be shared across fork. The warm-up
+# therefore runs in each worker after the fork, in post_worker_init below.
+preload_app = True
+
+
+def post_worker_init(worker):
+    # Open this worker's own Firestore channel and fill its caches before it
+    # accepts requests. /warmup (the Cloud Run startup probe) then reports the
+    # result. The heartbeat after each step keeps the arbiter from taking a
+    # slow warm-up for a hung worker.
+    from src.shared.warmup import run_warmup
+
+    report = run_warmup(progress=worker.notify)
+    worker.log.info(f"Warm-up {report['status']} in {report['total_ms']} ms")
+
+# Cover and avatar uploads are the slowest requests; allow them to finish.
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+# Cloud Run sends SIGTERM and waits 10 seconds before SIGKILL.
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "10"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+# Recycle workers now and then so slow leaks (grpc buffers, caches) cannot
+# build up. The jitter keeps all workers from restarting at the same moment.
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "200"))
+
+# Container /tmp may be disk-backed; heartbeats on tmpfs avoid spurious timeouts.
+worker_tmp_dir = "/dev/shm"
+
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+accesslog = os.getenv("GUNICORN_ACCESS_LOG") or None
@@ -62,10 +62,10 @@ function initAutocomplete() {
         marker.position = place.geometry.location;
         marker.map = map;
 
-        // --- Store Data in Global Variable ---
-        // We store the selected place data in a global variable. A dcc.Interval
-        // component will poll this variable and update the dcc.Store in Dash.
-        // This is the most robust method to avoid JS scope and timing issues.
+        // --- Push Data into the Dash Store ---
+        // The selection is written straight into gmaps-place-data-store with
+        // set_props, which triggers the Dash callbacks listening to the store.
+        // No polling is needed, so nothing runs while the modal sits idle.
         const dataToStore = {
             place_id: place.place_id,
             name: place.name,
@@ -80,7 +80,13 @@ function initAutocomplete() {
             website: place.website || "",
             oku_friendly: place.wheelchair_accessible_entrance || false
         };
-        window.gmaps_selected_place = JSON.stringify(dataToStore);
+        if (window.dash_clientside && window.dash_clientside.set_props) {
+            window.dash_clientside.set_props('gmaps-place-data-store', {
+                data: JSON.stringify(dataToStore)
+            });
+        } else {
+            console.error("dash_clientside.set_props is not available.");
+        }
     });
 }
 
@@ -2,6 +2,9 @@ import logging
 import traceback
 from firebase_admin import auth, firestore, exceptions, storage
 from firebase_config import db
+from src.shared.metrics import count_op, FIRESTORE_READ, FIRESTORE_WRITE, STORAGE_OP
+from src.shared.spans import timed
+from src.shared.journal_utils import clear_user_profile_cache
 
 # Configure logging
 logging.basicConfig(
@@ -10,6 +13,7 @@ logging.basicConfig(
 )
 
 
+@timed("users")
 def create_user(email, password):
     """
     Creates a new user in Firebase Authentication and stores a corresponding
@@ -51,6 +55,7 @@ def create_user(email, password):
                 "display_name": display_name,
                 "avatar_url": ""
             })
+            count_op(FIRESTORE_WRITE)
             logging.info(
                 f"Successfully stored user info for {user.uid} in Firestore."
             )
@@ -81,6 +86,7 @@ def create_user(email, password):
         return {"status": "error", "message": "UNEXPECTED_ERROR"}
 
 
+@timed("users/{uid}")
 def get_user_profile(uid):
     """
     Retrieves a user's profile from Firestore.
@@ -88,6 +94,7 @@ def get_user_profile(uid):
     try:
         user_ref = db.collection("users").document(uid)
         user_doc = user_ref.get()
+        count_op(FIRESTORE_READ)
         if user_doc.exists:
             return {"status": "success", "data": user_doc.to_dict()}
         else:
@@ -97,6 +104,7 @@ def get_user_profile(uid):
         return {"status": "error", "message": "UNEXPECTED_ERROR"}
 
 
+@timed("users/{uid}")
 def update_user_profile(uid, profile_data):
     """
     Updates a user's profile in Firestore.
@@ -104,21 +112,24 @@ def update_user_profile(uid, profile_data):
     try:
         user_ref = db.collection("users").document(uid)
         user_ref.update(profile_data)
+        count_op(FIRESTORE_WRITE)
+        clear_user_profile_cache(uid)
         return {"status": "success"}
     except Exception as e:
         logging.error(f"An unexpected error occurred: {e}")
         return {"status": "error", "message": "UNEXPECTED_ERROR"}
 
 
+@timed("avatars/{uid}")
 def upload_avatar(uid, file_contents, file_name):
     """
     Uploads an avatar image to Firebase Storage and updates the user's profile.
     """
     try:
-        logging.info(f"Starting avatar upload for user {uid}, filename: {file_name}")
+        logging.debug(f"Starting avatar upload for user {uid}, filename: {file_name}")
         bucket = storage.bucket()
         file_extension = file_name.split('.')[-1].lower()
-        logging.info(f"File extension: {file_extension}")
+        logging.debug(f"File extension: {file_extension}")
         
         # Map file extensions to content types
         content_type_mapping = {
@@ -128,7 +139,7 @@ def upload_avatar(uid, file_contents, file_name):
             'gif': 'image/gif'
         }
         content_type = content_type_mapping.get(file_extension)
-        logging.info(f"Content type: {content_type}")
+        logging.debug(f"Content type: {content_type}")
 
         if not content_type:
             logging.warning(f"Unsupported file type for user {uid}: {file_extension}")
@@ -138,23 +149,24 @@ def upload_avatar(uid, file_contents, file_name):
         blob_path = f"avatars/{uid}/{file_name}"
         blob = bucket.blob(blob_path)
 
-        logging.info(f"Uploading to Firebase Storage: {blob_path}")
+        logging.debug(f"Uploading to Firebase Storage: {blob_path}")
         blob.upload_from_string(
             file_contents,
             content_type=content_type
         )
-        logging.info("Upload to Storage successful.")
+        logging.debug("Upload to Storage successful.")
 
         # Make the blob publicly viewable
-        logging.info("Making blob public.")
+        logging.debug("Making blob public.")
         blob.make_public()
-        logging.info("Blob is now public.")
+        count_op(STORAGE_OP, 2)
+        logging.debug("Blob is now public.")
 
         # Update user profile with the new avatar URL
-        logging.info(f"Updating user profile with new avatar URL: {blob.public_url}")
+        logging.debug(f"Updating user profile with new avatar URL: {blob.public_url}")
         update_user_profile(uid, {"avatar_url": blob.public_url})
         auth.update_user(uid, photo_url=blob.public_url)
-        logging.info("User profile updated successfully.")
+        logging.debug("User profile updated successfully.")
 
         return {"status": "success", "data": {"avatar_url": blob.public_url}}
     except exceptions.FirebaseError as e:
@@ -166,6 +178,7 @@ def upload_avatar(uid, file_contents, file_name):
         return {"status": "error", "message": f"AVATAR_UPLOAD_FAILED: {e}"}
 
 
+@timed("avatars/{uid}")
 def delete_avatar(uid):
     """
     Deletes a user's avatar from Firebase Storage and updates their profile.
@@ -188,6 +201,7 @@ def delete_avatar(uid):
         bucket = storage.bucket()
         blob = bucket.blob(blob_name)
         blob.delete()
+        count_op(STORAGE_OP)
         logging.info(f"Successfully deleted avatar for user {uid} from Storage.")
 
         # Update user profile to remove the avatar URL
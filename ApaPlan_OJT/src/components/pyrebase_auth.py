@@ -1,9 +1,9 @@
-from firebase_config import pyrebase_auth as auth
+from firebase_config import get_pyrebase_auth
 
 
 def sign_in_user(email, password):
     try:
-        user = auth.sign_in_with_email_and_password(email, password)
+        user = get_pyrebase_auth().sign_in_with_email_and_password(email, password)
         return {"status": "success", "data": user}
     except Exception as e:
         return {"status": "error", "message": str(e)}
@@ -11,7 +11,7 @@ def sign_in_user(email, password):
 
 def send_password_reset_email_pyrebase(email):
     try:
-        auth.send_password_reset_email(email)
+        get_pyrebase_auth().send_password_reset_email(email)
         return {"status": "success"}
     except Exception as e:
         return {"status": "error", "message": str(e)}
@@ -94,10 +94,20 @@ def create_timeline(start_date_str, days, places=None, is_editable=False):
         panel_children = place_cards
         if is_editable:
             panel_children.append(
-                dmc.Button(
-                    "Add Place",
-                    id={'type': 'add-place-btn', 'date': date_string},
-                    mt="sm"
+                dmc.Group(
+                    [
+                        dmc.Button(
+                            "Add Place",
+                            id={'type': 'add-place-btn', 'date': date_string},
+                        ),
+                        dmc.Button(
+                            "Optimize Route",
+                            id={'type': 'optimize-day-btn', 'date': date_string},
+                            variant="outline",
+                            disabled=len(places_for_day) < 3,
+                        ),
+                    ],
+                    mt="sm",
                 )
             )
         elif not place_cards:
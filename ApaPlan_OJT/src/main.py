@@ -5,57 +5,22 @@ import logging
 # Add the project root to the Python path before any other imports
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-import firebase_admin
-from firebase_admin import credentials, firestore
 import firebase_config
 
 # --- Firebase Admin SDK Initialization ---
-# This is the robust, centralized initialization pattern.
+# This must run before the page modules are imported: src/components/auth.py
+# reads firebase_config.db at import time.
 logging.basicConfig(level=logging.INFO)
-try:
-    # Check if the app is already initialized to prevent errors on hot reloads
-    firebase_admin.get_app()
-    logging.info("Firebase app already exists.")
-except ValueError:
-    logging.info("Firebase app does not exist. Initializing now...")
-
-    # Get storage bucket from environment variables.
-    # Make sure dotenv is loaded before this, which happens in firebase_config.py
-    storage_bucket = os.getenv("STORAGE_BUCKET")
-    if not storage_bucket:
-        logging.warning("STORAGE_BUCKET environment variable not set. Storage features may not work.")
-        firebase_options = {}
-    else:
-        # Ensure the bucket name is clean and doesn't contain prefixes
-        if "gs://" in storage_bucket:
-            storage_bucket = storage_bucket.split("gs://")[1]
-        firebase_options = {'storageBucket': storage_bucket}
-
-    # When running in a Google Cloud environment (like Cloud Run),
-    # initialize_app() with no arguments will automatically use
-    # the service account associated with the revision.
-    if 'K_SERVICE' in os.environ:
-        firebase_admin.initialize_app(options=firebase_options)
-        logging.info("Firebase app initialized successfully using Application Default Credentials.")
-    else:
-        # Local or Docker development
-        # Assumes a serviceAccountKey.json file is in your project root directory
-        cred_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'serviceAccountKey.json')
-        cred = credentials.Certificate(cred_path)
-        firebase_admin.initialize_app(cred, options=firebase_options)
-        logging.info("Firebase app initialized successfully using local credentials.")
-
-# Now that the app is initialized, we can get the firestore client
-# and assign it to the placeholder in our config module.
-firebase_config.db = firestore.client()
+firebase_config.init_firebase_admin()
 # --- End of Firebase Initialization ---
 
 
 # --- NOW you can safely import your other modules that use firebase ---
 import dash
+import diskcache
 from dash import Dash, html, dcc, Input, Output, State
 import dash_mantine_components as dmc
-from flask import Flask, jsonify
+from flask import Flask, Response, jsonify, request
 from dotenv import load_dotenv
 
 from src.pages.login_page import login_layout, register_login_callbacks
@@ -63,19 +28,67 @@ from src.pages.home_page import home_layout, register_home_callbacks
 from src.pages.profile_page import profile_layout, register_profile_callbacks
 from src.pages.journal_detail_page import journal_detail_layout, register_journal_detail_callbacks
 from src.pages.journal_edit_page import journal_edit_layout, register_journal_edit_callbacks
+from src.shared.job_manager import ThreadJobManager
+from src.shared.warmup import warmup_report, is_warm
+from src.shared.auth_utils import get_user_info
+from src.shared.geo_index import places_within, journals_within
+from src.shared.journal_utils import get_all_journals, sync_journal
+from src.shared import metrics, profiler
 
 # Load env variables for client-side (pyrebase)
 load_dotenv()
 
 # --- Load custom index.html ---
 # We will load the original template. The API key will be fetched by the client.
-with open("index.html", "r") as f:
+# The path is resolved from this file so startup does not depend on the CWD.
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+with open(os.path.join(PROJECT_ROOT, "index.html"), "r") as f:
     index_template = f.read()
 
 
 # --- Flask server ---
 server = Flask(__name__)
 
+# --- Response compression ---
+# Dash hands these settings to flask-compress (enabled with compress=True below).
+# Callback responses (_dash-update-component), layouts and static bundles are
+# compressed with brotli when the browser supports it, gzip otherwise. Tiny
+# payloads are sent as-is because compressing them costs more than it saves.
+server.config.update(
+    COMPRESS_ALGORITHM=["br", "gzip"],
+    COMPRESS_MIN_SIZE=1024,
+    COMPRESS_LEVEL=6,
+    COMPRESS_BR_LEVEL=4,
+    COMPRESS_MIMETYPES=[
+        "application/json",
+        "application/javascript",
+        "text/javascript",
+        "text/css",
+        "text/html",
+    ],
+)
+
+# --- Long-lived caching for fingerprinted static files ---
+# Dash links files in src/assets with a "?m=<mtime>" fingerprint and puts the
+# version in the file names of its component bundles, so a changed file always
+# gets a new URL. Those URLs can be cached by the browser for a year.
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+@server.after_request
+def set_static_cache_headers(response):
+    if response.status_code != 200:
+        return response
+    if request.path.startswith("/assets/") and request.args.get("m"):
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+    elif (
+        request.path.startswith("/_dash-component-suites/")
+        and response.cache_control.max_age
+    ):
+        # Dash already sets a one year max-age on fingerprinted bundles
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+    return response
+
 # --- API Endpoint for Google Maps API Key ---
 @server.route('/api/maps-config', methods=['GET'])
 def get_maps_config():
@@ -86,6 +99,128 @@ def get_maps_config():
     return jsonify({"apiKey": api_key, "mapId": map_id})
 
 
+# --- Nearby places and journals ---
+# GET /api/places/nearby?lat=..&lng=..&radius_km=..&limit=..  -> places within the radius
+# GET /api/journals/nearby?lat=..&lng=..&radius_km=..&limit=.. -> public journals visiting it
+# Both need a Firebase ID token ("Authorization: Bearer <idToken>"). They
+# answer from the worker's place grid, which is built in the background after
+# the warm-up; until it is ready they return 503 with Retry-After.
+MAX_NEARBY_RADIUS_KM = 100
+MAX_NEARBY_LIMIT = 100
+
+
+def _parse_area():
+    try:
+        lat = float(request.args["lat"])
+        lng = float(request.args["lng"])
+        radius_km = float(request.args.get("radius_km", 5))
+    except (KeyError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180 and 0 < radius_km <= MAX_NEARBY_RADIUS_KM):
+        return None
+    return lat, lng, radius_km
+
+
+def _parse_limit():
+    limit = request.args.get("limit", 50, type=int) or 50
+    return min(max(limit, 1), MAX_NEARBY_LIMIT)
+
+
+def _nearby_error():
+    """The error response for a nearby request, or None if it may proceed."""
+    authorization = request.headers.get("Authorization", "")
+    id_token = authorization[len("Bearer "):] if authorization.startswith("Bearer ") else None
+    if not id_token or not get_user_info(id_token):
+        return jsonify({"error": "A valid Firebase ID token is required"}), 401
+    if not _parse_area():
+        return jsonify({
+            "error": f"lat, lng and radius_km (0-{MAX_NEARBY_RADIUS_KM}) are required"
+        }), 400
+    return None
+
+
+def _index_not_ready():
+    response = jsonify({"error": "The place index is still being built"})
+    response.headers["Retry-After"] = "5"
+    return response, 503
+
+
+@server.route('/api/places/nearby', methods=['GET'])
+def get_nearby_places():
+    error = _nearby_error()
+    if error:
+        return error
+    places = places_within(*_parse_area(), limit=_parse_limit())
+    if places is None:
+        return _index_not_ready()
+    return jsonify([
+        {"place_id": place_id, "distance_km": round(distance, 3)}
+        for place_id, distance in places
+    ])
+
+
+@server.route('/api/journals/nearby', methods=['GET'])
+def get_nearby_journals():
+    error = _nearby_error()
+    if error:
+        return error
+    counts = journals_within(*_parse_area())
+    if counts is None:
+        return _index_not_ready()
+    public_journals = {journal["id"]: journal for journal in get_all_journals()}
+    results = [
+        {
+            "id": journal_id,
+            "title": public_journals[journal_id].get("title"),
+            "places_in_area": count,
+        }
+        for journal_id, count in counts.items()
+        if journal_id in public_journals
+    ]
+    results.sort(key=lambda journal: journal["places_in_area"], reverse=True)
+    return jsonify(results[:_parse_limit()])
+
+
+# --- Health and warm-up endpoints ---
+# /healthz is a cheap liveness check. /warmup reports the warm-up gunicorn
+# ran in this worker before it took traffic (see warmup.py); it is the Cloud
+# Run startup probe, so an instance only gets traffic once it is warm.
+@server.route('/healthz', methods=['GET'])
+def healthz():
+    return jsonify({"status": "ok", "warm": is_warm()})
+
+
+@server.route('/warmup', methods=['GET'])
+def warmup():
+    report = warmup_report()
+    status_code = 200 if report["status"] == "ok" else 503
+    return jsonify(report), status_code
+
+
+# --- Metrics ---
+# Per-callback latency and payload histograms and Firestore/Storage operation
+# counters, in Prometheus text format. Set METRICS_TOKEN to require
+# "Authorization: Bearer <token>" on scrapes.
+@server.route('/metrics', methods=['GET'])
+def get_metrics():
+    token = os.getenv("METRICS_TOKEN")
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return Response("Unauthorized\n", status=401, mimetype="text/plain")
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+# --- Background callback manager ---
+# Slow callbacks (uploads, deletes, saving places) run as background jobs so
+# the request thread returns immediately. Jobs run in a thread pool of the
+# worker (not in forked processes, see src/shared/job_manager.py); their
+# results live in a local DiskCache that every gunicorn worker on the instance
+# shares. Cloud Run session affinity keeps a browser's polling requests on the
+# instance running its job.
+background_callback_manager = ThreadJobManager(
+    diskcache.Cache(os.getenv("DASH_CACHE_DIR", "/tmp/apaplan-callback-cache"))
+)
+
+
 # --- Dash app ---
 # Explicitly setting the assets_folder is crucial for Dash to recognize and serve
 # the custom JavaScript files located in 'src/assets'. This is especially important
@@ -94,16 +229,25 @@ app = Dash(
     __name__,
     server=server,
     suppress_callback_exceptions=True,
+    compress=True,
+    background_callback_manager=background_callback_manager,
     assets_folder=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets'),
     index_string=index_template
 )
 app.title = "ApaPlan"
 
+# Must run before any callback is registered
+metrics.instrument(app)
+# Opt-in sampling profiler, see src/shared/profiler.py
+profiler.install(server)
+
 
 # --- App Layout ---
 app.layout = dmc.MantineProvider(
     children=[
         dcc.Store(id='auth-store', storage_type='session'),
+        # {"journal_id": ..., "at": ...}, set by background callbacks that change a journal
+        dcc.Store(id='journal-changed-store', storage_type='memory'),
         dcc.Location(id='url', refresh=False),
         html.Div(id='page-content'),
     ]
@@ -129,6 +273,18 @@ def logout(pathname):
     return dash.no_update
 
 
+# --- Journals changed by background callbacks ---
+# A background job clears and indexes only in the worker that ran it; the
+# worker serving the browser catches up here.
+@app.callback(
+    Input('journal-changed-store', 'data'),
+    prevent_initial_call=True
+)
+def sync_changed_journal(change):
+    if change and change.get('journal_id'):
+        sync_journal(change['journal_id'])
+
+
 # --- URL Router ---
 @app.callback(
     Output('page-content', 'children'),
@@ -1,4 +1,4 @@
-from dash import html, dcc, Input, Output, State, ALL, callback_context, no_update
+from dash import html, dcc, Input, Output, State, ALL, no_update
 import dash_mantine_components as dmc
 from src.shared.auth_utils import get_user_info
 from src.shared.journal_utils import (
@@ -9,11 +9,22 @@ from src.shared.journal_utils import (
     get_journal,
     delete_journal,
     upload_cover_image,
+    journal_aggregates,
+    sync_journal,
 )
-import json
+from src.shared.search_index import search_journals
 import logging
 
 
+def place_count_label(journal):
+    """Place count for a journal card, read from the journal's aggregates."""
+    aggregates = journal_aggregates(journal)
+    if aggregates is None:
+        return None
+    count = aggregates["place_count"]
+    return f"{count} place{'' if count == 1 else 's'}"
+
+
 def create_journal_modal():
     return dmc.Modal(
         id="journal-modal",
@@ -88,6 +99,9 @@ def home_layout():
             dcc.Store(id="modal-state-store", data={"opened": False}),
             dcc.Store(id="journal-update-trigger-store", storage_type="memory"),
             dcc.Store(id="journal-to-delete-store", storage_type="session"),
+            dcc.Store(id="journal-deleted-store", storage_type="memory"),
+            dmc.Text(id="journal-delete-progress", size="sm", c="dimmed"),
+            dmc.Text(id="journal-delete-status", size="sm", c="red"),
             html.Div(id="home-page-content"),
             dmc.Modal(
                 id="journal-details-modal",
@@ -148,6 +162,15 @@ def register_home_callbacks(app):
                         id="create-journal-btn",
                         style={"marginBottom": "20px"},
                     ),
+                    dmc.TextInput(
+                        id="journal-search-input",
+                        placeholder="Search public journals by title, summary or place",
+                        debounce=250,
+                        style={"marginBottom": "10px"},
+                    ),
+                    html.Div(
+                        id="journal-search-results", style={"marginBottom": "20px"}
+                    ),
                     dmc.Accordion(
                         id="journal-accordion",
                         children=[
@@ -187,7 +210,26 @@ def register_home_callbacks(app):
             )
         return html.Div("Loading...")
 
-    @app.callback(
+    # Open/close the create journal modal (clientside)
+    app.clientside_callback(
+        """
+        function(n_create, n_cancel, n_save, modal_state) {
+            const ctx = window.dash_clientside.callback_context;
+            if (!ctx.triggered || !ctx.triggered.length) {
+                return window.dash_clientside.no_update;
+            }
+
+            const trigger_id = ctx.triggered[0].prop_id.split(".")[0];
+            if (trigger_id === "create-journal-btn") {
+                return true;
+            }
+            if (trigger_id === "cancel-journal-btn" || trigger_id === "save-journal-btn") {
+                return false;
+            }
+
+            return Boolean(modal_state && modal_state.opened);
+        }
+        """,
         Output("journal-modal", "opened"),
         Input("create-journal-btn", "n_clicks"),
         Input("cancel-journal-btn", "n_clicks"),
@@ -195,18 +237,6 @@ def register_home_callbacks(app):
         State("modal-state-store", "data"),
         prevent_initial_call=True,
     )
-    def toggle_modal_open_close(n_create, n_cancel, n_save, modal_state):
-        ctx = callback_context
-        if not ctx.triggered:
-            return no_update
-
-        trigger_id = ctx.triggered[0]["prop_id"].split(".")[0]
-        if trigger_id == "create-journal-btn":
-            return True
-        if trigger_id in ["cancel-journal-btn", "save-journal-btn"]:
-            return False
-
-        return modal_state.get("opened", False)
 
     @app.callback(
         [
@@ -264,6 +294,11 @@ def register_home_callbacks(app):
             State("journal-start-date-picker", "value"),
             State("journal-days-input", "value"),
         ],
+        background=True,
+        running=[
+            (Output("save-journal-btn", "loading"), True, False),
+            (Output("create-journal-btn", "disabled"), True, False),
+        ],
         prevent_initial_call=True,
     )
     def save_new_journal(
@@ -350,6 +385,41 @@ def register_home_callbacks(app):
             "User not logged in.",
         )
 
+    @app.callback(
+        Output("journal-search-results", "children"),
+        Input("journal-search-input", "value"),
+        prevent_initial_call=True,
+    )
+    def search_public_journals(query):
+        if not query or not query.strip():
+            return []
+
+        results = search_journals(query, limit=10)
+        if not results:
+            return dmc.Text("No journals match your search.", size="sm", c="dimmed")
+
+        return dmc.Stack(
+            [
+                html.Div(
+                    [
+                        dcc.Link(
+                            dmc.Text(result.get("title") or "No Title", fw=500),
+                            href=f"/journal/{result['id']}/view",
+                            style={"textDecoration": "none"},
+                        ),
+                        dmc.Text(
+                            result.get("summary") or "No summary available.",
+                            size="sm",
+                            c="dimmed",
+                            lineClamp=1,
+                        ),
+                    ]
+                )
+                for result in results
+            ],
+            gap="xs",
+        )
+
     @app.callback(
         Output("journal-list-container", "children"),
         [
@@ -435,6 +505,12 @@ def register_home_callbacks(app):
                         lineClamp=2,
                         mt="sm",
                     ),
+                    dmc.Text(
+                        place_count_label(journal),
+                        size="xs",
+                        c="dimmed",
+                        mt="xs",
+                    ),
                     dmc.Group(
                         [
                             dcc.Link(
@@ -568,6 +644,12 @@ def register_home_callbacks(app):
                         lineClamp=2,
                         mt="sm",
                     ),
+                    dmc.Text(
+                        place_count_label(journal),
+                        size="xs",
+                        c="dimmed",
+                        mt="xs",
+                    ),
                     dmc.Group(
                         action_buttons,
                         grow=True,
@@ -583,7 +665,43 @@ def register_home_callbacks(app):
 
         return dmc.Group(journal_cards)
 
-    @app.callback(
+    # Open/close the delete confirmation modal (clientside)
+    # Confirming only closes the modal: process_journal_deletion reads the
+    # journal id from journal-to-delete-store on the same click, and the next
+    # delete button click overwrites it anyway.
+    app.clientside_callback(
+        """
+        function(delete_clicks, n_cancel, n_confirm, journal_to_delete) {
+            const no_update = window.dash_clientside.no_update;
+            const ctx = window.dash_clientside.callback_context;
+            if (!ctx.triggered || !ctx.triggered.length) {
+                return [no_update, no_update];
+            }
+
+            // Check if any of the delete buttons were actually clicked
+            for (const trigger of ctx.triggered) {
+                if (
+                    trigger.prop_id.includes("delete-journal-btn")
+                    && trigger.value !== null
+                    && trigger.value !== undefined
+                ) {
+                    const id_str = trigger.prop_id.slice(0, trigger.prop_id.lastIndexOf("."));
+                    return [true, JSON.parse(id_str).index];
+                }
+            }
+
+            // Handle cancel and confirm buttons
+            const trigger_id = ctx.triggered[0].prop_id.split(".")[0];
+            if (trigger_id === "cancel-delete-btn") {
+                return [false, null];
+            }
+            if (trigger_id === "confirm-delete-btn") {
+                return [false, no_update];
+            }
+
+            return [no_update, no_update];
+        }
+        """,
         [
             Output("delete-confirm-modal", "opened"),
             Output("journal-to-delete-store", "data"),
@@ -596,45 +714,53 @@ def register_home_callbacks(app):
         State("journal-to-delete-store", "data"),
         prevent_initial_call=True,
     )
-    def handle_delete_modal(delete_clicks, n_cancel, n_confirm, journal_to_delete):
-        ctx = callback_context
-        if not ctx.triggered or not any(ctx.triggered):
+
+    @app.callback(
+        Output("journal-deleted-store", "data"),
+        Output("journal-delete-status", "children"),
+        Input("confirm-delete-btn", "n_clicks"),
+        State("journal-to-delete-store", "data"),
+        background=True,
+        running=[
+            (Output("confirm-delete-btn", "disabled"), True, False),
+        ],
+        progress=[Output("journal-delete-progress", "children")],
+        progress_default=[""],
+        prevent_initial_call=True,
+    )
+    def process_journal_deletion(set_progress, n_clicks, journal_id):
+        if not n_clicks or not journal_id:
             return no_update, no_update
 
-        # Check if any of the delete buttons were actually clicked
-        delete_button_clicked = False
-        for trigger in ctx.triggered:
-            if (
-                "delete-journal-btn" in trigger["prop_id"]
-                and trigger.get("value") is not None
-            ):
-                delete_button_clicked = True
-                trigger_id = trigger["prop_id"]
-                break
+        set_progress(["Deleting journal..."])
 
-        if delete_button_clicked:
-            journal_id = json.loads(trigger_id.split(".")[0])["index"]
-            return True, journal_id
+        def report_progress(deleted):
+            set_progress([f"Deleting journal... {deleted} entries removed"])
 
-        # Handle cancel and confirm buttons
-        trigger_id_str = ctx.triggered[0]["prop_id"].split(".")[0]
-        if trigger_id_str in ["cancel-delete-btn", "confirm-delete-btn"]:
-            return False, None
+        deleted = delete_journal(journal_id, on_progress=report_progress)
+        set_progress([""])
+        if deleted:
+            return (
+                {
+                    "source": "delete",
+                    "status": "success",
+                    "journal_id": journal_id,
+                    "deleted_documents": deleted,
+                },
+                "",
+            )
 
-        return no_update, no_update
+        return no_update, "Failed to delete journal."
 
     @app.callback(
         Output("journal-update-trigger-store", "data", allow_duplicate=True),
-        Input("confirm-delete-btn", "n_clicks"),
-        State("journal-to-delete-store", "data"),
+        Input("journal-deleted-store", "data"),
         prevent_initial_call=True,
     )
-    def process_journal_deletion(n_clicks, journal_id):
-        if not n_clicks or not journal_id:
+    def refresh_after_deletion(deletion):
+        if not deletion:
             return no_update
-
-        if delete_journal(journal_id):
-            # Trigger a refresh of the journal list
-            return {"source": "delete", "status": "success", "journal_id": journal_id}
-
-        return no_update
+        # The deletion may have run in another worker; update this worker's
+        # caches and indexes before the journal list is refreshed
+        sync_journal(deletion["journal_id"])
+        return deletion
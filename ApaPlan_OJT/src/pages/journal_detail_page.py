@@ -1,15 +1,25 @@
+import dash
 from dash import html, dcc, Input, Output, State
 import dash_mantine_components as dmc
-from src.shared.journal_utils import get_journal_with_details, get_user_profiles_by_ids, fetch_all_journal_places
+from src.shared.journal_utils import get_user_profiles_by_ids, fetch_all_journal_places, journal_aggregates, get_journal_revision
+from src.shared import session_store
 from src.shared.auth_utils import get_user_info
 from src.components.timeline import create_timeline
 from datetime import datetime, timedelta
 
+def format_place_count(journal):
+    aggregates = journal_aggregates(journal)
+    if aggregates is None:
+        return "Not available"
+    days_with_places = len(aggregates["per_day_counts"])
+    return f"{aggregates['place_count']} across {days_with_places} day(s)"
+
+
 def journal_detail_layout(journal_id=None, auth_data=None):
     if not journal_id:
         return html.Div("No journal selected.")
 
-    journal = get_journal_with_details(journal_id)
+    journal, handle = session_store.load_journal(journal_id)
     if not journal:
         return html.Div("Journal not found.")
 
@@ -34,7 +44,7 @@ def journal_detail_layout(journal_id=None, auth_data=None):
     status = journal.get("status", "draft")
 
     return html.Div([
-        dcc.Store(id='journal-detail-store', data=journal),
+        dcc.Store(id='journal-detail-store', data=handle),
         dcc.Interval(id='journal-detail-interval', interval=5000, n_intervals=0),
         dcc.Link(dmc.Button("Back to Home", variant="outline"), href="/home"),
         dmc.Group(
@@ -89,6 +99,15 @@ def journal_detail_layout(journal_id=None, auth_data=None):
                                 ),
                             ]
                         ),
+                        dmc.Group(
+                            [
+                                dmc.Text("Places:", fw=500),
+                                dmc.Text(
+                                    id="journal-place-count",
+                                    children=format_place_count(journal),
+                                ),
+                            ]
+                        ),
                         dmc.Group([
                             dmc.Text("Total Cost:", fw=500),
                             dmc.Text(id='journal-total-cost', children=f"{journal.get('total_cost', 'N/A')} {journal.get('currency', '')}")
@@ -129,14 +148,20 @@ def register_journal_detail_callbacks(app):
         Output('journal-detail-store', 'data'),
         Input('journal-detail-interval', 'n_intervals'),
         State('url', 'pathname'),
+        State('journal-detail-store', 'data'),
     )
-    def refresh_journal_data(n, pathname):
+    def refresh_journal_data(n, pathname, handle):
         journal_id = pathname.split('/')[2]
         if not journal_id:
             return dash.no_update
-        
-        journal = get_journal_with_details(journal_id)
-        return journal
+
+        # Only the revision is read while the journal is unchanged
+        revision = get_journal_revision(journal_id)
+        if handle and handle.get("id") == journal_id and handle.get("revision") == revision:
+            return dash.no_update
+
+        _, handle = session_store.load_journal(journal_id)
+        return handle
 
     @app.callback(
         Output('timeline-container', 'children'),
@@ -147,9 +172,11 @@ def register_journal_detail_callbacks(app):
         Output("journal-start-date", "children"),
         Output("journal-duration", "children"),
         Output('journal-total-cost', 'children'),
+        Output('journal-place-count', 'children'),
         Input('journal-detail-store', 'data')
     )
-    def update_journal_detail_view(journal):
+    def update_journal_detail_view(handle):
+        journal = session_store.get_journal(handle)
         if not journal:
             return dash.no_update
 
@@ -182,4 +209,5 @@ def register_journal_detail_callbacks(app):
             start_date_str,
             duration,
             total_cost,
+            format_place_count(journal),
         )
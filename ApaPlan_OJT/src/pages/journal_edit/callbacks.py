@@ -3,23 +3,33 @@ from dash import html, dcc, Input, Output, State, no_update, ClientsideFunction,
 import dash_mantine_components as dmc
 from datetime import datetime, timedelta
 import logging
-import plotly.graph_objects as go
 from src.shared.journal_utils import (
-    get_journal_with_details,
     update_journal,
     upload_cover_image,
     delete_cover_image,
     save_places_to_journal,
     fetch_journal_places,
     fetch_all_journal_places,
+    delete_journal_place,
+    get_journal,
 )
 from src.shared.auth_utils import get_user_info
+from src.shared.itinerary import optimize_day
+from src.shared.summary import summarize_journal, render_summary
+from src.shared import session_store
 from src.components.timeline import create_timeline
 from .layout import create_journal_edit_layout
 
 logging.basicConfig(level=logging.INFO)
 
 
+def _owns_journal(auth_data, journal_id):
+    """Whether the signed-in user owns the journal, as load_journal_data checks."""
+    journal = get_journal(journal_id)
+    user_info = get_user_info(auth_data.get("idToken")) if auth_data else None
+    return bool(journal and user_info and user_info.uid == journal.get("user_id"))
+
+
 def register_journal_edit_callbacks(app):
     @app.callback(
         Output("journal-edit-store", "data"),
@@ -42,7 +52,7 @@ def register_journal_edit_callbacks(app):
             )
 
         journal_id = parts[2]
-        journal = get_journal_with_details(journal_id)
+        journal, handle = session_store.load_journal(journal_id)
 
         if not journal:
             return (
@@ -62,7 +72,8 @@ def register_journal_edit_callbacks(app):
             )
 
         edit_layout = create_journal_edit_layout(journal)
-        return journal, edit_layout, True
+        # The browser keeps only the handle; callbacks read the journal from the session store
+        return handle, edit_layout, True
 
     @app.callback(
         Output("output-image-upload", "src"),
@@ -86,18 +97,23 @@ def register_journal_edit_callbacks(app):
         State("journal-edit-store", "data"),
         prevent_initial_call=True,
     )
-    def toggle_journal_status(n_clicks, journal_data):
+    def toggle_journal_status(n_clicks, journal_handle):
         if not n_clicks:
             return no_update, no_update, no_update, no_update, no_update, True, "green"
 
+        journal_data = session_store.get_journal(journal_handle)
+        if not journal_data:
+            return no_update, no_update, no_update, no_update, "Journal not found.", False, "red"
+
         journal_id = journal_data.get("id")
         current_status = journal_data.get("status", "draft")
         new_status = "public" if current_status == "draft" else "draft"
 
         if update_journal(journal_id, {"status": new_status}):
-            journal_data["status"] = new_status
+            # The update bumped the revision, so the old handle is stale
+            _, journal_handle = session_store.load_journal(journal_id)
             return (
-                journal_data,
+                journal_handle,
                 new_status.capitalize(),
                 "Publish" if new_status == "draft" else "Unpublish",
                 "green" if new_status == "draft" else "orange",
@@ -122,6 +138,7 @@ def register_journal_edit_callbacks(app):
             Output("edit-notification", "hide", allow_duplicate=True),
             Output("edit-notification", "color", allow_duplicate=True),
             Output("url", "pathname", allow_duplicate=True),
+            Output("journal-changed-store", "data", allow_duplicate=True),
         ],
         [Input("save-journal-changes-btn", "n_clicks")],
         [
@@ -136,11 +153,16 @@ def register_journal_edit_callbacks(app):
             State("upload-image-edit", "contents"),
             State("upload-image-edit", "filename"),
         ],
+        background=True,
+        running=[
+            (Output("save-journal-changes-btn", "loading"), True, False),
+            (Output("toggle-status-btn", "disabled"), True, False),
+        ],
         prevent_initial_call=True,
     )
     def handle_save_journal(
         n_clicks,
-        journal_data,
+        journal_handle,
         title,
         summary,
         introduction,
@@ -152,9 +174,9 @@ def register_journal_edit_callbacks(app):
         image_filename,
     ):
         if not n_clicks:
-            return no_update, True, "green", no_update
+            return no_update, True, "green", no_update, no_update
 
-        journal_id = journal_data.get("id")
+        journal_id = journal_handle.get("id")
 
         update_payload = {
             "title": title,
@@ -173,7 +195,7 @@ def register_journal_edit_callbacks(app):
             if image_url:
                 update_payload["cover_image_url"] = image_url
             else:
-                return "Failed to upload cover image.", False, "red", no_update
+                return "Failed to upload cover image.", False, "red", no_update, no_update
 
         update_payload = {k: v for k, v in update_payload.items()
                           if v is not None}
@@ -184,9 +206,10 @@ def register_journal_edit_callbacks(app):
                 False,
                 "green",
                 f"/journal/{journal_id}/view",
+                {"journal_id": journal_id, "at": datetime.now().isoformat()},
             )
         else:
-            return "Failed to update journal.", False, "red", no_update
+            return "Failed to update journal.", False, "red", no_update, no_update
 
     @app.callback(
         [
@@ -199,11 +222,11 @@ def register_journal_edit_callbacks(app):
         [State("journal-edit-store", "data")],
         prevent_initial_call=True,
     )
-    def handle_delete_cover_image(n_clicks, journal_data):
+    def handle_delete_cover_image(n_clicks, journal_handle):
         if not n_clicks:
             return no_update, True, "green", no_update
 
-        journal_id = journal_data.get("id")
+        journal_id = journal_handle.get("id")
         if delete_cover_image(journal_id):
             return "Cover image deleted.", False, "blue", f"/journal/{journal_id}/edit"
         else:
@@ -213,28 +236,23 @@ def register_journal_edit_callbacks(app):
         Output("journal-summary-input", "value"),
         Input("generate-summary-btn", "n_clicks"),
         State("journal-edit-store", "data"),
+        # Not a background callback: the summary is memoized in the
+        # summary_cache of the worker serving the page
+        running=[
+            (Output("generate-summary-btn", "loading"), True, False),
+        ],
         prevent_initial_call=True,
     )
-    def generate_summary(n_clicks, journal_data):
+    def generate_summary(n_clicks, journal_handle):
         if not n_clicks:
             return no_update
 
-        journal_id = journal_data.get("id")
-        all_places = fetch_all_journal_places(journal_id)
-
-        if not all_places:
-            return "No places found to generate a summary."
+        journal_id = journal_handle.get("id")
+        summary = summarize_journal(journal_id)
+        if summary is None:
+            return "Journal not found."
 
-        # Simple summary based on place names
-        place_names = [place.get("name") for place in all_places if place.get("name")]
-        
-        if not place_names:
-            return "No places with names found to generate a summary."
-
-        # Create a simple summary string
-        summary = f"This journey includes visits to: {', '.join(sorted(list(set(place_names))))}."
-        
-        return summary
+        return render_summary(summary)
 
     @app.callback(
         Output("full-timeline-container", "children"),
@@ -243,7 +261,8 @@ def register_journal_edit_callbacks(app):
         Input("journal-days-input", "value"),
         Input("timeline-update-store", "data"),
     )
-    def update_timeline_tabs(journal_data, start_date_str, days, _):
+    def update_timeline_tabs(journal_handle, start_date_str, days, _):
+        journal_data = session_store.get_journal(journal_handle)
         if not journal_data:
             return dmc.Text("Loading journal data...", c="dimmed")
 
@@ -313,15 +332,19 @@ def register_journal_edit_callbacks(app):
         
         return True, {'date': date_str}, day_options, [date_str]
 
-    @app.callback(
+    app.clientside_callback(
+        """
+        function(n_clicks) {
+            if (n_clicks) {
+                return false;
+            }
+            return window.dash_clientside.no_update;
+        }
+        """,
         Output("add-place-modal", "opened", allow_duplicate=True),
         Input("cancel-add-place-btn", "n_clicks"),
         prevent_initial_call=True,
     )
-    def close_add_place_modal(n_clicks):
-        if n_clicks:
-            return False
-        return no_update
 
     app.clientside_callback(
         """
@@ -381,35 +404,13 @@ def register_journal_edit_callbacks(app):
 
         return name, address, types, coords, opening_hours, phone, website, friendliness
 
-    @app.callback(
-        Output('gmaps-data-poller', 'disabled'),
-        Input('add-place-modal', 'opened')
-    )
-    def toggle_gmaps_poller(opened):
-        return not opened
-
-    app.clientside_callback(
-        """
-        function(n_intervals) {
-            if (window.gmaps_selected_place) {
-                const data = window.gmaps_selected_place;
-                window.gmaps_selected_place = null; // Clear the global variable
-                return data;
-            }
-            return window.dash_clientside.no_update;
-        }
-        """,
-        Output('gmaps-place-data-store', 'data'),
-        Input('gmaps-data-poller', 'n_intervals')
-    )
-
     @app.callback(
         Output("add-place-modal", "opened", allow_duplicate=True),
         Output("edit-notification", "children", allow_duplicate=True),
         Output("edit-notification", "hide", allow_duplicate=True),
         Output("edit-notification", "color", allow_duplicate=True),
-        Output("confirm-add-place-btn", "loading"),
         Output("timeline-update-store", "data"),
+        Output("journal-changed-store", "data", allow_duplicate=True),
         Input("confirm-add-place-btn", "n_clicks"),
         State("url", "pathname"),
         State("gmaps-place-data-store", "data"),
@@ -417,6 +418,11 @@ def register_journal_edit_callbacks(app):
         State("place-description-textarea", "value"),
         State("place-type-multiselect", "value"),
         State("place-friendliness-checkbox", "value"),
+        background=True,
+        running=[
+            (Output("confirm-add-place-btn", "loading"), True, False),
+            (Output("cancel-add-place-btn", "disabled"), True, False),
+        ],
         prevent_initial_call=True,
     )
     def handle_confirm_add_place(
@@ -429,7 +435,7 @@ def register_journal_edit_callbacks(app):
         friendliness,
     ):
         if not n_clicks:
-            return no_update, no_update, True, "green", False, no_update
+            return no_update, no_update, True, "green", no_update, no_update
 
         journal_id = pathname.split("/")[2]
 
@@ -439,7 +445,7 @@ def register_journal_edit_callbacks(app):
                 "No place data found. Please select a place from the search box.",
                 False,
                 "red",
-                False,
+                no_update,
                 no_update,
             )
 
@@ -449,7 +455,7 @@ def register_journal_edit_callbacks(app):
                 "Please select at least one date.",
                 False,
                 "red",
-                False,
+                no_update,
                 no_update,
             )
 
@@ -472,13 +478,80 @@ def register_journal_edit_callbacks(app):
             places_to_save.append(place_data)
 
         if save_places_to_journal(journal_id, places_to_save):
-            return False, "Place(s) added successfully!", False, "green", False, datetime.now().isoformat()
+            now = datetime.now().isoformat()
+            return (
+                False,
+                "Place(s) added successfully!",
+                False,
+                "green",
+                now,
+                {"journal_id": journal_id, "at": now},
+            )
         else:
             return (
                 no_update,
                 "Failed to save place for one or more dates. Please try again.",
                 False,
                 "red",
-                False,
+                no_update,
                 no_update,
             )
+
+    @app.callback(
+        Output("edit-notification", "children", allow_duplicate=True),
+        Output("edit-notification", "hide", allow_duplicate=True),
+        Output("edit-notification", "color", allow_duplicate=True),
+        Output("timeline-update-store", "data", allow_duplicate=True),
+        Input({'type': 'optimize-day-btn', 'date': ALL}, 'n_clicks'),
+        State("url", "pathname"),
+        State("auth-store", "data"),
+        prevent_initial_call=True,
+    )
+    def handle_optimize_day(n_clicks, pathname, auth_data):
+        if not any(n_clicks):
+            return no_update, no_update, no_update, no_update
+
+        ctx = dash.callback_context
+        if not ctx.triggered or not ctx.triggered[0].get("value"):
+            return no_update, no_update, no_update, no_update
+
+        journal_id = pathname.split("/")[2]
+        if not _owns_journal(auth_data, journal_id):
+            return "You are not authorized to edit this journal.", False, "red", no_update
+        date_str = ctx.triggered_id["date"]
+
+        result = optimize_day(journal_id, date_str)
+        if result is None:
+            return "Failed to optimize the route.", False, "red", no_update
+
+        message = (
+            f"Route optimized: {result['before_km']} km -> {result['after_km']} km."
+        )
+        return message, False, "green", datetime.now().isoformat()
+
+    @app.callback(
+        Output("edit-notification", "children", allow_duplicate=True),
+        Output("edit-notification", "hide", allow_duplicate=True),
+        Output("edit-notification", "color", allow_duplicate=True),
+        Output("timeline-update-store", "data", allow_duplicate=True),
+        Input({'type': 'delete-place-btn', 'index': ALL}, 'n_clicks'),
+        State("url", "pathname"),
+        State("auth-store", "data"),
+        prevent_initial_call=True,
+    )
+    def handle_delete_place(n_clicks, pathname, auth_data):
+        if not any(n_clicks):
+            return no_update, no_update, no_update, no_update
+
+        ctx = dash.callback_context
+        if not ctx.triggered or not ctx.triggered[0].get("value"):
+            return no_update, no_update, no_update, no_update
+
+        journal_id = pathname.split("/")[2]
+        if not _owns_journal(auth_data, journal_id):
+            return "You are not authorized to edit this journal.", False, "red", no_update
+        journal_place_doc_id = ctx.triggered_id["index"]
+
+        if delete_journal_place(journal_id, journal_place_doc_id):
+            return "Place removed.", False, "blue", datetime.now().isoformat()
+        return "Failed to remove place.", False, "red", no_update
@@ -4,7 +4,6 @@ import dash_mantine_components as dmc
 from dash_iconify import DashIconify
 import os
 from dotenv import load_dotenv
-import plotly.graph_objects as go
 from src.shared.journal_utils import get_currency_data
 
 load_dotenv()
@@ -13,6 +12,9 @@ GOOGLE_MAPS_API_KEY = os.getenv("GOOGLE_MAPS_API_KEY")
 
 def create_initial_map():
     """Creates an initial empty map figure."""
+    # plotly is slow to import and nothing on the page needs it at startup
+    import plotly.graph_objects as go
+
     fig = go.Figure(go.Scattermapbox())
     fig.update_layout(
         mapbox_style="open-street-map",
@@ -214,7 +216,6 @@ def journal_edit_layout(journal_id=None, auth_data=None):
                         styles={'dropdown': {'zIndex': 10001}}
                     ),
                     dcc.Store(id='gmaps-place-data-store'),
-                    dcc.Interval(id='gmaps-data-poller', interval=200, disabled=True),
                     dmc.TextInput(id='place-autocomplete-input', label="Search for a place"),
                     html.Div(id='map-canvas', style={'height': '300px', 'marginTop': '1rem'}),
                     dmc.Grid(
@@ -112,23 +112,29 @@ def register_login_callbacks(app):
             )
             return dash.no_update, alert
 
-    # Signup Modal Open
-    @app.callback(
+    # Signup Modal Open (clientside)
+    app.clientside_callback(
+        """
+        function(n_clicks) {
+            return Boolean(n_clicks);
+        }
+        """,
         Output("signup_modal", "opened"),
         Input("signup_btn", "n_clicks"),
         prevent_initial_call=True
     )
-    def open_signup(n_clicks):
-        return True if n_clicks else False
 
-    # Reset Modal Open
-    @app.callback(
+    # Reset Modal Open (clientside)
+    app.clientside_callback(
+        """
+        function(n_clicks) {
+            return Boolean(n_clicks);
+        }
+        """,
         Output("reset_modal", "opened"),
         Input("reset_btn", "n_clicks"),
         prevent_initial_call=True
     )
-    def open_reset(n_clicks):
-        return True if n_clicks else False
 
     # Signup Submit
     @app.callback(
@@ -238,25 +238,33 @@ def register_profile_callbacks(app):
         else:
             return dash.no_update, dash.no_update, dmc.Alert("Failed to delete avatar.", color="red")
 
-    @app.callback(
+    # Toggle edit mode (clientside)
+    app.clientside_callback(
+        """
+        function(n_clicks, in_edit_mode) {
+            return !in_edit_mode;
+        }
+        """,
         Output("edit-mode-store", "data"),
         Input("edit-profile-icon", "n_clicks"),
         State("edit-mode-store", "data"),
         prevent_initial_call=True,
     )
-    def toggle_edit_mode(n_clicks, in_edit_mode):
-        return not in_edit_mode
 
-    @app.callback(
+    # Show the view or edit section (clientside)
+    app.clientside_callback(
+        """
+        function(in_edit_mode) {
+            if (in_edit_mode) {
+                return [{"display": "none"}, {"display": "block"}];
+            }
+            return [{"display": "block"}, {"display": "none"}];
+        }
+        """,
         Output("profile-view-mode", "style"),
         Output("profile-edit-mode", "style"),
         Input("edit-mode-store", "data"),
     )
-    def update_profile_visibility(in_edit_mode):
-        if in_edit_mode:
-            return {"display": "none"}, {"display": "block"}
-        else:
-            return {"display": "block"}, {"display": "none"}
 
     @app.callback(
         Output("profile-status", "children"),
@@ -293,16 +301,21 @@ def register_profile_callbacks(app):
         else:
             return dmc.Alert("Failed to update profile.", color="red"), True, dash.no_update, dash.no_update
 
-    @app.callback(
+    # Toggle the password modal (clientside)
+    app.clientside_callback(
+        """
+        function(n_clicks, is_opened) {
+            if (n_clicks) {
+                return !is_opened;
+            }
+            return is_opened;
+        }
+        """,
         Output("password-modal", "opened"),
         Input("change-password-btn", "n_clicks"),
         State("password-modal", "opened"),
         prevent_initial_call=True,
     )
-    def toggle_password_modal(n_clicks, is_opened):
-        if n_clicks:
-            return not is_opened
-        return is_opened
 
     @app.callback(
         Output("update_status", "children"),
@@ -0,0 +1,428 @@
+import os
+import math
+import time
+import logging
+import threading
+import numpy as np
+from firebase_admin import firestore
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Precision of the geohash stored on every place document (~4.8 m cells).
+# Any shorter prefix of it is a coarser cell, which is what range queries use.
+GEOHASH_PRECISION = 9
+
+# Cell precision of the in-memory grid (~4.9 km x 4.9 km cells)
+GRID_PRECISION = 5
+
+# Above this many grid cells a query just scans every point with NumPy
+MAX_GRID_CELLS = 400
+
+# The grid is rebuilt from Firestore once it is older than this many seconds,
+# to pick up places saved by other workers and instances
+GEO_INDEX_MAX_AGE = int(os.getenv("GEO_INDEX_MAX_AGE", "900"))
+
+# A failed first build is retried after this many seconds
+GEO_INDEX_RETRY_S = 60
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+# Approximate cell size (height_km, width_km at the equator) per precision
+_CELL_SIZE_KM = {
+    1: (5000.0, 5000.0),
+    2: (625.0, 1250.0),
+    3: (156.0, 156.0),
+    4: (19.5, 39.1),
+    5: (4.89, 4.89),
+    6: (0.61, 1.22),
+    7: (0.153, 0.153),
+    8: (0.019, 0.038),
+    9: (0.0048, 0.0048),
+}
+
+
+def encode_geohash(lat, lng, precision=GEOHASH_PRECISION):
+    """Encodes a coordinate as a geohash string."""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        rng, value = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits = bits << 1
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(chars)
+
+
+def haversine_km(lat, lng, lats, lngs):
+    """Great-circle distance in km from one point to arrays of points."""
+    lat1 = math.radians(lat)
+    lats2 = np.radians(lats)
+    dlat = lats2 - lat1
+    dlng = np.radians(lngs) - math.radians(lng)
+    a = np.sin(dlat / 2) ** 2 + math.cos(lat1) * np.cos(lats2) * np.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def _bounding_box(lat, lng, radius_km):
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+    dlng = min(math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat)), 180.0)
+    return (
+        max(lat - dlat, -90.0),
+        min(lat + dlat, 90.0),
+        lng - dlng,
+        lng + dlng,
+    )
+
+
+def _cell_steps(precision):
+    """Half a cell in degrees (lat, lng), so stepping by it cannot skip a cell."""
+    height_km, width_km = _CELL_SIZE_KM[precision]
+    return height_km / 111.32 / 2, width_km / 111.32 / 2
+
+
+def estimate_cell_count(lat, lng, radius_km, precision):
+    """Rough number of cells covering_cells() would return."""
+    min_lat, max_lat, min_lng, max_lng = _bounding_box(lat, lng, radius_km)
+    lat_step, lng_step = _cell_steps(precision)
+    return ((max_lat - min_lat) / lat_step / 2 + 1) * ((max_lng - min_lng) / lng_step / 2 + 1)
+
+
+def covering_cells(lat, lng, radius_km, precision):
+    """
+    Returns the geohash cells at `precision` that cover the bounding box of
+    the circle, by stepping across the box half a cell at a time.
+    """
+    min_lat, max_lat, min_lng, max_lng = _bounding_box(lat, lng, radius_km)
+    lat_step, lng_step = _cell_steps(precision)
+    cells = set()
+    cur_lat = min_lat
+    while True:
+        cur_lng = min_lng
+        while True:
+            wrapped_lng = (cur_lng + 180.0) % 360.0 - 180.0
+            cells.add(encode_geohash(cur_lat, wrapped_lng, precision))
+            if cur_lng >= max_lng:
+                break
+            cur_lng = min(cur_lng + lng_step, max_lng)
+        if cur_lat >= max_lat:
+            break
+        cur_lat = min(cur_lat + lat_step, max_lat)
+    return cells
+
+
+def _query_precision(radius_km):
+    """Finest geohash precision whose cells are still at least radius_km wide."""
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height_km, width_km = _CELL_SIZE_KM[precision]
+        if min(height_km, width_km) >= radius_km:
+            return precision
+    return 1
+
+
+def _coordinates(place_data):
+    point = place_data.get("coordinates")
+    if point is None:
+        return None
+    return point.latitude, point.longitude
+
+
+class PlaceGridIndex:
+    """
+    In-memory grid over place coordinates. Places are bucketed by geohash
+    cell; a radius query only looks at the cells around the point and
+    filters the candidates with a vectorized haversine.
+    """
+
+    def __init__(self, precision=GRID_PRECISION):
+        self.precision = precision
+        self._lock = threading.RLock()
+        self._cells = {}           # cell -> {place_id: (lat, lng)}
+        self._place_cells = {}     # place_id -> cell
+        self._place_journals = {}  # place_id -> set of journal ids
+        self._journal_places = {}  # journal_id -> set of place ids
+        self._all = None           # cached (ids, points) for full scans
+        self.built_at = time.time()
+
+    def __len__(self):
+        return len(self._place_cells)
+
+    def add_place(self, place_id, lat, lng):
+        cell = encode_geohash(lat, lng, self.precision)
+        with self._lock:
+            old_cell = self._place_cells.get(place_id)
+            if old_cell is not None:
+                self._cells[old_cell].pop(place_id, None)
+            self._cells.setdefault(cell, {})[place_id] = (lat, lng)
+            self._place_cells[place_id] = cell
+            self._all = None
+
+    def has_place(self, place_id):
+        return place_id in self._place_cells
+
+    def add_journal_place(self, journal_id, place_id):
+        with self._lock:
+            self._place_journals.setdefault(place_id, set()).add(journal_id)
+            self._journal_places.setdefault(journal_id, set()).add(place_id)
+
+    def remove_journal(self, journal_id):
+        with self._lock:
+            for place_id in self._journal_places.pop(journal_id, ()):
+                journal_ids = self._place_journals.get(place_id)
+                if journal_ids is not None:
+                    journal_ids.discard(journal_id)
+                    if not journal_ids:
+                        del self._place_journals[place_id]
+
+    def set_journal_places(self, journal_id, place_ids):
+        """Replaces the places linked to a journal."""
+        with self._lock:
+            self.remove_journal(journal_id)
+            for place_id in place_ids:
+                self.add_journal_place(journal_id, place_id)
+
+    def _candidates(self, lat, lng, radius_km):
+        if estimate_cell_count(lat, lng, radius_km, self.precision) > MAX_GRID_CELLS:
+            if self._all is None:
+                ids, points = [], []
+                for bucket in self._cells.values():
+                    ids.extend(bucket.keys())
+                    points.extend(bucket.values())
+                self._all = (ids, np.array(points, dtype=float).reshape(-1, 2))
+            return self._all
+        ids, points = [], []
+        for cell in covering_cells(lat, lng, radius_km, self.precision):
+            bucket = self._cells.get(cell)
+            if bucket:
+                ids.extend(bucket.keys())
+                points.extend(bucket.values())
+        return ids, np.array(points, dtype=float).reshape(-1, 2)
+
+    def places_within(self, lat, lng, radius_km, limit=None):
+        """
+        Returns [(place_id, distance_km)] for places within radius_km,
+        nearest first.
+        """
+        with self._lock:
+            ids, points = self._candidates(lat, lng, radius_km)
+        if not ids:
+            return []
+        distances = haversine_km(lat, lng, points[:, 0], points[:, 1])
+        inside = np.nonzero(distances <= radius_km)[0]
+        inside = inside[np.argsort(distances[inside], kind="stable")]
+        if limit is not None:
+            inside = inside[:limit]
+        return [(ids[i], float(distances[i])) for i in inside]
+
+    def journals_within(self, lat, lng, radius_km):
+        """
+        Returns {journal_id: number of its places in the area} for journals
+        with at least one place within radius_km.
+        """
+        counts = {}
+        with self._lock:
+            for place_id, _ in self.places_within(lat, lng, radius_km):
+                for journal_id in self._place_journals.get(place_id, ()):
+                    counts[journal_id] = counts.get(journal_id, 0) + 1
+        return counts
+
+
+def build_from_firestore(index=None):
+    """Loads every place and journal place link into a grid index."""
+    db = firestore.client()
+    index = index or PlaceGridIndex()
+    for doc in db.collection("places").select(["coordinates"]).stream():
+        coords = _coordinates(doc.to_dict())
+        if coords:
+            index.add_place(doc.id, *coords)
+    for doc in db.collection_group("journalPlaces").select(["placeRef"]).stream():
+        place_ref = doc.to_dict().get("placeRef")
+        if place_ref is not None:
+            index.add_journal_place(doc.reference.parent.parent.id, place_ref.id)
+    return index
+
+
+def query_places_within(lat, lng, radius_km, limit=None):
+    """
+    Finds places within radius_km straight from Firestore, using range
+    queries on the stored geohash for the few cells covering the circle.
+    Returns [(place_id, place_data, distance_km)], nearest first.
+    """
+    db = firestore.client()
+    precision = _query_precision(radius_km)
+    candidates = {}
+    for cell in covering_cells(lat, lng, radius_km, precision):
+        query = (
+            db.collection("places")
+            .where("geohash", ">=", cell)
+            .where("geohash", "<=", cell + "~")
+        )
+        for doc in query.stream():
+            candidates[doc.id] = doc.to_dict()
+
+    ids, points = [], []
+    for place_id, place_data in candidates.items():
+        coords = _coordinates(place_data)
+        if coords:
+            ids.append(place_id)
+            points.append(coords)
+    if not ids:
+        return []
+    points = np.array(points, dtype=float)
+    distances = haversine_km(lat, lng, points[:, 0], points[:, 1])
+    order = [i for i in np.argsort(distances, kind="stable") if distances[i] <= radius_km]
+    if limit is not None:
+        order = order[:limit]
+    return [(ids[i], candidates[ids[i]], float(distances[i])) for i in order]
+
+
+def backfill_geohashes(batch_size=500):
+    """
+    Adds the geohash field to places created before it existed.
+    Returns the number of places updated.
+    """
+    db = firestore.client()
+    updated = 0
+    batch = db.batch()
+    pending = 0
+    for doc in db.collection("places").select(["coordinates", "geohash"]).stream():
+        place_data = doc.to_dict()
+        coords = _coordinates(place_data)
+        if not coords or place_data.get("geohash"):
+            continue
+        batch.update(doc.reference, {"geohash": encode_geohash(*coords)})
+        pending += 1
+        if pending == batch_size:
+            batch.commit()
+            updated += pending
+            batch = db.batch()
+            pending = 0
+    if pending:
+        batch.commit()
+        updated += pending
+    return updated
+
+
+_index = None
+_index_lock = threading.Lock()
+_rebuilding = False
+_build_started_at = None
+
+
+def _rebuild_in_background():
+    global _index, _rebuilding
+    try:
+        index = build_from_firestore()
+        with _index_lock:
+            _index = index
+    except Exception as e:
+        logging.warning(f"Place index rebuild failed: {e}")
+    finally:
+        with _index_lock:
+            _rebuilding = False
+
+
+def get_place_index():
+    """
+    Returns the process-wide grid index, or None until its first build has
+    finished. Builds never run in the caller's thread: the first call (made
+    by the warm-up) starts one in a background thread, and once the index is
+    too old a new one is built the same way while queries keep using the
+    current one. A failed first build is retried after GEO_INDEX_RETRY_S.
+    """
+    global _rebuilding, _build_started_at
+    with _index_lock:
+        now = time.time()
+        if _index is None:
+            due = _build_started_at is None or now - _build_started_at > GEO_INDEX_RETRY_S
+        else:
+            due = now - _index.built_at > GEO_INDEX_MAX_AGE
+        if due and not _rebuilding:
+            _rebuilding = True
+            _build_started_at = now
+            threading.Thread(target=_rebuild_in_background, name="geo-index", daemon=True).start()
+        return _index
+
+
+def places_within(lat, lng, radius_km, limit=None):
+    """
+    Places within radius_km of a point: [(place_id, distance_km)], nearest
+    first, or None while the index is being built.
+    """
+    index = get_place_index()
+    return None if index is None else index.places_within(lat, lng, radius_km, limit=limit)
+
+
+def journals_within(lat, lng, radius_km):
+    """
+    Journals visiting the area: {journal_id: number of places in it}, or
+    None while the index is being built.
+    """
+    index = get_place_index()
+    return None if index is None else index.journals_within(lat, lng, radius_km)
+
+
+# --- Write hooks (called from journal_utils after successful writes) ---
+
+def on_places_saved(journal_id, places_data):
+    if _index is None:
+        return
+    for place_data in places_data:
+        place_id = place_data.get("place_id")
+        location = place_data.get("location") or {}
+        if not place_id:
+            continue
+        if "lat" in location and "lng" in location:
+            _index.add_place(place_id, location["lat"], location["lng"])
+        _index.add_journal_place(journal_id, place_id)
+
+
+def refresh_journal(journal_id):
+    """
+    Re-reads the places of a journal and replaces its links, adding places
+    the grid does not have yet. Used when the change is not known place by
+    place, e.g. a removed place that the journal may still visit on another
+    day, or a change made in another worker.
+    """
+    if _index is None:
+        return
+    db = firestore.client()
+    places = (
+        db.collection("travelJournals").document(journal_id)
+        .collection("journalPlaces").select(["placeRef"]).stream()
+    )
+    place_refs = {}
+    for doc in places:
+        place_ref = doc.to_dict().get("placeRef")
+        if place_ref is not None:
+            place_refs[place_ref.id] = place_ref
+    new_refs = [ref for place_id, ref in place_refs.items() if not _index.has_place(place_id)]
+    if new_refs:
+        for doc in db.get_all(new_refs, field_paths=["coordinates"]):
+            coords = _coordinates(doc.to_dict() or {}) if doc.exists else None
+            if coords:
+                _index.add_place(doc.id, *coords)
+    _index.set_journal_places(journal_id, place_refs)
+
+
+def on_places_removed(journal_id):
+    refresh_journal(journal_id)
+
+
+def on_journal_deleted(journal_id):
+    if _index is not None:
+        _index.remove_journal(journal_id)
@@ -0,0 +1,116 @@
+import numpy as np
+from src.shared.geo_index import EARTH_RADIUS_KM
+from src.shared.journal_utils import fetch_journal_places, reorder_journal_places
+
+
+def distance_matrix(lats, lngs):
+    """Pairwise great-circle distances in km, as an n x n NumPy array."""
+    lats = np.radians(np.asarray(lats, dtype=float))
+    lngs = np.radians(np.asarray(lngs, dtype=float))
+    dlat = lats[:, None] - lats[None, :]
+    dlng = lngs[:, None] - lngs[None, :]
+    a = (
+        np.sin(dlat / 2) ** 2
+        + np.cos(lats)[:, None] * np.cos(lats)[None, :] * np.sin(dlng / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def route_length(route, dist):
+    """Length in km of an open route (no return to the start)."""
+    route = np.asarray(route)
+    if len(route) < 2:
+        return 0.0
+    return float(dist[route[:-1], route[1:]].sum())
+
+
+def nearest_neighbour_route(dist, start=0):
+    """Greedy route: always go to the closest stop not visited yet."""
+    n = len(dist)
+    route = [start]
+    visited = np.zeros(n, dtype=bool)
+    visited[start] = True
+    current = start
+    for _ in range(n - 1):
+        candidates = np.where(visited, np.inf, dist[current])
+        current = int(np.argmin(candidates))
+        visited[current] = True
+        route.append(current)
+    return np.array(route)
+
+
+def two_opt(route, dist, max_passes=50):
+    """
+    Improves an open route with 2-opt moves, keeping the first stop fixed.
+    For each edge (a, b), the gain of reversing the segment up to every
+    later stop c is computed at once, and the best improving move is applied.
+    """
+    route = np.array(route)
+    n = len(route)
+    for _ in range(max_passes):
+        improved = False
+        for i in range(n - 2):
+            a, b = route[i], route[i + 1]
+            c = route[i + 2:]
+            # Stop after c, or -1 when c is the last stop
+            d = np.append(route[i + 3:], -1)
+            has_next = d >= 0
+            d_safe = np.where(has_next, d, 0)
+            delta = dist[a, c] - dist[a, b]
+            delta += np.where(has_next, dist[b, d_safe] - dist[c, d_safe], 0.0)
+            k = int(np.argmin(delta))
+            if delta[k] < -1e-9:
+                j = i + 2 + k
+                route[i + 1:j + 1] = route[i + 1:j + 1][::-1].copy()
+                improved = True
+        if not improved:
+            break
+    return route
+
+
+def optimize_route(lats, lngs, start=0):
+    """
+    Orders stops to shorten the day's route: nearest neighbour from the
+    start stop, then 2-opt. Returns the order as a list of indices.
+    """
+    n = len(lats)
+    if n < 3:
+        return list(range(n))
+    dist = distance_matrix(lats, lngs)
+    route = nearest_neighbour_route(dist, start=start)
+    return [int(i) for i in two_opt(route, dist)]
+
+
+def optimize_day(journal_id, date):
+    """
+    Reorders the places of one journal day along a short route and writes
+    the new order back in a single batch. The day's current first place stays
+    first; places without coordinates keep their relative order at the end.
+    Returns a dict with the place count and route length before and after,
+    or None if the new order could not be saved.
+    """
+    places = fetch_journal_places(journal_id, date)
+    located = [p for p in places if p.get("coordinates") is not None]
+    unlocated = [p for p in places if p.get("coordinates") is None]
+
+    lats = [p["coordinates"].latitude for p in located]
+    lngs = [p["coordinates"].longitude for p in located]
+    order = optimize_route(lats, lngs)
+
+    if len(located) >= 2:
+        dist = distance_matrix(lats, lngs)
+        before_km = route_length(range(len(located)), dist)
+        after_km = route_length(order, dist)
+    else:
+        before_km = after_km = 0.0
+
+    ordered_ids = [located[i]["journal_place_doc_id"] for i in order]
+    ordered_ids += [p["journal_place_doc_id"] for p in unlocated]
+    if not reorder_journal_places(journal_id, ordered_ids):
+        return None
+
+    return {
+        "places": len(places),
+        "before_km": round(before_km, 2),
+        "after_km": round(after_km, 2),
+    }
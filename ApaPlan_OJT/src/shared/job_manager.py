@@ -0,0 +1,93 @@
+"""
+Background callback jobs run in threads of the worker.
+
+Dash's DiskcacheManager starts every background callback in a forked
+process. Our workers are multithreaded gthread workers with open gRPC
+channels, Redis connections and locks held by other threads, none of which
+survive a fork safely, and whatever a job cleared or indexed in its own
+process was lost with it. ThreadJobManager keeps DiskcacheManager's result
+store and signed job handles but runs each job in a bounded thread pool of
+the worker that received the request, so jobs share its clients, caches and
+indexes.
+
+Results, progress and a "running" marker per job live in the DiskCache that
+every worker on the instance shares, so a polling request may land on any
+worker. The marker holds the pid of the worker running the job: if that
+worker is gone (recycled, crashed) the job counts as lost, and Dash ends the
+callback without an update, as it does for a killed job process.
+
+Threads cannot be killed. Cancelling a job (a newer click of the same button,
+or leaving the page) only drops its marker, so Dash stops waiting for it; the
+job itself runs to the end, as a Celery task would.
+
+Settings:
+    BACKGROUND_JOB_THREADS   jobs run at once per worker (default 4); further
+                             jobs wait for a free thread
+"""
+import os
+import logging
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from dash import DiskcacheManager
+
+BACKGROUND_JOB_THREADS = int(os.getenv("BACKGROUND_JOB_THREADS", "4"))
+
+
+class ThreadJobManager(DiskcacheManager):
+    """DiskcacheManager that runs jobs in a thread pool instead of processes."""
+
+    def __init__(self, cache=None, cache_by=None, expire=None, max_workers=BACKGROUND_JOB_THREADS):
+        super().__init__(cache, cache_by=cache_by, expire=expire)
+        self.max_workers = max_workers
+        self._executor = None
+        self._executor_pid = None
+
+    def _get_executor(self):
+        # Created lazily in each worker: the app is imported in the gunicorn
+        # master, and threads do not survive the fork into the workers.
+        if self._executor_pid != os.getpid():
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="background-job"
+            )
+            self._executor_pid = os.getpid()
+        return self._executor
+
+    @staticmethod
+    def _marker_key(job):
+        return f"background-job-{int(job)}"
+
+    def call_job_fn(self, key, job_fn, args, context):
+        job = secrets.randbits(48)
+        # A result left by an earlier, cancelled job with the same inputs
+        # must not be taken for this job's result
+        self.clear_cache_entry(key)
+        self.clear_cache_entry(self._make_progress_key(key))
+        self.handle.set(self._marker_key(job), os.getpid())
+        self._get_executor().submit(self._run, job, key, job_fn, args, context)
+        return job
+
+    def _run(self, job, key, job_fn, args, context):
+        try:
+            job_fn(key, self._make_progress_key(key), args, context)
+        except Exception as e:
+            # job_fn stores callback errors as the result itself; this is
+            # only reached if storing the result failed
+            logging.error(f"Background job {job} failed: {e}")
+        finally:
+            self.handle.delete(self._marker_key(job))
+
+    def job_running(self, job):
+        import psutil  # installed with dash[diskcache]
+
+        pid = self.handle.get(self._marker_key(job))
+        return pid is not None and psutil.pid_exists(pid)
+
+    def terminate_job(self, job):
+        if job is not None:
+            self.handle.delete(self._marker_key(job))
+
+    def terminate_unhealthy_job(self, job):
+        if job is not None and not self.job_running(job):
+            self.terminate_job(job)
+            return True
+        return False
@@ -1,42 +1,128 @@
 import os
 from firebase_admin import firestore, storage
 from google.cloud.firestore_v1.document import DocumentReference
-from datetime import datetime
+from google.cloud.firestore_v1.field_path import FieldPath
 import base64
 import uuid
 import re
 import io
 import logging
-from cachetools import cached, TTLCache, keys
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from cachetools.keys import hashkey
+from src.shared import search_index, geo_index
+from src.shared.spans import timed
+from src.shared.shared_cache import TwoLevelCache, LockedTTLCache
+from src.shared.singleflight import SingleFlight
+from src.shared.serialization import to_jsonable
+from src.shared.models import Journal, JournalPlace, Place
+from src.shared.ordering import key_between, evenly_spaced_keys, MAX_RANK_LENGTH
+from src.shared.metrics import (
+    count_op,
+    counted,
+    FIRESTORE_READ,
+    FIRESTORE_WRITE,
+    STORAGE_OP,
+)
+
+# Journal documents by id, fresh for 5 minutes. Shared by all workers (see
+# shared_cache.py); writes call clear_journal_cache, so the TTL only bounds
+# changes made outside the app, and an expired journal is served for 5 more
+# minutes while it is reloaded in the background. Journals are written from
+# background jobs in any worker too, so without Redis they are not cached at all.
+journal_cache = TwoLevelCache(
+    "journal", maxsize=100, ttl=300, stale_ttl=300, require_shared=True
+)
+
+# User profiles by uid, fresh for 5 minutes and served stale for up to an
+# hour while reloading. Shared by all workers; profile writes call
+# clear_user_profile_cache.
+user_profile_cache = TwoLevelCache("user_profile", maxsize=5000, ttl=300, stale_ttl=3600)
+
+# Cache for the public "Discover" feed, with a TTL of 1 minute
+discover_cache = LockedTTLCache(maxsize=1, ttl=60)
+DISCOVER_CACHE_KEY = hashkey("public")
+
+# Map on each journal document with facts derived from its journalPlaces,
+# kept up to date by the functions that add, move or delete places:
+#   place_count, per_day_counts {date: n}, place_names {name: n},
+#   category_histogram {category: n}
+AGGREGATES_FIELD = "aggregates"
+
+# Counter on each journal document, incremented by every write to the journal
+# or its places except moves within a day, which write only the moved place.
+# Derived data is cached per (journal_id, revision), so other workers' writes
+# are picked up without explicit invalidation; the journal's cached places are
+# also dropped whenever the journal is cleared, which covers those moves.
+REVISION_FIELD = "revision"
+
+# Cache for the places of a journal, keyed by (journal_id, revision)
+journal_places_cache = LockedTTLCache(maxsize=100, ttl=300)
+
+# Cache for documents of the shared 'places' collection, keyed by path. Place
+# details are written once when a place is first added, and every journal
+# place visiting it shares the cached Place object. Shared by all workers.
+place_cache = TwoLevelCache("place", maxsize=5000, ttl=3600, stale_ttl=3600)
+
+# Coalesces concurrent loads of the same journal revision's places
+journal_places_flights = SingleFlight("journal_places")
+
+
+def _bump_revision():
+    return {REVISION_FIELD: firestore.Increment(1)}
+
+
+def _drop_discover_feed(journal_id):
+    # Any journal change may add, remove or alter a public journal
+    discover_cache.pop(DISCOVER_CACHE_KEY, None)
+
+
+def _drop_journal_places(journal_id):
+    # Moves within a day reorder the places without a new revision
+    journal_places_cache.discard_where(lambda key: key[0] == journal_id)
+
+
+# Run in every worker when any worker clears a journal
+journal_cache.on_invalidate(_drop_discover_feed)
+journal_cache.on_invalidate(_drop_journal_places)
 
-# Cache for journal data, with a TTL of 5 minutes
-journal_cache = TTLCache(maxsize=100, ttl=300)
 
-# Cache for user profiles, with a TTL of 5 minutes
-user_profile_cache = TTLCache(maxsize=100, ttl=300)
+def clear_journal_cache(journal_id):
+    """Clears the cache for a specific journal, in every worker."""
+    journal_cache.invalidate(journal_id)
 
 
-def clear_journal_cache(journal_id):
-    """Clears the cache for a specific journal."""
-    key = hashkey(journal_id)
-    if key in journal_cache:
-        del journal_cache[key]
+def _run_hook(hook, *args):
+    """
+    Runs an index hook after a successful write. The write has happened, so
+    a failing hook is logged and does not fail it.
+    """
+    try:
+        hook(*args)
+    except Exception as e:
+        logging.error(f"Error in {hook.__module__}.{hook.__name__} for {args[0]}: {e}")
 
 
-def _sanitize_for_json(data):
+def sync_journal(journal_id):
     """
-    Recursively sanitizes Firestore data types for JSON serialization.
+    Brings this worker up to date with a journal changed in another worker.
+    A background callback runs in whichever worker started it, so the local
+    cache entries it drops and the index updates it makes may not reach the
+    worker serving the browser's next request; that worker calls this once
+    the job has finished.
     """
-    if isinstance(data, dict):
-        return {k: _sanitize_for_json(v) for k, v in data.items()}
-    elif isinstance(data, list):
-        return [_sanitize_for_json(i) for i in data]
-    elif isinstance(data, DocumentReference):
-        return data.path
-    elif isinstance(data, datetime):
-        return data.isoformat()
-    return data
+    journal_cache.drop_local(journal_id)
+    _run_hook(search_index.refresh_journal, journal_id)
+    _run_hook(geo_index.refresh_journal, journal_id)
+
+
+def clear_user_profile_cache(uid):
+    """Clears the cached profile of a user, in every worker."""
+    user_profile_cache.invalidate(uid)
+
+
+# Kept under its old name for existing callers; see serialization.py
+_sanitize_for_json = to_jsonable
 
 
 # Assume db is initialized elsewhere, e.g., in your main app file
@@ -57,6 +143,7 @@ def get_journal_with_details(journal_id):
     return _sanitize_for_json(journal_data)
 
 
+@timed("travelJournals")
 def create_journal(
     user_id,
     title,
@@ -87,101 +174,127 @@ def create_journal(
                 "journal_entries": journal_entries or [],
                 "created_at": firestore.SERVER_TIMESTAMP,
                 "status": "draft",  # Set default status to draft
+                REVISION_FIELD: 0,
+                AGGREGATES_FIELD: {
+                    "place_count": 0,
+                    "per_day_counts": {},
+                    "place_names": {},
+                    "category_histogram": {},
+                },
             }
         )
+        count_op(FIRESTORE_WRITE)
         return journal_ref.id
     except Exception as e:
-        print(f"Error creating journal: {e}")
+        logging.error(f"Error creating journal: {e}")
         return None
 
 
+@timed("travelJournals")
 def get_user_journals(user_id):
     """
     Fetches all journals for a given user.
     """
     db = firestore.client()
     try:
-        journals_query = db.collection("travelJournals").where(
+        journals_query = counted(db.collection("travelJournals").where(
             "user_id", "==", user_id
-        ).stream()
-        journals = []
-        for journal in journals_query:
-            journal_data = journal.to_dict()
-            journal_data["id"] = journal.id
-            journals.append(journal_data)
-        return journals
+        ).stream())
+        return [Journal.from_snapshot(journal) for journal in journals_query]
     except Exception as e:
-        print(f"Error getting user journals: {e}")
+        logging.error(f"Error getting user journals: {e}")
         return []
 
 
 
 
-@cached(user_profile_cache, key=lambda user_ids: keys.hashkey(tuple(sorted(user_ids))))
+@timed("users")
 def get_user_profiles_by_ids(user_ids):
     """
     Fetches specific user profiles from the Firestore 'users' collection by their IDs.
-    Caches the results. The user_ids list is converted to a sorted tuple to be hashable.
+    Profiles are cached one by one in user_profile_cache, so only the users
+    not cached yet are read, once for all concurrent callers.
     """
-    db = firestore.client()
-    users = {}
     # Ensure user_ids is a list of unique strings
     unique_user_ids = list(set(filter(None, user_ids)))
 
     if not unique_user_ids:
-        return users
+        return {}
+    return user_profile_cache.get_many_or_load(unique_user_ids, _load_user_profiles)
+
 
+def _load_user_profiles(user_ids):
+    db = firestore.client()
+    users = {}
     # Firestore 'in' queries are limited to 30 items per query.
     # We need to batch the requests if there are more than 30 user_ids.
-    for i in range(0, len(unique_user_ids), 30):
-        batch_ids = unique_user_ids[i:i + 30]
+    for i in range(0, len(user_ids), 30):
+        batch_ids = user_ids[i:i + 30]
         try:
-            users_query = db.collection("users").where("__name__", "in", batch_ids).stream()
+            users_query = counted(
+                db.collection("users").where("__name__", "in", batch_ids).stream()
+            )
             for user in users_query:
                 user_data = user.to_dict()
                 users[user.id] = user_data
         except Exception as e:
-            print(f"Error getting user profiles by IDs: {e}")
+            logging.error(f"Error getting user profiles by IDs: {e}")
     return users
 
 
+@timed("travelJournals")
 def get_all_journals():
     """
     Fetches all public journals from all users.
+    Successful results are cached for a minute; failures are not cached.
     """
+    cached_journals = discover_cache.get(DISCOVER_CACHE_KEY)
+    if cached_journals is not None:
+        return cached_journals
+
     db = firestore.client()
     try:
-        journals_query = db.collection("travelJournals").where("status", "==", "public").stream()
-        journals = []
-        for journal in journals_query:
-            journal_data = journal.to_dict()
-            journal_data["id"] = journal.id
-            journals.append(journal_data)
+        journals_query = counted(
+            db.collection("travelJournals").where("status", "==", "public").stream()
+        )
+        journals = [Journal.from_snapshot(journal) for journal in journals_query]
+        discover_cache[DISCOVER_CACHE_KEY] = journals
         return journals
     except Exception as e:
-        print(f"Error getting all journals: {e}")
+        logging.error(f"Error getting all journals: {e}")
         return []
 
 
+@timed("travelJournals/{journal_id}")
 def get_journal(journal_id):
     """
-    Fetches a single journal by its ID.
+    Fetches a single journal by its ID. The journal is cached in
+    journal_cache, and concurrent misses share one read; each call returns
+    a new dict that callers may modify.
     """
-    db = firestore.client()
     try:
-        journal_ref = db.collection("travelJournals").document(journal_id)
-        journal = journal_ref.get()
-        if journal.exists:
-            journal_data = journal.to_dict()
-            journal_data["id"] = journal.id
-            return journal_data
-        else:
-            return None
+        journal_data = journal_cache.get_or_load(
+            journal_id, lambda: _load_journal(journal_id)
+        )
     except Exception as e:
-        print(f"Error getting journal: {e}")
+        logging.error(f"Error getting journal: {e}")
         return None
+    return dict(journal_data) if journal_data is not None else None
+
 
+def _load_journal(journal_id):
+    db = firestore.client()
+    journal_ref = db.collection("travelJournals").document(journal_id)
+    journal = journal_ref.get()
+    count_op(FIRESTORE_READ)
+    if not journal.exists:
+        return None
+    journal_data = journal.to_dict()
+    journal_data["id"] = journal.id
+    return journal_data
 
+
+@timed("travelJournals/{journal_id}")
 def update_journal(journal_id, update_data):
     """
     Updates a journal document in Firestore.
@@ -189,12 +302,14 @@ def update_journal(journal_id, update_data):
     db = firestore.client()
     try:
         journal_ref = db.collection("travelJournals").document(journal_id)
-        journal_ref.update(update_data)
+        journal_ref.update({**update_data, **_bump_revision()})
+        count_op(FIRESTORE_WRITE)
         clear_journal_cache(journal_id)
-        return True
     except Exception as e:
-        print(f"Error updating journal: {e}")
+        logging.error(f"Error updating journal: {e}")
         return False
+    _run_hook(search_index.on_journal_updated, journal_id, update_data)
+    return True
 
 
 def get_currency_data():
@@ -216,6 +331,7 @@ def get_currency_data():
     ]
 
 
+@timed("journal_covers/{journal_id}")
 def upload_cover_image(journal_id, contents, filename):
     """
     Uploads a cover image to Firebase Storage and updates the journal.
@@ -240,37 +356,84 @@ def upload_cover_image(journal_id, contents, filename):
         in_mem_file.seek(0)
         blob.upload_from_file(in_mem_file, content_type=content_type)
         blob.make_public()
+        count_op(STORAGE_OP, 2)
 
         public_url = blob.public_url
         update_journal(journal_id, {"cover_image_url": public_url})
 
         return public_url
     except Exception as e:
-        print(f"FATAL: Error uploading cover image: {e}")
+        logging.error(f"Error uploading cover image: {e}")
         return None
 
 
-def delete_journal(journal_id):
+def _delete_cover_blobs(journal_id):
+    """
+    Deletes every cover image ever uploaded for a journal.
+    Returns the number of blobs deleted.
     """
-    Deletes a journal and its sub-collections from Firestore.
+    bucket_name = os.getenv("STORAGE_BUCKET")
+    if not bucket_name:
+        return 0
+    bucket = storage.bucket(bucket_name)
+    blobs = list(bucket.list_blobs(prefix=f"journal_covers/{journal_id}/"))
+    count_op(STORAGE_OP)
+    if blobs:
+        bucket.delete_blobs(blobs, on_error=lambda blob: None)
+        count_op(STORAGE_OP, len(blobs))
+    return len(blobs)
+
+
+@timed("travelJournals/{journal_id}")
+def delete_journal(journal_id, on_progress=None):
+    """
+    Deletes a journal, its sub-collections and its cover images.
+    Each sub-collection is deleted in its own thread by Firestore's recursive
+    delete, which lists documents in chunks and removes them through a
+    BulkWriter (batched, parallel, rate-limited writes with retries).
+    If given, on_progress is called with the number of documents deleted so far.
+    Returns the number of Firestore documents deleted, or None on error.
     """
     db = firestore.client()
     journal_ref = db.collection("travelJournals").document(journal_id)
 
     try:
-        # Recursively delete sub-collections
-        for collection_ref in journal_ref.collections():
-            for doc in collection_ref.stream():
-                doc.reference.delete()
+        deleted = 0
+        collection_refs = list(journal_ref.collections())
+        if collection_refs:
+            with ThreadPoolExecutor(max_workers=min(len(collection_refs), 4)) as executor:
+                futures = [
+                    executor.submit(db.recursive_delete, collection_ref, chunk_size=500)
+                    for collection_ref in collection_refs
+                ]
+                for future in as_completed(futures):
+                    collection_deleted = future.result()
+                    count_op(FIRESTORE_WRITE, collection_deleted)
+                    deleted += collection_deleted
+                    if on_progress:
+                        on_progress(deleted)
 
         # Delete the journal document itself
         journal_ref.delete()
-        return True
+        count_op(FIRESTORE_WRITE)
+        deleted += 1
+        clear_journal_cache(journal_id)
     except Exception as e:
-        print(f"Error deleting journal: {e}")
-        return False
+        logging.error(f"Error deleting journal: {e}")
+        return None
+    _run_hook(search_index.on_journal_deleted, journal_id)
+    _run_hook(geo_index.on_journal_deleted, journal_id)
+
+    try:
+        _delete_cover_blobs(journal_id)
+    except Exception as e:
+        # The journal is gone; leftover covers are only wasted storage
+        logging.error(f"Error deleting cover images for journal {journal_id}: {e}")
 
+    return deleted
 
+
+@timed("travelJournals/{journal_id}")
 def delete_cover_image(journal_id):
     """
     Deletes a cover image from Firebase Storage and updates the journal.
@@ -291,13 +454,15 @@ def delete_cover_image(journal_id):
                 blob_name = match.group(1)
                 bucket = storage.bucket(bucket_name)
                 blob = bucket.blob(blob_name)
+                count_op(STORAGE_OP)
                 if blob.exists():
                     blob.delete()
+                    count_op(STORAGE_OP)
 
         update_journal(journal_id, {"cover_image_url": None})
         return True
     except Exception as e:
-        print(f"FATAL: Error deleting cover image: {e}")
+        logging.error(f"Error deleting cover image: {e}")
         return False
 
 
@@ -307,15 +472,17 @@ def _create_place_if_not_exists(transaction, place_ref, place_data):
     Checks if a place document exists and creates it if it doesn't, within a transaction.
     """
     place_snapshot = place_ref.get(transaction=transaction)
+    count_op(FIRESTORE_READ)
     if not place_snapshot.exists:
         # Extract general place information
         location = place_data.get("location", {})
+        lat, lng = location.get("lat", 0), location.get("lng", 0)
         general_place_data = {
             "name": place_data.get("name"),
             "address": place_data.get("address"),
-            "coordinates": firestore.GeoPoint(
-                location.get("lat", 0), location.get("lng", 0)
-            ),
+            "coordinates": firestore.GeoPoint(lat, lng),
+            # Lets "nearby" queries use range filters on geohash prefixes
+            "geohash": geo_index.encode_geohash(lat, lng),
             "google_place_id": place_data.get("place_id"),
             "website": place_data.get("website"),
             "rating": place_data.get("rating"),
@@ -326,20 +493,161 @@ def _create_place_if_not_exists(transaction, place_ref, place_data):
             "created_at": firestore.SERVER_TIMESTAMP,
         }
         transaction.set(place_ref, general_place_data)
+        count_op(FIRESTORE_WRITE)
+
+
+def _place_categories(place_data):
+    category = place_data.get("category")
+    if not category:
+        return []
+    if isinstance(category, str):
+        return [category]
+    return [c for c in category if c]
+
 
+def _aggregate_deltas(places_data, sign=1):
+    """Counts of each aggregate key (as a path inside the map) for some places."""
+    deltas = Counter()
+    for place_data in places_data:
+        deltas[("place_count",)] += sign
+        if place_data.get("date"):
+            deltas[("per_day_counts", place_data["date"])] += sign
+        if place_data.get("name"):
+            deltas[("place_names", place_data["name"])] += sign
+        for category in _place_categories(place_data):
+            deltas[("category_histogram", category)] += sign
+    return deltas
 
+
+def _aggregate_field(path):
+    # Quotes keys such as dates and place names that are not plain identifiers
+    return FieldPath(AGGREGATES_FIELD, *path).to_api_repr()
+
+
+def _aggregate_increments(deltas):
+    return {
+        _aggregate_field(path): firestore.Increment(delta)
+        for path, delta in deltas.items()
+        if delta
+    }
+
+
+def _has_aggregates(journal_ref, transaction=None):
+    snapshot = journal_ref.get(
+        field_paths=[f"{AGGREGATES_FIELD}.place_count"], transaction=transaction
+    )
+    count_op(FIRESTORE_READ)
+    return snapshot.exists and AGGREGATES_FIELD in (snapshot.to_dict() or {})
+
+
+def journal_aggregates(journal_data):
+    """
+    Returns the aggregates of a journal with empty entries dropped, or None
+    for journals whose aggregates have not been built yet.
+    """
+    aggregates = (journal_data or {}).get(AGGREGATES_FIELD)
+    if aggregates is None:
+        return None
+    return {
+        "place_count": max(aggregates.get("place_count", 0), 0),
+        **{
+            key: {k: n for k, n in (aggregates.get(key) or {}).items() if n > 0}
+            for key in ("per_day_counts", "place_names", "category_histogram")
+        },
+    }
+
+
+@timed("travelJournals/{journal_id}")
+def rebuild_journal_aggregates(journal_id):
+    """
+    Recomputes a journal's aggregates from its journalPlaces and saves them.
+    Used for journals created before aggregates existed.
+    Returns the aggregates, or None on error.
+    """
+    db = firestore.client()
+    try:
+        journal_ref = db.collection("travelJournals").document(journal_id)
+        places = (
+            doc.to_dict()
+            for doc in counted(
+                journal_ref.collection("journalPlaces")
+                .select(["date", "name", "category"])
+                .stream()
+            )
+        )
+        aggregates = {
+            "place_count": 0,
+            "per_day_counts": {},
+            "place_names": {},
+            "category_histogram": {},
+        }
+        for path, count in _aggregate_deltas(places).items():
+            if len(path) == 1:
+                aggregates[path[0]] = count
+            else:
+                aggregates[path[0]][path[1]] = count
+        journal_ref.update({AGGREGATES_FIELD: aggregates})
+        count_op(FIRESTORE_WRITE)
+        clear_journal_cache(journal_id)
+        return aggregates
+    except Exception as e:
+        logging.error(f"Error rebuilding aggregates for journal {journal_id}: {e}")
+        return None
+
+
+def _journal_places_ref(db, journal_id):
+    return (
+        db.collection("travelJournals")
+        .document(journal_id)
+        .collection("journalPlaces")
+    )
+
+
+def _rank_sort_key(data):
+    """
+    Orders the places of a day by rank. Places not migrated yet have only
+    the old integer 'order' and come first, in that order; places ranked
+    since the switch follow (as migrate_journal_place_ranks arranges them).
+    """
+    order = data.get("order")
+    return (order is None, order or 0, data.get("rank") or "")
+
+
+def _sorted_by_rank(docs):
+    """Sorts journal place snapshots by date, then by _rank_sort_key."""
+    def key(doc):
+        data = doc.to_dict() or {}
+        return (data.get("date") or "", _rank_sort_key(data))
+
+    return sorted(docs, key=key)
+
+
+def _last_rank_on_date(journal_places_ref, date):
+    """Returns the highest rank used on a date, or None if no place has one."""
+    # An equality-only query needs no composite index; a day holds few
+    # places, so the maximum is taken here instead of by ordering on rank.
+    query = journal_places_ref.where("date", "==", date).select(["rank"])
+    ranks = [
+        rank for rank in ((doc.to_dict() or {}).get("rank") for doc in counted(query.stream()))
+        if rank
+    ]
+    return max(ranks, default=None)
+
+
+@timed("travelJournals/{journal_id}/journalPlaces")
 def save_places_to_journal(journal_id, places_data):
     """
     Saves multiple places to a journal using batched writes for improved performance.
+    Each new place is ranked after the last place of its day, and the
+    journal's aggregates are updated in the same batch.
     """
     db = firestore.client()
     try:
-        journal_places_ref = (
-            db.collection("travelJournals")
-            .document(journal_id)
-            .collection("journalPlaces")
-        )
+        journal_ref = db.collection("travelJournals").document(journal_id)
+        journal_places_ref = _journal_places_ref(db, journal_id)
         batch = db.batch()
+        last_ranks = {}
+        saved_places = []
 
         for place_data in places_data:
             place_id = place_data.get("place_id")
@@ -353,10 +661,12 @@ def save_places_to_journal(journal_id, places_data):
             transaction = db.transaction()
             _create_place_if_not_exists(transaction, place_ref, place_data)
 
-            # Determine the order for the new place
-            query = journal_places_ref.where("date", "==", place_data["date"])
-            places_on_date = list(query.stream())
-            order = len(places_on_date) + 1
+            # Rank the new place after the last one on its date
+            date = place_data["date"]
+            if date not in last_ranks:
+                last_ranks[date] = _last_rank_on_date(journal_places_ref, date)
+            rank = key_between(last_ranks[date], None)
+            last_ranks[date] = rank
 
             # Create a new document reference for the journal place
             new_journal_place_ref = journal_places_ref.document()
@@ -364,69 +674,374 @@ def save_places_to_journal(journal_id, places_data):
             # Prepare the document data
             journal_place_doc = {
                 "placeRef": place_ref,
-                "order": order,
+                "rank": rank,
                 **place_data,
             }
             batch.set(new_journal_place_ref, journal_place_doc)
+            saved_places.append(place_data)
+
+        has_aggregates = _has_aggregates(journal_ref)
+        if saved_places:
+            journal_update = _bump_revision()
+            if has_aggregates:
+                journal_update.update(_aggregate_increments(_aggregate_deltas(saved_places)))
+            batch.update(journal_ref, journal_update)
 
         # Commit the batch
         batch.commit()
+        count_op(FIRESTORE_WRITE, len(saved_places) + (1 if saved_places else 0))
+        if not has_aggregates:
+            rebuild_journal_aggregates(journal_id)
+        clear_journal_cache(journal_id)
+    except Exception as e:
+        logging.error(f"Error saving places to journal: {e}")
+        return False
+    _run_hook(
+        search_index.on_places_added,
+        journal_id, [place_data.get("name") for place_data in places_data],
+    )
+    _run_hook(geo_index.on_places_saved, journal_id, places_data)
+    return True
+
+
+@timed("travelJournals/{journal_id}/journalPlaces")
+def reorder_journal_places(journal_id, ordered_doc_ids):
+    """
+    Gives journal places fresh, evenly spaced ranks in the order of
+    ordered_doc_ids, dropping any old integer 'order'. Used when a whole day
+    is reordered at once; writes go out in batches of 500 (the Firestore
+    limit), the first one also bumping the journal's revision.
+    """
+    db = firestore.client()
+    try:
+        journal_ref = db.collection("travelJournals").document(journal_id)
+        journal_places_ref = _journal_places_ref(db, journal_id)
+        ranks = evenly_spaced_keys(len(ordered_doc_ids))
+        batch = db.batch()
+        batch.update(journal_ref, _bump_revision())
+        pending = 1
+        for doc_id, rank in zip(ordered_doc_ids, ranks):
+            batch.update(
+                journal_places_ref.document(doc_id),
+                {"rank": rank, "order": firestore.DELETE_FIELD},
+            )
+            pending += 1
+            if pending == 500:
+                batch.commit()
+                count_op(FIRESTORE_WRITE, pending)
+                batch = db.batch()
+                pending = 0
+        if pending:
+            batch.commit()
+            count_op(FIRESTORE_WRITE, pending)
+        clear_journal_cache(journal_id)
         return True
     except Exception as e:
-        print(f"Error saving places to journal: {e}")
+        logging.error(f"Error reordering places for journal {journal_id}: {e}")
         return False
 
 
-def fetch_all_journal_places(journal_id):
+@timed("travelJournals/{journal_id}/journalPlaces/{doc_id}")
+def move_journal_place(journal_id, doc_id, after_doc_id=None, before_doc_id=None, date=None):
     """
-    Fetches all places for a journal, ordered by date and then by the 'order' field.
-    This version is optimized to avoid N+1 queries by batching place detail fetches.
+    Moves one journal place between two neighbours on its target day:
+    after_doc_id (None for the start of the day) and before_doc_id (None for
+    the end of the day). Pass date to move the place to another day.
+    A move within a day writes only the moved document, however long the
+    day is. A move to another day also updates the journal's day counts and
+    revision. If the new rank gets long, or a neighbour has no rank yet, the
+    day is rebalanced. Returns the new rank, or None on error.
     """
     db = firestore.client()
     try:
-        journal_places_ref = (
-            db.collection("travelJournals")
-            .document(journal_id)
-            .collection("journalPlaces")
+        journal_places_ref = _journal_places_ref(db, journal_id)
+        place_ref = journal_places_ref.document(doc_id)
+        neighbour_ids = [
+            neighbour_id for neighbour_id in (after_doc_id, before_doc_id) if neighbour_id
+        ]
+        if doc_id in neighbour_ids:
+            raise ValueError(f"Journal place {doc_id} cannot be its own neighbour")
+        refs = [place_ref] + [journal_places_ref.document(n) for n in neighbour_ids]
+        snapshots = {doc.id: doc for doc in counted(db.get_all(refs))}
+        if not snapshots.get(doc_id) or not snapshots[doc_id].exists:
+            return None
+        moved = snapshots[doc_id].to_dict()
+        old_date = moved.get("date")
+        target_date = date if date is not None else old_date
+
+        neighbours = {}
+        for neighbour_id in neighbour_ids:
+            snapshot = snapshots.get(neighbour_id)
+            if not snapshot or not snapshot.exists:
+                raise ValueError(f"Journal place {neighbour_id} does not exist")
+            neighbours[neighbour_id] = snapshot.to_dict()
+            if neighbours[neighbour_id].get("date") != target_date:
+                raise ValueError(f"Journal place {neighbour_id} is not on {target_date}")
+
+        if any("order" in data or data.get("rank") is None for data in neighbours.values()):
+            # The day predates ranks; give it ranks in its current order first
+            if not rebalance_day_ranks(journal_id, target_date):
+                raise RuntimeError(f"Could not rank the places on {target_date}")
+            return move_journal_place(journal_id, doc_id, after_doc_id, before_doc_id, date)
+
+        def neighbour_rank(neighbour_id):
+            return neighbours[neighbour_id]["rank"] if neighbour_id else None
+
+        rank = key_between(neighbour_rank(after_doc_id), neighbour_rank(before_doc_id))
+        update = {"rank": rank}
+        if "order" in moved:
+            update["order"] = firestore.DELETE_FIELD
+        if target_date == old_date:
+            place_ref.update(update)
+            count_op(FIRESTORE_WRITE)
+        else:
+            journal_ref = db.collection("travelJournals").document(journal_id)
+            journal_update = _bump_revision()
+            if _has_aggregates(journal_ref):
+                journal_update.update(_aggregate_increments(Counter({
+                    ("per_day_counts", target_date): 1,
+                    ("per_day_counts", old_date): -1,
+                })))
+            batch = db.batch()
+            batch.update(place_ref, {**update, "date": target_date})
+            batch.update(journal_ref, journal_update)
+            batch.commit()
+            count_op(FIRESTORE_WRITE, 2)
+        clear_journal_cache(journal_id)
+
+        if len(rank) > MAX_RANK_LENGTH:
+            rebalance_day_ranks(journal_id, target_date)
+        return rank
+    except Exception as e:
+        logging.error(f"Error moving place {doc_id} in journal {journal_id}: {e}")
+        return None
+
+
+@timed("travelJournals/{journal_id}/journalPlaces")
+def rebalance_day_ranks(journal_id, date):
+    """
+    Rewrites the ranks of one day as short, evenly spaced keys, keeping the
+    current order. Repeated moves into the same gap make ranks grow by about
+    one character per move; this brings them back to one or two.
+    """
+    db = firestore.client()
+    journal_places_ref = _journal_places_ref(db, journal_id)
+    query = (
+        journal_places_ref.where("date", "==", date)
+        .select(["date", "order", "rank"])
+        .stream()
+    )
+    docs = _sorted_by_rank(counted(query))
+    return reorder_journal_places(journal_id, [doc.id for doc in docs])
+
+
+@firestore.transactional
+def _delete_journal_place(transaction, journal_ref, journal_place_ref):
+    """
+    Deletes a journal place and takes it out of the journal's aggregates,
+    dropping keys whose count reaches zero. Returns whether the journal had
+    aggregates, or None if the place does not exist.
+    """
+    place_snapshot = journal_place_ref.get(transaction=transaction)
+    count_op(FIRESTORE_READ)
+    if not place_snapshot.exists:
+        return None
+    journal_snapshot = journal_ref.get(transaction=transaction)
+    count_op(FIRESTORE_READ)
+    # The place delete and the journal update below
+    count_op(FIRESTORE_WRITE, 2)
+    aggregates = (journal_snapshot.to_dict() or {}).get(AGGREGATES_FIELD)
+
+    transaction.delete(journal_place_ref)
+    if aggregates is None:
+        transaction.update(journal_ref, _bump_revision())
+        return False
+
+    update = _bump_revision()
+    for path, delta in _aggregate_deltas([place_snapshot.to_dict()], sign=-1).items():
+        current = aggregates
+        for key in path:
+            current = current.get(key, 0) if isinstance(current, dict) else 0
+        if len(path) > 1 and current + delta <= 0:
+            update[_aggregate_field(path)] = firestore.DELETE_FIELD
+        else:
+            update[_aggregate_field(path)] = firestore.Increment(delta)
+    transaction.update(journal_ref, update)
+    return True
+
+
+@timed("travelJournals/{journal_id}/journalPlaces/{journal_place_doc_id}")
+def delete_journal_place(journal_id, journal_place_doc_id):
+    """
+    Removes a place from a journal, keeping the journal's aggregates in step.
+    Returns True on success.
+    """
+    db = firestore.client()
+    try:
+        journal_ref = db.collection("travelJournals").document(journal_id)
+        journal_place_ref = journal_ref.collection("journalPlaces").document(
+            journal_place_doc_id
         )
-        query = journal_places_ref.order_by("date").order_by("order").stream()
-
-        journal_places_data = []
-        place_refs = []
-        for doc in query:
-            data = doc.to_dict()
-            data['journal_place_doc_id'] = doc.id
-            journal_places_data.append(data)
-            if 'placeRef' in data and isinstance(data['placeRef'], DocumentReference):
-                place_refs.append(data['placeRef'])
-
-        place_details = {}
-        if place_refs:
-            # Use get_all for efficient batch fetching
-            place_docs = db.get_all(place_refs)
-            for doc in place_docs:
-                if doc.exists:
-                    place_details[doc.reference.path] = doc.to_dict()
-
-        places_with_details = []
-        for jp_data in journal_places_data:
-            place_ref = jp_data.get("placeRef")
-            if place_ref and place_ref.path in place_details:
-                combined_data = {**place_details[place_ref.path], **jp_data}
-                places_with_details.append(combined_data)
-            else:
-                # Handle cases where placeRef is missing or the document doesn't exist
-                print(f"Skipping journal place with missing or invalid placeRef: {jp_data.get('journal_place_doc_id')}")
+        had_aggregates = _delete_journal_place(
+            db.transaction(), journal_ref, journal_place_ref
+        )
+        if had_aggregates is None:
+            return False
+        if not had_aggregates:
+            rebuild_journal_aggregates(journal_id)
+        clear_journal_cache(journal_id)
+    except Exception as e:
+        logging.error(f"Error deleting place {journal_place_doc_id} from journal {journal_id}: {e}")
+        return False
+    _run_hook(search_index.on_places_removed, journal_id)
+    _run_hook(geo_index.on_places_removed, journal_id)
+    return True
+
+
+@timed("journalPlaces")
+def migrate_journal_place_ranks(batch_size=500):
+    """
+    Gives every journal place a rank from its old integer 'order' field.
+    Places are grouped by journal and date; places that already have a rank
+    but no order (added since the switch) stay after the ordered ones.
+    Safe to run more than once. Returns the number of places updated.
+    """
+    db = firestore.client()
+    days = {}
+    query = db.collection_group("journalPlaces").select(["date", "order", "rank"])
+    for doc in query.stream():
+        data = doc.to_dict()
+        key = (doc.reference.parent.path, data.get("date"))
+        days.setdefault(key, []).append((doc.reference, data))
+
+    updated = 0
+    batch = db.batch()
+    pending = 0
+    for places in days.values():
+        if all("order" not in data for _, data in places):
+            continue
+        places.sort(key=lambda p: (_rank_sort_key(p[1]), p[0].id))
+        for (ref, data), rank in zip(places, evenly_spaced_keys(len(places))):
+            batch.update(ref, {"rank": rank, "order": firestore.DELETE_FIELD})
+            pending += 1
+            if pending == batch_size:
+                batch.commit()
+                updated += pending
+                batch = db.batch()
+                pending = 0
+    if pending:
+        batch.commit()
+        updated += pending
+    return updated
+
+
+@timed("travelJournals/{journal_id}")
+def get_journal_revision(journal_id):
+    """Reads only the revision of a journal. Returns None if it does not exist."""
+    db = firestore.client()
+    snapshot = (
+        db.collection("travelJournals")
+        .document(journal_id)
+        .get(field_paths=[REVISION_FIELD])
+    )
+    count_op(FIRESTORE_READ)
+    if not snapshot.exists:
+        return None
+    return (snapshot.to_dict() or {}).get(REVISION_FIELD, 0)
+
+
+def cached_journal_places(journal_id, revision):
+    """Returns the cached places of a journal at a revision, or None."""
+    return journal_places_cache.get((journal_id, revision))
+
 
-        return places_with_details
+def _get_places(db, place_refs):
+    """
+    Returns {path: Place} for the given place references. Places already in
+    place_cache are not read again; the others are fetched in one get_all.
+    """
+    refs = {ref.path: ref for ref in place_refs}
+
+    def load_places(paths):
+        return {
+            doc.reference.path: Place.from_snapshot(doc)
+            for doc in counted(db.get_all([refs[path] for path in paths]))
+            if doc.exists
+        }
+
+    return place_cache.get_many_or_load(list(refs), load_places)
+
+
+def _journal_places_with_details(db, docs):
+    """Builds JournalPlace objects for journal place documents, skipping broken ones."""
+    journal_place_docs = []
+    place_refs = []
+    for doc in docs:
+        data = doc.to_dict() or {}
+        place_ref = data.get("placeRef")
+        if isinstance(place_ref, DocumentReference):
+            journal_place_docs.append((doc.id, data, place_ref))
+            place_refs.append(place_ref)
+        else:
+            logging.warning(f"Skipping journal place with missing or invalid placeRef: {doc.id}")
+
+    places = _get_places(db, place_refs)
+    journal_places = []
+    for doc_id, data, place_ref in journal_place_docs:
+        place = places.get(place_ref.path)
+        if place is None:
+            logging.warning(f"Skipping journal place whose place does not exist: {doc_id}")
+            continue
+        journal_places.append(JournalPlace.from_dict(doc_id, data, place=place))
+    return journal_places
+
+
+@timed("travelJournals/{journal_id}/journalPlaces")
+def fetch_all_journal_places(journal_id):
+    """
+    Fetches all places for a journal, ordered by date and then by rank.
+    Place details are batch fetched (and cached in place_cache), so there is
+    no read per place. Results are cached per journal revision, so an
+    unchanged journal costs a single document read, and concurrent misses on
+    the same revision share one query. A new revision is always loaded
+    before it is returned: serving the old places would hide the edit that
+    made it. The returned list is shared and must not be mutated.
+    """
+    try:
+        revision = get_journal_revision(journal_id)
+        cached_places = cached_journal_places(journal_id, revision)
+        if cached_places is not None:
+            return cached_places
+        return journal_places_flights.do(
+            (journal_id, revision),
+            lambda: _load_journal_places(journal_id, revision),
+        )
     except Exception as e:
-        print(f"Error fetching all journal places for journal {journal_id}: {e}")
+        logging.error(f"Error fetching all journal places for journal {journal_id}: {e}")
         return []
 
 
+def _load_journal_places(journal_id, revision):
+    db = firestore.client()
+    journal_places_ref = (
+        db.collection("travelJournals")
+        .document(journal_id)
+        .collection("journalPlaces")
+    )
+    # Sorted by rank here rather than with order_by("rank"), which would
+    # leave out places the rank migration has not reached yet
+    query = counted(journal_places_ref.order_by("date").stream())
+    places_with_details = _journal_places_with_details(db, _sorted_by_rank(query))
+
+    if revision is not None:
+        journal_places_cache[(journal_id, revision)] = places_with_details
+    return places_with_details
+
+
+@timed("travelJournals/{journal_id}/journalPlaces")
 def fetch_journal_places(journal_id, date):
     """
-    Fetches all places for a specific day in a journal, ordered by the 'order' field.
+    Fetches all places for a specific day in a journal, ordered by rank.
     It also fetches the details of each place from the 'places' collection.
     """
     db = firestore.client()
@@ -436,29 +1051,8 @@ def fetch_journal_places(journal_id, date):
             .document(journal_id)
             .collection("journalPlaces")
         )
-        query = (
-            journal_places_ref.where("date", "==", date).order_by("order").stream()
-        )
-
-        places_with_details = []
-        for journal_place_doc in query:
-            journal_place_data = journal_place_doc.to_dict()
-            place_ref = journal_place_data.get("placeRef")
-
-            if place_ref and isinstance(place_ref, DocumentReference):
-                place_doc = place_ref.get()
-                if place_doc.exists:
-                    place_data = place_doc.to_dict()
-                    # Combine journal place data (like order, notes) with place details
-                    combined_data = {**place_data, **journal_place_data}
-                    combined_data['journal_place_doc_id'] = journal_place_doc.id
-                    places_with_details.append(combined_data)
-            else:
-                # Handle cases where placeRef is missing or not a DocumentReference
-                # You might want to log this or handle it as an error
-                print(f"Skipping journal place with missing or invalid placeRef: {journal_place_doc.id}")
-
-        return places_with_details
+        query = counted(journal_places_ref.where("date", "==", date).stream())
+        return _journal_places_with_details(db, _sorted_by_rank(query))
     except Exception as e:
-        print(f"Error fetching journal places for date {date}: {e}")
+        logging.error(f"Error fetching journal places for date {date}: {e}")
         return []
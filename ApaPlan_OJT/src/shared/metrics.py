@@ -0,0 +1,284 @@
+"""
+In-process metrics for Dash callbacks, exposed in Prometheus text format.
+
+instrument(app) must be called before the register_*_callbacks functions.
+It wraps app.callback so every callback registered afterwards records its
+wall time, and hooks the Flask server to record the request and response
+payload size of each /_dash-update-component call. Data-access code calls
+count_op() (or wraps query results in counted()) to count Firestore reads,
+writes and queries and Storage operations; they are attributed to the
+callback or route handling the current request.
+
+Background callbacks run in a thread of the worker that started them (see
+job_manager.py) and are timed like the others. Every gunicorn worker keeps
+its own numbers; /metrics reports the worker that served the scrape.
+"""
+import time
+import bisect
+import inspect
+import functools
+import threading
+import contextvars
+from flask import g, request
+from dash.exceptions import PreventUpdate
+from src.shared import spans
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# Kinds of backend operations passed to count_op()
+FIRESTORE_READ = "firestore_read"     # documents read
+FIRESTORE_WRITE = "firestore_write"   # documents written or deleted
+FIRESTORE_QUERY = "firestore_query"   # queries and batch gets run
+STORAGE_OP = "storage_op"             # Storage API calls
+
+NO_CALLBACK = "none"
+
+_active = contextvars.ContextVar("metrics_active_callback", default=NO_CALLBACK)
+
+
+class _Histogram:
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.series = {}  # labels -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, labels, value):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self, lines):
+        lines.append(f"# HELP {self.name} {self.help_text}")
+        lines.append(f"# TYPE {self.name} histogram")
+        for labels, series in sorted(self.series.items()):
+            label_text = _format_labels(labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series[:-1]):
+                cumulative += count
+                lines.append(
+                    f'{self.name}_bucket{{{label_text},le="{bound}"}} {cumulative}'
+                )
+            lines.append(f"{self.name}_sum{{{label_text}}} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{{{label_text}}} {cumulative}")
+
+
+class _Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self.series = {}  # labels -> value
+
+    def inc(self, labels, amount=1):
+        self.series[labels] = self.series.get(labels, 0) + amount
+
+    def render(self, lines):
+        lines.append(f"# HELP {self.name} {self.help_text}")
+        lines.append(f"# TYPE {self.name} counter")
+        for labels, value in sorted(self.series.items()):
+            lines.append(f"{self.name}{{{_format_labels(labels)}}} {value}")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in labels)
+
+
+_lock = threading.Lock()
+callback_duration = _Histogram(
+    "apaplan_callback_duration_seconds",
+    "Wall time spent in the callback function.",
+    DURATION_BUCKETS,
+)
+request_duration = _Histogram(
+    "apaplan_callback_request_duration_seconds",
+    "Wall time of the whole /_dash-update-component request.",
+    DURATION_BUCKETS,
+)
+request_bytes = _Histogram(
+    "apaplan_callback_request_bytes",
+    "Size of the callback request body.",
+    SIZE_BUCKETS,
+)
+response_bytes = _Histogram(
+    "apaplan_callback_response_bytes",
+    "Size of the callback response body before compression.",
+    SIZE_BUCKETS,
+)
+callback_errors = _Counter(
+    "apaplan_callback_errors_total",
+    "Callbacks that raised an exception other than PreventUpdate.",
+)
+backend_ops = _Counter(
+    "apaplan_backend_ops_total",
+    "Firestore and Storage operations, by callback or route.",
+)
+cache_lookups = _Counter(
+    "apaplan_cache_lookups_total",
+    "Cache lookups by cache and result (local, shared, stale or miss).",
+)
+coalesced_calls = _Counter(
+    "apaplan_coalesced_calls_total",
+    "Calls that waited for an identical call in flight instead of running.",
+)
+_METRICS = (
+    callback_duration,
+    request_duration,
+    request_bytes,
+    response_bytes,
+    callback_errors,
+    backend_ops,
+    cache_lookups,
+    coalesced_calls,
+)
+
+# Dash output id ("comp.prop" or "..a.b..c.d..") -> callback name
+_output_names = {}
+
+
+def count_op(op, amount=1):
+    """
+    Counts backend operations for the callback or route being handled, and
+    for the timing span that is running (see spans.py).
+    """
+    if amount:
+        spans.add_ops(amount)
+        with _lock:
+            backend_ops.inc((("callback", _active.get()), ("op", op)), amount)
+
+
+def count_cache(cache, result, amount=1):
+    """Counts lookups in a shared_cache.TwoLevelCache."""
+    with _lock:
+        cache_lookups.inc((("cache", cache), ("result", result)), amount)
+
+
+def count_coalesced(name):
+    """Counts a call served by a singleflight.SingleFlight call in flight."""
+    with _lock:
+        coalesced_calls.inc((("name", name),))
+
+
+def counted(docs, op=FIRESTORE_READ):
+    """
+    Yields the documents of a query stream or get_all, counting one query
+    and one read per document as they are consumed.
+    """
+    count_op(FIRESTORE_QUERY)
+    for doc in docs:
+        count_op(op)
+        yield doc
+
+
+def callback_name(func):
+    return f"{func.__module__}.{func.__name__}"
+
+
+def timed_callback(func, name=None):
+    """Wraps a callback function to record its wall time and errors."""
+    name = name or callback_name(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        token = _active.set(name)
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except PreventUpdate:
+            raise
+        except Exception:
+            with _lock:
+                callback_errors.inc((("callback", name),))
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            with _lock:
+                callback_duration.observe((("callback", name),), elapsed)
+            _active.reset(token)
+
+    return wrapper
+
+
+def _instrument_callbacks(app):
+    register = app.callback
+
+    @functools.wraps(register)
+    def callback(*args, **kwargs):
+        decorator = register(*args, **kwargs)
+
+        def decorate(func):
+            return decorator(timed_callback(func))
+
+        return decorate
+
+    app.callback = callback
+
+
+def _output_callback_name(app, output):
+    """Name of the callback writing a Dash output id, looked up once."""
+    name = _output_names.get(output)
+    if name is None:
+        # Dash may fill callback_map only after registration, so look it up lazily
+        entry = app.callback_map.get(output)
+        if entry is None or "callback" not in entry:
+            return "unknown"
+        name = _output_names[output] = callback_name(inspect.unwrap(entry["callback"]))
+    return name
+
+
+def _instrument_server(app):
+    server = app.server
+
+    @server.before_request
+    def start_request_metrics():
+        g.metrics_started = time.perf_counter()
+        if request.path.endswith("/_dash-update-component"):
+            body = request.get_json(silent=True) or {}
+            name = _output_callback_name(app, body.get("output"))
+            g.metrics_callback = name
+        else:
+            g.metrics_callback = None
+            name = f"route:{request.endpoint}"
+        g.metrics_token = _active.set(name)
+
+    @server.after_request
+    def record_request_metrics(response):
+        name = g.get("metrics_callback")
+        if name is None:
+            return response
+        labels = (("callback", name),)
+        elapsed = time.perf_counter() - g.metrics_started
+        size = None if response.direct_passthrough else response.calculate_content_length()
+        with _lock:
+            request_duration.observe(labels, elapsed)
+            request_bytes.observe(labels, request.content_length or 0)
+            if size is not None:
+                response_bytes.observe(labels, size)
+        return response
+
+    @server.teardown_request
+    def reset_active_callback(exc):
+        token = g.pop("metrics_token", None)
+        if token is not None:
+            _active.reset(token)
+
+
+def instrument(app):
+    """Instruments callbacks registered from now on and the app's Flask server."""
+    _instrument_callbacks(app)
+    _instrument_server(app)
+
+
+def render():
+    """Returns all metrics in the Prometheus text exposition format."""
+    lines = []
+    with _lock:
+        for metric in _METRICS:
+            metric.render(lines)
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,139 @@
+"""
+Compact read models for journals, journal places and places.
+
+Documents read for display used to be plain dicts, and every journal place
+was merged with its place details into a new dict ({**place, **journal_place})
+on each fetch. These classes use __slots__ instead of a per-object dict, and
+a JournalPlace keeps a reference to its Place rather than a copy, so one
+cached Place is shared by every journal (and every cached revision) that
+visits it.
+
+They behave like the old dicts where the app reads them: get(), [] and "in"
+work with the same keys, a JournalPlace falls back to its Place for keys it
+does not have (as the merge did), and to_dict() returns the merged dict.
+Fields a document has that are not listed in FIELDS are kept in `extra`.
+The objects are shared through caches and must not be modified.
+"""
+
+_MISSING = object()
+
+
+class Model:
+    __slots__ = ("id", "extra")
+    FIELDS = ()
+    _FIELD_SET = frozenset()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._FIELD_SET = frozenset(cls.FIELDS)
+
+    @classmethod
+    def from_dict(cls, doc_id, data):
+        obj = cls.__new__(cls)
+        obj.id = doc_id
+        extra = {}
+        fields = cls._FIELD_SET
+        for key, value in data.items():
+            if key in fields:
+                setattr(obj, key, value)
+            else:
+                extra[key] = value
+        obj.extra = extra
+        return obj
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        return cls.from_dict(snapshot.id, snapshot.to_dict() or {})
+
+    def _lookup(self, key):
+        if key in self._FIELD_SET:
+            return getattr(self, key, _MISSING)
+        if key == "id":
+            return self.id
+        return self.extra.get(key, _MISSING)
+
+    def get(self, key, default=None):
+        value = self._lookup(key)
+        return default if value is _MISSING else value
+
+    def __getitem__(self, key):
+        value = self._lookup(key)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self._lookup(key) is not _MISSING
+
+    def to_dict(self):
+        data = {}
+        for field in self.FIELDS:
+            value = getattr(self, field, _MISSING)
+            if value is not _MISSING:
+                data[field] = value
+        data.update(self.extra)
+        return data
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.id!r})"
+
+
+class Place(Model):
+    """A document of the shared 'places' collection."""
+    FIELDS = (
+        "name", "address", "coordinates", "geohash", "google_place_id",
+        "website", "rating", "user_ratings_total", "utc_offset_minutes",
+        "price_level", "types", "created_at",
+    )
+    __slots__ = FIELDS
+
+
+class JournalPlace(Model):
+    """
+    A document of a journal's 'journalPlaces' sub-collection, with the Place
+    it points at. "journal_place_doc_id" is its document id, as before.
+    """
+    FIELDS = (
+        "placeRef", "place_id", "rank", "date", "name", "description",
+        "category", "friendliness",
+    )
+    __slots__ = FIELDS + ("place",)
+
+    @classmethod
+    def from_dict(cls, doc_id, data, place=None):
+        obj = super().from_dict(doc_id, data)
+        obj.place = place
+        return obj
+
+    @classmethod
+    def from_snapshot(cls, snapshot, place=None):
+        return cls.from_dict(snapshot.id, snapshot.to_dict() or {}, place=place)
+
+    def _lookup(self, key):
+        if key == "journal_place_doc_id":
+            return self.id
+        value = super()._lookup(key)
+        if value is _MISSING and self.place is not None:
+            return self.place._lookup(key)
+        return value
+
+    def to_dict(self):
+        data = self.place.to_dict() if self.place is not None else {}
+        data.update(super().to_dict())
+        data["journal_place_doc_id"] = self.id
+        return data
+
+
+class Journal(Model):
+    """A document of the 'travelJournals' collection, with its id under "id"."""
+    FIELDS = (
+        "user_id", "title", "summary", "introduction", "description", "status",
+        "privacy", "start_date", "days", "nights", "total_cost", "currency",
+        "cover_image_url", "created_at", "updated_at", "revision", "aggregates",
+    )
+    __slots__ = FIELDS
+
+    def to_dict(self):
+        data = super().to_dict()
+        data["id"] = self.id
+        return data
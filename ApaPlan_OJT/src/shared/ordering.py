@@ -0,0 +1,88 @@
+"""
+Fractional (lexicographic) rank keys for ordering journal places.
+
+A rank is a string of base-62 digits read as a fraction (0.xyz...). Between
+any two ranks there is always room for another, so placing an item between
+two neighbours only writes that item. Digits are in ASCII order, which is
+how Firestore sorts strings, so order_by("rank") returns items in rank order.
+
+Usage (from the ApaPlan_OJT directory), to give existing journal places a rank
+based on their old integer `order`:
+    python -m src.shared.ordering migrate
+"""
+import argparse
+
+DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+BASE = len(DIGITS)
+_DIGIT_VALUES = {digit: value for value, digit in enumerate(DIGITS)}
+
+# Ranks longer than this trigger a rebalance of the day
+MAX_RANK_LENGTH = 12
+
+
+def key_between(a=None, b=None):
+    """
+    Returns a rank that sorts strictly after `a` and strictly before `b`.
+    None stands for the start (a) or the end (b) of the list. Ranks never
+    end in "0", which would leave no room before them.
+    """
+    a = a or ""
+    if b is not None and (a >= b or b.endswith(DIGITS[0])):
+        raise ValueError(f"{a!r} must sort before {b!r}")
+
+    result = []
+    i = 0
+    while True:
+        digit_a = _DIGIT_VALUES[a[i]] if i < len(a) else 0
+        digit_b = _DIGIT_VALUES[b[i]] if b is not None and i < len(b) else BASE
+        if digit_a == digit_b:
+            result.append(DIGITS[digit_a])
+            i += 1
+            continue
+        mid = (digit_a + digit_b) // 2
+        if mid > digit_a:
+            result.append(DIGITS[mid])
+            return "".join(result)
+        # The digits are adjacent: keep a's digit, and from here on anything
+        # is already smaller than b.
+        result.append(DIGITS[digit_a])
+        b = None
+        i += 1
+
+
+def evenly_spaced_keys(n):
+    """Returns n short, evenly spaced, increasing ranks."""
+    if n <= 0:
+        return []
+    width = 1
+    while BASE ** width <= n + 1:
+        width += 1
+    step = BASE ** width / (n + 1)
+    keys = []
+    for i in range(1, n + 1):
+        value = int(step * i)
+        digits = []
+        for _ in range(width):
+            value, remainder = divmod(value, BASE)
+            digits.append(DIGITS[remainder])
+        keys.append("".join(reversed(digits)).rstrip("0") or DIGITS[1])
+    return keys
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("command", choices=["migrate"])
+    parser.parse_args()
+
+    import firebase_config
+    from src.shared.journal_utils import migrate_journal_place_ranks
+
+    firebase_config.init_firebase_admin()
+    updated = migrate_journal_place_ranks()
+    print(f"Assigned ranks to {updated} journal places.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Opt-in sampling profiler for production requests.
+
+A profiled request registers its thread; while any profiled request is
+running, a sampler thread reads the thread's current stack every
+PROFILE_INTERVAL_MS and counts it under the callback (or route) being
+handled. Stacks are kept in the collapsed format of flamegraph.pl and
+speedscope ("outer;inner;leaf count"), so a download can be rendered
+directly:
+
+    curl -H "Authorization: Bearer $PROFILE_TOKEN" \\
+        https://<host>/debug/profile/src.components.timeline.create_timeline > stacks.txt
+    flamegraph.pl stacks.txt > timeline.svg
+
+Which requests are profiled:
+    PROFILE_SAMPLE_RATE  fraction of requests, chosen at random (default 0, off)
+    PROFILE_TOKEN        requests with "X-Profile-Token: <token>" are always
+                         profiled; the same token is needed for the download
+                         routes, which are disabled without it
+    PROFILE_INTERVAL_MS  time between samples (default 5)
+
+Background callbacks run outside the request thread and are not sampled.
+Each gunicorn worker keeps its own samples.
+"""
+import os
+import sys
+import time
+import random
+import threading
+from collections import Counter
+from flask import g, request, jsonify, abort, Response
+
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN")
+
+# Distinct stacks kept per callback; later new stacks are counted as one entry
+MAX_STACKS = 5000
+TRUNCATED = "[other stacks]"
+
+_lock = threading.Lock()
+_profiled = {}  # thread ident -> callback name
+_stacks = {}    # callback name -> Counter of collapsed stacks
+_requests = Counter()  # callback name -> profiled requests
+_sampler = None
+
+
+def _frame_name(frame):
+    return f"{frame.f_globals.get('__name__', '?')}.{frame.f_code.co_name}"
+
+
+def collapse(frame):
+    """Returns a frame's stack as "outermost;...;innermost"."""
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    names.reverse()
+    return ";".join(names)
+
+
+def _record(name, stack):
+    counts = _stacks.setdefault(name, Counter())
+    if stack not in counts and len(counts) >= MAX_STACKS:
+        stack = TRUNCATED
+    counts[stack] += 1
+
+
+def _sample_loop():
+    global _sampler
+    interval = PROFILE_INTERVAL_MS / 1000
+    while True:
+        time.sleep(interval)
+        with _lock:
+            if not _profiled:
+                _sampler = None
+                return
+            targets = list(_profiled.items())
+        frames = sys._current_frames()
+        samples = [
+            (name, collapse(frames[ident]))
+            for ident, name in targets
+            if ident in frames
+        ]
+        with _lock:
+            for name, stack in samples:
+                _record(name, stack)
+
+
+def start(name):
+    """Starts sampling the current thread under `name`."""
+    global _sampler
+    with _lock:
+        _profiled[threading.get_ident()] = name
+        _requests[name] += 1
+        if _sampler is None:
+            _sampler = threading.Thread(target=_sample_loop, name="profiler", daemon=True)
+            _sampler.start()
+
+
+def stop():
+    with _lock:
+        _profiled.pop(threading.get_ident(), None)
+
+
+def collapsed_stacks(name):
+    """The samples of a callback in collapsed format, or None if there are none."""
+    with _lock:
+        counts = _stacks.get(name)
+        if not counts:
+            return None
+        return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+
+def summary():
+    with _lock:
+        return {
+            name: {"requests": _requests[name], "samples": sum(counts.values())}
+            for name, counts in _stacks.items()
+        }
+
+
+def reset():
+    with _lock:
+        _stacks.clear()
+        _requests.clear()
+
+
+def _wants_profile():
+    if PROFILE_TOKEN and request.headers.get("X-Profile-Token") == PROFILE_TOKEN:
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def _require_token():
+    if not PROFILE_TOKEN:
+        abort(404)
+    if request.headers.get("Authorization") != f"Bearer {PROFILE_TOKEN}":
+        abort(401)
+
+
+def install(server):
+    """
+    Adds the profiling hooks and the download routes to the Flask server.
+    Call after metrics.instrument(app) so requests are named by callback.
+    """
+    @server.before_request
+    def start_profile():
+        if request.path.startswith("/debug/profile") or not _wants_profile():
+            return
+        name = g.get("metrics_callback") or f"route:{request.endpoint}"
+        g.profiling = True
+        start(name)
+
+    @server.teardown_request
+    def stop_profile(exc):
+        if g.pop("profiling", False):
+            stop()
+
+    @server.route('/debug/profile', methods=['GET', 'DELETE'])
+    def list_profiles():
+        _require_token()
+        if request.method == 'DELETE':
+            reset()
+            return jsonify({"status": "ok"})
+        return jsonify(summary())
+
+    @server.route('/debug/profile/<path:name>', methods=['GET'])
+    def download_profile(name):
+        _require_token()
+        stacks = collapsed_stacks(name)
+        if stacks is None:
+            abort(404)
+        return Response(
+            stacks,
+            mimetype="text/plain",
+            headers={"Content-Disposition": f'attachment; filename="{name}.folded"'},
+        )
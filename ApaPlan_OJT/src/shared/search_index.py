@@ -0,0 +1,411 @@
+import os
+import re
+import json
+import math
+import time
+import bisect
+import logging
+import threading
+import unicodedata
+from collections import Counter
+from firebase_admin import firestore
+
+# Where the index is snapshotted so a restarted worker does not have to
+# rebuild it from Firestore. Snapshots older than SEARCH_INDEX_MAX_AGE seconds
+# are ignored and the index is rebuilt instead.
+SEARCH_INDEX_PATH = os.getenv("SEARCH_INDEX_PATH", "/tmp/apaplan-search-index.json")
+SEARCH_INDEX_MAX_AGE = int(os.getenv("SEARCH_INDEX_MAX_AGE", "900"))
+SNAPSHOT_DELAY_SECONDS = 10
+
+# Text fields of a journal and how much a match in each one counts
+FIELD_WEIGHTS = {
+    "title": 3.0,
+    "place_names": 2.0,
+    "summary": 1.0,
+    "introduction": 1.0,
+}
+
+STOP_WORDS = {
+    "a", "an", "and", "at", "by", "for", "in", "is", "it", "of", "on", "or",
+    "the", "to", "with",
+}
+
+# Matches through prefix expansion count a bit less than exact term matches
+PREFIX_MATCH_WEIGHT = 0.7
+MAX_PREFIX_EXPANSIONS = 50
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """Lowercases, strips accents and splits text into index terms."""
+    if not text:
+        return []
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return [
+        token for token in _TOKEN_RE.findall(text)
+        if len(token) > 1 and token not in STOP_WORDS
+    ]
+
+
+class JournalSearchIndex:
+    """
+    In-memory inverted index over public journals with BM25 ranking.
+    Each journal is stored with its text fields so it can be updated one
+    field at a time and written to disk.
+    """
+
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._docs = {}          # journal_id -> stored fields
+        self._doc_terms = {}     # journal_id -> Counter(term -> weighted tf)
+        self._doc_len = {}       # journal_id -> weighted length
+        self._postings = {}      # term -> {journal_id: weighted tf}
+        self._total_len = 0.0
+        self._sorted_terms = []
+        self._terms_dirty = False
+        self._snapshot_timer = None
+        self.built_at = None
+
+    def __len__(self):
+        return len(self._docs)
+
+    def __contains__(self, journal_id):
+        return journal_id in self._docs
+
+    # --- Indexing ---
+
+    def _unindex(self, journal_id):
+        terms = self._doc_terms.pop(journal_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(journal_id, None)
+                if not postings:
+                    del self._postings[term]
+                    self._terms_dirty = True
+        self._total_len -= self._doc_len.pop(journal_id, 0.0)
+
+    def _index(self, journal_id, doc):
+        terms = Counter()
+        for field, weight in FIELD_WEIGHTS.items():
+            value = doc.get(field)
+            if field == "place_names":
+                value = " ".join(value or [])
+            for token in tokenize(value):
+                terms[token] += weight
+        self._doc_terms[journal_id] = terms
+        length = sum(terms.values())
+        self._doc_len[journal_id] = length
+        self._total_len += length
+        for term, tf in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                self._terms_dirty = True
+            postings[journal_id] = tf
+
+    def upsert(self, journal_id, fields):
+        """Adds a journal or updates some of its fields."""
+        with self._lock:
+            doc = dict(self._docs.get(journal_id, {}))
+            for field in ("title", "summary", "introduction", "place_names"):
+                if field in fields:
+                    doc[field] = fields[field]
+            self._unindex(journal_id)
+            self._docs[journal_id] = doc
+            self._index(journal_id, doc)
+        self.schedule_snapshot()
+
+    def add_place_names(self, journal_id, names):
+        """Adds place names to an indexed journal."""
+        with self._lock:
+            if journal_id not in self._docs:
+                return
+            existing = self._docs[journal_id].get("place_names") or []
+            new_names = [name for name in names if name and name not in existing]
+            if not new_names:
+                return
+            self.upsert(journal_id, {"place_names": existing + new_names})
+
+    def remove(self, journal_id):
+        """Removes a journal from the index."""
+        with self._lock:
+            if journal_id not in self._docs:
+                return
+            self._unindex(journal_id)
+            del self._docs[journal_id]
+        self.schedule_snapshot()
+
+    def replace_all(self, docs):
+        """Replaces the whole index with {journal_id: fields}."""
+        with self._lock:
+            self._docs = {}
+            self._doc_terms = {}
+            self._doc_len = {}
+            self._postings = {}
+            self._total_len = 0.0
+            for journal_id, doc in docs.items():
+                self._docs[journal_id] = doc
+                self._index(journal_id, doc)
+            self._terms_dirty = True
+            self.built_at = time.time()
+
+    # --- Querying ---
+
+    def _expand(self, token):
+        """Returns (term, weight) pairs for a query token, including prefix matches."""
+        if self._terms_dirty:
+            self._sorted_terms = sorted(self._postings)
+            self._terms_dirty = False
+        expansions = []
+        if token in self._postings:
+            expansions.append((token, 1.0))
+        start = bisect.bisect_left(self._sorted_terms, token)
+        for term in self._sorted_terms[start:start + MAX_PREFIX_EXPANSIONS + 1]:
+            if not term.startswith(token):
+                break
+            if term != token:
+                expansions.append((term, PREFIX_MATCH_WEIGHT))
+        return expansions
+
+    def search(self, query, limit=20):
+        """
+        Returns up to `limit` results as dicts with id, title, summary and
+        score, best match first. Every query token may also match as a prefix.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        with self._lock:
+            n_docs = len(self._docs)
+            if not n_docs:
+                return []
+            avg_len = self._total_len / n_docs
+            scores = Counter()
+            for token in dict.fromkeys(tokens):
+                for term, weight in self._expand(token):
+                    postings = self._postings[term]
+                    idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for journal_id, tf in postings.items():
+                        norm = self.k1 * (1 - self.b + self.b * self._doc_len[journal_id] / avg_len)
+                        scores[journal_id] += weight * idf * tf * (self.k1 + 1) / (tf + norm)
+            results = []
+            for journal_id, score in scores.most_common(limit):
+                doc = self._docs[journal_id]
+                results.append({
+                    "id": journal_id,
+                    "title": doc.get("title"),
+                    "summary": doc.get("summary"),
+                    "score": round(score, 4),
+                })
+            return results
+
+    # --- Snapshots ---
+
+    def save(self, path=SEARCH_INDEX_PATH):
+        """Writes the stored journal fields to disk atomically."""
+        with self._lock:
+            snapshot = {"built_at": self.built_at, "docs": self._docs}
+            data = json.dumps(snapshot)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def load(self, path=SEARCH_INDEX_PATH, max_age=SEARCH_INDEX_MAX_AGE):
+        """
+        Loads a snapshot written by save(). Returns False if there is no
+        snapshot or it is older than max_age seconds.
+        """
+        try:
+            if time.time() - os.path.getmtime(path) > max_age:
+                return False
+            with open(path) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            return False
+        self.replace_all(snapshot.get("docs", {}))
+        self.built_at = snapshot.get("built_at") or self.built_at
+        return True
+
+    def schedule_snapshot(self):
+        """Saves the index shortly after a change, coalescing bursts of writes."""
+        with self._lock:
+            if self._snapshot_timer is not None:
+                return
+            self._snapshot_timer = threading.Timer(SNAPSHOT_DELAY_SECONDS, self._snapshot)
+            self._snapshot_timer.daemon = True
+            self._snapshot_timer.start()
+
+    def _snapshot(self):
+        with self._lock:
+            self._snapshot_timer = None
+        try:
+            self.save()
+        except OSError as e:
+            logging.warning(f"Could not write search index snapshot: {e}")
+
+
+def _searchable_fields(journal_data, place_names):
+    return {
+        "title": journal_data.get("title"),
+        "summary": journal_data.get("summary"),
+        "introduction": journal_data.get("introduction"),
+        "place_names": sorted(set(filter(None, place_names))),
+    }
+
+
+def build_from_firestore():
+    """
+    Reads every public journal and the names of its places.
+    Returns {journal_id: searchable fields}.
+    """
+    db = firestore.client()
+    journals = {}
+    for doc in db.collection("travelJournals").where("status", "==", "public").stream():
+        journals[doc.id] = doc.to_dict()
+
+    place_names = {journal_id: [] for journal_id in journals}
+    for doc in db.collection_group("journalPlaces").select(["name"]).stream():
+        journal_id = doc.reference.parent.parent.id
+        if journal_id in place_names:
+            place_names[journal_id].append(doc.to_dict().get("name"))
+
+    return {
+        journal_id: _searchable_fields(journal_data, place_names[journal_id])
+        for journal_id, journal_data in journals.items()
+    }
+
+
+_index = JournalSearchIndex()
+_index_ready = False
+_index_lock = threading.Lock()
+_rebuilding = False
+_build_started_at = None
+
+# A failed first build is retried after this many seconds
+SEARCH_INDEX_RETRY_S = 60
+
+
+def _rebuild_in_background(first):
+    global _index_ready, _rebuilding
+    try:
+        if not (first and _index.load()):
+            _index.replace_all(build_from_firestore())
+            _index.schedule_snapshot()
+        with _index_lock:
+            _index_ready = True
+    except Exception as e:
+        logging.warning(f"Search index rebuild failed: {e}")
+    finally:
+        with _index_lock:
+            _rebuilding = False
+
+
+def get_search_index():
+    """
+    Returns the process-wide index. It is never built in the caller's
+    thread: the first call (made by the warm-up) loads the disk snapshot or
+    builds the index from Firestore in a background thread, and searches
+    find nothing until that is done. Once the index is too old it is rebuilt
+    the same way while searches keep using the current one.
+    """
+    global _rebuilding, _build_started_at
+    with _index_lock:
+        now = time.time()
+        if not _index_ready:
+            due = _build_started_at is None or now - _build_started_at > SEARCH_INDEX_RETRY_S
+        else:
+            # Picks up changes made by other workers and instances
+            due = bool(_index.built_at) and now - _index.built_at > SEARCH_INDEX_MAX_AGE
+        if due and not _rebuilding:
+            _rebuilding = True
+            _build_started_at = now
+            threading.Thread(
+                target=_rebuild_in_background, args=(not _index_ready,),
+                name="search-index", daemon=True,
+            ).start()
+    return _index
+
+
+def search_journals(query, limit=20):
+    """
+    Searches public journals by title, summary, introduction and place
+    names. Finds nothing while the index is first being built.
+    """
+    try:
+        return get_search_index().search(query, limit=limit)
+    except Exception as e:
+        logging.error(f"Error searching journals: {e}")
+        return []
+
+
+# --- Write hooks (called from journal_utils after successful writes) ---
+
+def _fetch_searchable_journal(journal_id):
+    """Searchable fields of a journal, or None if it is missing or not public."""
+    db = firestore.client()
+    journal_ref = db.collection("travelJournals").document(journal_id)
+    journal = journal_ref.get()
+    journal_data = journal.to_dict() if journal.exists else None
+    if not journal_data or journal_data.get("status") != "public":
+        return None
+    place_names = [
+        doc.to_dict().get("name")
+        for doc in journal_ref.collection("journalPlaces").select(["name"]).stream()
+    ]
+    return _searchable_fields(journal_data, place_names)
+
+
+def on_journal_updated(journal_id, update_data):
+    """
+    Keeps the index in step with a journal update. Only public journals are
+    indexed; publishing a journal indexes it in full.
+    """
+    if not _index_ready:
+        return
+    status = update_data.get("status")
+    if status is not None and status != "public":
+        _index.remove(journal_id)
+    elif status == "public" and journal_id not in _index:
+        fields = _fetch_searchable_journal(journal_id)
+        if fields:
+            _index.upsert(journal_id, fields)
+    elif journal_id in _index:
+        _index.upsert(journal_id, update_data)
+
+
+def on_places_added(journal_id, place_names):
+    if _index_ready:
+        _index.add_place_names(journal_id, place_names)
+
+
+def refresh_journal(journal_id):
+    """
+    Re-reads a journal and its place names and updates or removes its entry.
+    Used when the change is not known field by field, e.g. a removed place
+    whose name other places of the journal may still use.
+    """
+    if not _index_ready:
+        return
+    fields = _fetch_searchable_journal(journal_id)
+    if fields is None:
+        _index.remove(journal_id)
+    else:
+        _index.upsert(journal_id, fields)
+
+
+def on_places_removed(journal_id):
+    if _index_ready and journal_id in _index:
+        refresh_journal(journal_id)
+
+
+def on_journal_deleted(journal_id):
+    if _index_ready:
+        _index.remove(journal_id)
@@ -0,0 +1,123 @@
+"""
+Conversion of Firestore data to JSON-safe values for dcc.Store and callbacks.
+
+to_jsonable() turns document data into plain dicts, lists, strings and
+numbers:
+    DocumentReference          -> its path ("places/abc")
+    Journal, JournalPlace, Place (models.py) -> their to_dict(), converted
+    GeoPoint                   -> {"lat": ..., "lng": ...}
+    datetime (also Firestore's DatetimeWithNanoseconds) -> ISO 8601 string
+    SERVER_TIMESTAMP, DELETE_FIELD and other sentinels   -> None
+Other values are returned unchanged.
+
+With orjson installed, the data is encoded and decoded by orjson, which walks
+containers and formats datetimes in C and calls default() only for Firestore
+types. Without it, a walk with a type-dispatch table is used: each value costs
+one dict lookup on its exact type instead of a chain of isinstance checks.
+"""
+from datetime import datetime
+
+from google.cloud.firestore_v1._helpers import GeoPoint
+from google.cloud.firestore_v1.document import DocumentReference
+from google.cloud.firestore_v1.transforms import Sentinel
+from src.shared.models import Model
+
+try:
+    import orjson
+except ImportError:  # optional, see requirement.txt
+    orjson = None
+
+
+def _reference_path(value):
+    return value.path
+
+
+def _geopoint(value):
+    return {"lat": value.latitude, "lng": value.longitude}
+
+
+def _isoformat(value):
+    return value.isoformat()
+
+
+def _sentinel(value):
+    return None
+
+
+def _model(value):
+    return _convert_dict(value.to_dict())
+
+
+# Base class -> converter. Subclasses (DatetimeWithNanoseconds, test doubles of
+# DocumentReference) are resolved through their MRO once and then cached in
+# _dispatch under their own type.
+_CONVERTERS = {
+    DocumentReference: _reference_path,
+    GeoPoint: _geopoint,
+    datetime: _isoformat,
+    Sentinel: _sentinel,
+    Model: _model,
+}
+_PASSTHROUGH = object()
+
+
+def _resolve(value_type):
+    for base in value_type.__mro__:
+        converter = _CONVERTERS.get(base)
+        if converter is not None:
+            return converter
+    return _PASSTHROUGH
+
+
+def _convert_dict(value):
+    return {k: _walk(v) for k, v in value.items()}
+
+
+def _convert_list(value):
+    return [_walk(v) for v in value]
+
+
+_dispatch = {
+    str: _PASSTHROUGH,
+    int: _PASSTHROUGH,
+    float: _PASSTHROUGH,
+    bool: _PASSTHROUGH,
+    type(None): _PASSTHROUGH,
+    dict: _convert_dict,
+    list: _convert_list,
+    tuple: _convert_list,
+    **_CONVERTERS,
+}
+
+
+def _walk(value):
+    value_type = type(value)
+    converter = _dispatch.get(value_type)
+    if converter is None:
+        converter = _dispatch[value_type] = _resolve(value_type)
+    if converter is _PASSTHROUGH:
+        return value
+    return converter(value)
+
+
+def default(value):
+    """orjson `default` hook for the types orjson does not encode itself."""
+    converter = _dispatch.get(type(value)) or _resolve(type(value))
+    if converter is _PASSTHROUGH or converter in (_convert_dict, _convert_list):
+        raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+    if converter is _model:
+        # orjson encodes the dict itself and calls back for the values inside
+        return value.to_dict()
+    return converter(value)
+
+
+def to_jsonable(data):
+    """Returns a JSON-safe copy of Firestore document data."""
+    if orjson is not None:
+        try:
+            return orjson.loads(orjson.dumps(data, default=default))
+        except TypeError:
+            # Non-string keys or types orjson rejects; the walk passes them through
+            pass
+    return _walk(data)
+
@@ -0,0 +1,60 @@
+"""
+Server-side copies of the journals open in browsers.
+
+The journal pages keep only a handle, {"id": ..., "revision": ...}, in their
+dcc.Store components instead of the whole document. The browser sends every
+State back with each callback, so a full journal made each edit-page request
+several kilobytes; a handle is a few dozen bytes. Callbacks that need the
+journal look it up here by handle.
+
+Entries are keyed by (journal_id, revision) and never change: a write to the
+journal bumps its revision, so new data gets a new handle. A handle that is
+not in this worker's store (other worker, expired entry) is loaded again from
+Firestore.
+"""
+from src.shared.shared_cache import LockedTTLCache
+from src.shared.journal_utils import get_journal_with_details, journal_cache, REVISION_FIELD
+
+# (journal_id, revision) -> journal as returned by get_journal_with_details
+journal_snapshots = LockedTTLCache(maxsize=256, ttl=1800)
+
+
+def _drop_snapshots(journal_id):
+    journal_snapshots.discard_where(lambda key: key[0] == journal_id)
+
+
+# Frees a changed journal early; a handle without an entry is loaded again
+journal_cache.on_invalidate(_drop_snapshots)
+
+
+def journal_handle(journal):
+    """The handle stored in the browser for a journal."""
+    return {"id": journal["id"], "revision": journal.get(REVISION_FIELD, 0)}
+
+
+def put_journal(journal):
+    """Keeps a sanitized journal and returns its handle."""
+    handle = journal_handle(journal)
+    journal_snapshots[(handle["id"], handle["revision"])] = journal
+    return handle
+
+
+def load_journal(journal_id):
+    """Reads a journal from Firestore into the store. Returns (journal, handle)."""
+    journal = get_journal_with_details(journal_id)
+    if not journal:
+        return None, None
+    return journal, put_journal(journal)
+
+
+def get_journal(handle):
+    """
+    Returns the journal for a handle, or None. The result is shared with the
+    store and must not be mutated.
+    """
+    if not handle or not handle.get("id"):
+        return None
+    journal = journal_snapshots.get((handle["id"], handle.get("revision")))
+    if journal is None:
+        journal, _ = load_journal(handle["id"])
+    return journal
@@ -0,0 +1,570 @@
+"""
+Two-level caches shared by all workers.
+
+Each gunicorn worker and Cloud Run instance used to keep its own TTLCache, so
+a journal read by one worker was read again by every other one, and clearing
+a cache after a write only reached the worker that wrote. A TwoLevelCache
+keeps a small TTLCache in the process in front of a shared tier:
+
+    get(key)         local entry, else shared entry (copied into the local
+                     tier), else None
+    set(key, value)  stores in both tiers (set_many/get_many for batches)
+    get_many_or_load(keys, load_many)
+                     cached values, loading the missing ones once for all
+                     concurrent callers (see singleflight.py)
+    invalidate(key)  drops the key from both tiers, bumps its version and
+                     publishes the key on CACHE_CHANNEL, so every worker drops
+                     its local copy
+
+A load that overlaps an invalidation in another worker must not put what
+it read into the shared tier. Every shared key has a version key that
+invalidate() increments; a load reads the versions before it starts, and
+its results are written only where the version is still the same, checked
+and written in one Redis script.
+
+The shared tier is Redis when REDIS_URL is set and the redis package is
+installed (it is optional, see requirement.txt). Without it the caches are
+local only and behave as the plain TTLCaches did, except those created with
+require_shared=True, which then do not cache at all: their entries are
+changed from background jobs in any worker, and invalidations only reach
+the other workers through the shared tier. That is the single-instance
+mode deploy.sh falls back to without a REDIS_URL secret. MemoryBackend is an
+in-process stand-in with the same interface for benchmarks and tests; a
+fakeredis client can also be passed to RedisBackend.
+
+Caches that stay in the process (keyed by revision, or too short-lived to
+share) use LockedTTLCache, a TTLCache that is safe to use from the threads
+of a worker.
+
+Values are stored in Redis as JSON (orjson when installed). Datetimes,
+GeoPoints, document references and the models of models.py are tagged and
+rebuilt on read; values of other types stay in the local tier. The backend
+connects on first use in each process, never at import, because the app is
+imported in the gunicorn master before the workers are forked.
+
+Settings:
+    REDIS_URL          e.g. redis://10.0.0.3:6379/0 (default unset, local only)
+    CACHE_KEY_PREFIX   prefix of the Redis keys and channel (default "apaplan")
+"""
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+from cachetools import TTLCache
+from google.cloud.firestore_v1._helpers import GeoPoint
+from google.cloud.firestore_v1.document import DocumentReference
+from src.shared.metrics import count_cache
+from src.shared.models import Model, Place, Journal
+from src.shared.singleflight import SingleFlight
+
+try:
+    import redis
+except ImportError:  # optional, see requirement.txt
+    redis = None
+
+try:
+    import orjson
+except ImportError:  # optional, see requirement.txt
+    orjson = None
+
+REDIS_URL = os.getenv("REDIS_URL")
+CACHE_KEY_PREFIX = os.getenv("CACHE_KEY_PREFIX", "apaplan")
+CACHE_CHANNEL = f"{CACHE_KEY_PREFIX}:cache-invalidations"
+
+# Version keys outlive any load in flight; one that expired only makes the
+# next conditional write skip the shared tier.
+VERSION_TTL = 24 * 3600
+
+_caches = {}  # name -> TwoLevelCache, for routing invalidation messages
+_backend = None
+_backend_pid = None
+_backend_lock = threading.Lock()
+
+# Models that may be shared, by the tag they are stored under
+_MODELS = {cls.__name__: cls for cls in (Place, Journal)}
+_TYPE = "__type__"
+
+
+def _encode_default(value):
+    if isinstance(value, datetime):
+        return {_TYPE: "datetime", "value": value.isoformat()}
+    if isinstance(value, GeoPoint):
+        return {_TYPE: "geopoint", "value": [value.latitude, value.longitude]}
+    if isinstance(value, DocumentReference):
+        return {_TYPE: "reference", "value": value.path}
+    if isinstance(value, Model) and _MODELS.get(type(value).__name__) is type(value):
+        return {
+            _TYPE: "model",
+            "model": type(value).__name__,
+            "id": value.id,
+            # Fields and extra only: Journal.to_dict() adds the id as well
+            "value": Model.to_dict(value),
+        }
+    raise TypeError(f"Type is not shareable: {type(value).__name__}")
+
+
+def _decode_tagged(data):
+    kind = data[_TYPE]
+    if kind == "datetime":
+        return datetime.fromisoformat(data["value"])
+    if kind == "geopoint":
+        return GeoPoint(*data["value"])
+    if kind == "reference":
+        from firebase_admin import firestore
+
+        return firestore.client().document(data["value"])
+    if kind == "model":
+        return _MODELS[data["model"]].from_dict(data["id"], _decode(data["value"]))
+    raise ValueError(f"Unknown shared cache type {kind!r}")
+
+
+def _decode(value):
+    if isinstance(value, dict):
+        if _TYPE in value:
+            return _decode_tagged(value)
+        return {key: _decode(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_decode(item) for item in value]
+    return value
+
+
+def dumps(value):
+    """Encodes a cache value for the shared tier; TypeError if it cannot be."""
+    if orjson is not None:
+        # Datetimes go through _encode_default too, so they come back as datetimes
+        return orjson.dumps(value, default=_encode_default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+    return json.dumps(value, default=_encode_default, separators=(",", ":")).encode()
+
+
+def loads(data):
+    """Decodes a value written by dumps()."""
+    return _decode(orjson.loads(data) if orjson is not None else json.loads(data))
+
+
+class MemoryBackend:
+    """
+    Shared tier kept in this process, in place of Redis. Values are stored
+    encoded as they would be in Redis, and invalidations reach the
+    subscribers at once.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}  # key -> (expires_at, data)
+        self._subscribers = []
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        with self._lock:
+            found = []
+            for key in keys:
+                entry = self._entries.get(key)
+                found.append(entry[1] if entry and entry[0] > now else None)
+            return found
+
+    def set_many(self, blobs, ttl):
+        expires_at = time.monotonic() + ttl
+        with self._lock:
+            for key, data in blobs.items():
+                self._entries[key] = (expires_at, data)
+
+    def set_many_if_unchanged(self, items, ttl):
+        now = time.monotonic()
+        with self._lock:
+            for key, version_key, expected, data in items:
+                entry = self._entries.get(version_key)
+                version = entry[1] if entry and entry[0] > now else None
+                if version == expected:
+                    self._entries[key] = (now + ttl, data)
+
+    def invalidate(self, key, version_key):
+        with self._lock:
+            self._entries.pop(key, None)
+            entry = self._entries.get(version_key)
+            version = int(entry[1]) if entry and entry[0] > time.monotonic() else 0
+            self._entries[version_key] = (
+                time.monotonic() + VERSION_TTL, str(version + 1).encode()
+            )
+
+    def publish(self, message):
+        for callback in list(self._subscribers):
+            callback(message)
+
+    def subscribe(self, callback):
+        self._subscribers.append(callback)
+
+
+class RedisBackend:
+    """Shared tier in Redis, with invalidations sent over pub/sub."""
+
+    # KEYS: the value keys, then their version keys. ARGV: the versions the
+    # values were loaded at ("" for none), the values, then the TTL.
+    SET_IF_UNCHANGED = """
+    local n = #KEYS / 2
+    for i = 1, n do
+        if (redis.call('GET', KEYS[n + i]) or '') == ARGV[i] then
+            redis.call('SET', KEYS[i], ARGV[n + i], 'EX', ARGV[2 * n + 1])
+        end
+    end
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self._set_if_unchanged = client.register_script(self.SET_IF_UNCHANGED)
+
+    @classmethod
+    def from_url(cls, url):
+        return cls(redis.Redis.from_url(url, socket_timeout=1, socket_connect_timeout=1))
+
+    def get_many(self, keys):
+        return self.client.mget(keys)
+
+    def set_many(self, blobs, ttl):
+        pipeline = self.client.pipeline(transaction=False)
+        for key, data in blobs.items():
+            pipeline.set(key, data, ex=int(ttl))
+        pipeline.execute()
+
+    def set_many_if_unchanged(self, items, ttl):
+        keys = [key for key, _, _, _ in items] + [version_key for _, version_key, _, _ in items]
+        args = [expected or b"" for _, _, expected, _ in items] + [data for _, _, _, data in items]
+        self._set_if_unchanged(keys=keys, args=args + [int(ttl)])
+
+    def invalidate(self, key, version_key):
+        pipeline = self.client.pipeline(transaction=True)
+        pipeline.delete(key)
+        pipeline.incr(version_key)
+        pipeline.expire(version_key, VERSION_TTL)
+        pipeline.execute()
+
+    def publish(self, message):
+        self.client.publish(CACHE_CHANNEL, message)
+
+    def subscribe(self, callback):
+        def listen():
+            while True:
+                try:
+                    pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                    pubsub.subscribe(CACHE_CHANNEL)
+                    for message in pubsub.listen():
+                        callback(message["data"])
+                except Exception as e:
+                    logging.warning(f"Cache invalidation listener reconnecting: {e}")
+                    time.sleep(1)
+
+        threading.Thread(target=listen, name="cache-invalidations", daemon=True).start()
+
+
+def _on_message(message):
+    try:
+        data = json.loads(message)
+        cache = _caches.get(data["cache"])
+        if cache is not None:
+            cache.drop_local(data["key"])
+    except (ValueError, KeyError, TypeError) as e:
+        logging.warning(f"Ignoring malformed cache invalidation {message!r}: {e}")
+
+
+def _install(backend):
+    global _backend, _backend_pid
+    _backend = backend
+    _backend_pid = os.getpid()
+    if backend is not None:
+        backend.subscribe(_on_message)
+
+
+def configure(backend):
+    """
+    Sets the shared tier for this process (None for local only) and
+    subscribes it to invalidations. Used by benchmarks and tests.
+    """
+    with _backend_lock:
+        _install(backend)
+
+
+def get_backend():
+    """The shared tier of this process, set up from REDIS_URL on first use."""
+    if _backend_pid != os.getpid():
+        with _backend_lock:
+            if _backend_pid != os.getpid():
+                backend = None
+                if REDIS_URL and redis is not None:
+                    backend = RedisBackend.from_url(REDIS_URL)
+                elif REDIS_URL:
+                    logging.warning("REDIS_URL is set but redis is not installed; caches are local only.")
+                _install(backend)
+    return _backend
+
+
+class LockedTTLCache(TTLCache):
+    """
+    A TTLCache that several threads can use at once. cachetools caches are
+    not thread-safe: even a read can expire entries and reorders the
+    eviction links, so every access takes the cache's lock.
+    """
+
+    def __init__(self, maxsize, ttl):
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.RLock()
+
+    def __getitem__(self, key):
+        with self._lock:
+            return super().__getitem__(key)
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        with self._lock:
+            super().__delitem__(key)
+
+    def __contains__(self, key):
+        with self._lock:
+            return super().__contains__(key)
+
+    def get(self, key, default=None):
+        with self._lock:
+            return super().get(key, default)
+
+    def pop(self, key, *default):
+        with self._lock:
+            return super().pop(key, *default)
+
+    def clear(self):
+        with self._lock:
+            super().clear()
+
+    def discard_where(self, predicate):
+        """Drops the keys for which predicate(key) is true."""
+        with self._lock:
+            for key in [key for key in self.keys() if predicate(key)]:
+                super().pop(key, None)
+
+
+class _Entry:
+    __slots__ = ("value", "fresh_until")
+
+    def __init__(self, value, fresh_until):
+        self.value = value
+        self.fresh_until = fresh_until  # time.time(), comparable across workers
+
+
+class TwoLevelCache:
+    """
+    A named cache with a local TTLCache in front of the shared tier. Keys
+    are strings; None cannot be stored, since get() returns None on a miss.
+    Cached values are shared and must not be mutated.
+
+    Entries are fresh for `ttl` seconds and then kept `stale_ttl` seconds
+    more, during which get_many_or_load() still returns them while it
+    reloads them in the background. get() and get_many() return only fresh
+    entries.
+
+    With require_shared=True nothing is cached while there is no shared
+    tier; get_many_or_load() then still shares loads between concurrent
+    callers.
+    """
+
+    def __init__(self, name, maxsize, ttl, shared_ttl=None, stale_ttl=0, require_shared=False):
+        self.name = name
+        self.ttl = ttl
+        self.shared_ttl = shared_ttl or ttl
+        self.stale_ttl = stale_ttl
+        self.require_shared = require_shared
+        self.local = TTLCache(maxsize=maxsize, ttl=ttl + stale_ttl)
+        self.flights = SingleFlight(name)
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._invalidations = 0
+        _caches[name] = self
+
+    def _shared_key(self, key):
+        return f"{CACHE_KEY_PREFIX}:{self.name}:{key}"
+
+    def _version_key(self, key):
+        return f"{CACHE_KEY_PREFIX}:{self.name}-version:{key}"
+
+    def _disabled(self):
+        return self.require_shared and get_backend() is None
+
+    def _lookup_many(self, keys):
+        """Returns {key: _Entry} for the keys found in either tier, stale or not."""
+        if self._disabled():
+            count_cache(self.name, "miss", len(keys))
+            return {}
+        found = {}
+        missing = []
+        with self._lock:
+            for key in keys:
+                entry = self.local.get(key)
+                if entry is not None:
+                    found[key] = entry
+                else:
+                    missing.append(key)
+        if found:
+            count_cache(self.name, "local", len(found))
+
+        backend = get_backend() if missing else None
+        if backend is not None:
+            try:
+                blobs = backend.get_many([self._shared_key(key) for key in missing])
+            except Exception as e:
+                logging.warning(f"Shared cache read failed for {self.name}: {e}")
+                blobs = [None] * len(missing)
+            hits = {}
+            for key, blob in zip(missing, blobs):
+                if blob is not None:
+                    try:
+                        hits[key] = _Entry(*loads(blob))
+                    except Exception as e:
+                        logging.warning(f"Dropping unreadable shared cache entry {self.name}:{key}: {e}")
+            if hits:
+                with self._lock:
+                    self.local.update(hits)
+                found.update(hits)
+                count_cache(self.name, "shared", len(hits))
+
+        misses = len(keys) - len(found)
+        if misses:
+            count_cache(self.name, "miss", misses)
+        return found
+
+    def get_many(self, keys):
+        """Returns {key: value} for the keys with a fresh entry in either tier."""
+        now = time.time()
+        return {
+            key: entry.value
+            for key, entry in self._lookup_many(keys).items()
+            if entry.fresh_until > now
+        }
+
+    def get(self, key):
+        return self.get_many([key]).get(key)
+
+    def get_many_or_load(self, keys, load_many):
+        """
+        Returns {key: value} for `keys`, calling load_many(missing_keys) ->
+        {key: value} for the keys not cached and storing what it returns.
+        Concurrent calls missing the same keys share one load_many call.
+        Stale entries are returned as they are and reloaded in the
+        background. Keys load_many does not return are left out.
+        """
+        entries = self._lookup_many(keys)
+        now = time.time()
+        found = {key: entry.value for key, entry in entries.items()}
+        stale = sorted(key for key, entry in entries.items() if entry.fresh_until <= now)
+        missing = sorted(key for key in keys if key not in entries)
+
+        if stale:
+            count_cache(self.name, "stale", len(stale))
+            self.flights.refresh(tuple(stale), lambda: self._load(stale, load_many))
+        if missing:
+            found.update(self.flights.do(tuple(missing), lambda: self._load(missing, load_many)))
+        return found
+
+    def get_or_load(self, key, load):
+        """get_many_or_load for one key; load() returns the value or None."""
+        def load_many(keys):
+            value = load()
+            return {} if value is None else {key: value}
+
+        return self.get_many_or_load([key], load_many).get(key)
+
+    def _versions(self, keys):
+        """The shared versions of keys, or None if they cannot be read."""
+        backend = get_backend()
+        if backend is None or self._disabled():
+            return None
+        try:
+            return dict(zip(keys, backend.get_many([self._version_key(key) for key in keys])))
+        except Exception as e:
+            logging.warning(f"Shared cache version read failed for {self.name}: {e}")
+            return None
+
+    def _load(self, keys, load_many):
+        invalidations = self._invalidations
+        versions = self._versions(keys)
+        loaded = load_many(keys)
+        # An invalidation during the load may mean the loaded data is old
+        # already; return it to the callers waiting for it, but don't cache it.
+        # This worker's own invalidations are counted here, other workers'
+        # show up as a changed version when writing to the shared tier.
+        if self._invalidations == invalidations:
+            self._store(loaded, versions, conditional=True)
+        return loaded
+
+    def set_many(self, items):
+        """Stores {key: value} in both tiers."""
+        self._store(items)
+
+    def set(self, key, value):
+        self.set_many({key: value})
+
+    def _store(self, items, versions=None, conditional=False):
+        """
+        Stores items in both tiers. With conditional=True, each value goes to
+        the shared tier only if its version is still the one in `versions`
+        (and not at all if the versions could not be read).
+        """
+        if not items or self._disabled():
+            return
+        fresh_until = time.time() + self.ttl
+        with self._lock:
+            for key, value in items.items():
+                self.local[key] = _Entry(value, fresh_until)
+        backend = get_backend()
+        if backend is None or (conditional and versions is None):
+            return
+        blobs = {}
+        for key, value in items.items():
+            try:
+                blobs[key] = dumps([value, fresh_until])
+            except TypeError as e:
+                logging.debug(f"Not sharing {self.name}:{key}: {e}")
+        if not blobs:
+            return
+        ttl = self.shared_ttl + self.stale_ttl
+        try:
+            if conditional:
+                backend.set_many_if_unchanged([
+                    (self._shared_key(key), self._version_key(key), versions.get(key), blob)
+                    for key, blob in blobs.items()
+                ], ttl)
+            else:
+                backend.set_many(
+                    {self._shared_key(key): blob for key, blob in blobs.items()}, ttl
+                )
+        except Exception as e:
+            logging.warning(f"Shared cache write failed for {self.name}: {e}")
+
+    def on_invalidate(self, callback):
+        """Calls callback(key) whenever a key is invalidated, by any worker."""
+        self._listeners.append(callback)
+
+    def drop_local(self, key):
+        """Drops a key from this worker only."""
+        with self._lock:
+            self._invalidations += 1
+            self.local.pop(key, None)
+        for callback in self._listeners:
+            callback(key)
+
+    def invalidate(self, key):
+        """Drops a key from both tiers and tells every worker to drop it."""
+        self.drop_local(key)
+        backend = get_backend()
+        if backend is None:
+            return
+        try:
+            backend.invalidate(self._shared_key(key), self._version_key(key))
+            backend.publish(json.dumps({"cache": self.name, "key": key}))
+        except Exception as e:
+            logging.warning(f"Shared cache invalidation failed for {self.name}:{key}: {e}")
+
+    def clear(self):
+        """Empties the local tier of this worker."""
+        with self._lock:
+            self.local.clear()
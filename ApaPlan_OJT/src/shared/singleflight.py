@@ -0,0 +1,80 @@
+"""
+Request coalescing for cache misses.
+
+When a shared journal is opened by many viewers at once, or the 5 second
+refresh of several tabs lines up, every request that misses the cache used
+to run the same Firestore read. SingleFlight.do(key, func) runs func once per
+key at a time: calls made while it is running wait for it and get the same
+result (or the same exception) instead of starting their own read.
+
+SingleFlight.refresh(key, func) starts func in a background thread unless it
+is already running, and returns at once. Caches use it to reload an expired
+entry while still serving the old value (stale-while-revalidate, see
+shared_cache.TwoLevelCache.get_many_or_load).
+
+Coalescing works within one worker process; the shared cache tier already
+spares the other workers most of the reads.
+"""
+import logging
+import threading
+from src.shared.metrics import count_coalesced
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key. `name` labels the metrics."""
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> _Call in flight
+
+    def do(self, key, func):
+        """Returns func(), sharing one run among concurrent calls with `key`."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            count_coalesced(self.name)
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self, key):
+        with self._lock:
+            return key in self._calls
+
+    def refresh(self, key, func):
+        """Runs func() in the background unless a call with `key` is running."""
+        if self.in_flight(key):
+            return
+
+        def run():
+            try:
+                self.do(key, func)
+            except Exception as e:
+                logging.warning(f"Background refresh of {self.name} {key!r} failed: {e}")
+
+        threading.Thread(target=run, name=f"refresh-{self.name}", daemon=True).start()
@@ -0,0 +1,134 @@
+"""
+Timing spans for data-access functions, with a structured slow-operation log.
+
+Decorate a function with @timed() (optionally with a document path template
+such as "travelJournals/{journal_id}") and each call becomes a span: its wall
+time is measured and the Firestore and Storage operations counted while it
+runs (see metrics.count_op) are added up. A span that takes longer than
+SLOW_OP_THRESHOLD_MS is written as one JSON line to the "apaplan.slow_ops"
+logger:
+
+    {"severity": "WARNING", "message": "slow_op", "function": "get_journal",
+     "path": "travelJournals/abc", "ops": 1, "duration_ms": 812.4}
+
+Cloud Logging turns such lines into structured entries. Settings:
+    SLOW_OP_THRESHOLD_MS  slow span threshold in ms (default 500; 0 logs every span)
+    SPAN_SAMPLE_RATE      fraction of calls that are timed at all (default 1).
+                          Under high traffic a small rate keeps the overhead
+                          and log volume down; calls outside the sample, and
+                          the spans nested in them, skip the timing entirely.
+"""
+import os
+import sys
+import json
+import time
+import random
+import string
+import logging
+import inspect
+import functools
+import contextvars
+
+SLOW_OP_THRESHOLD_MS = float(os.getenv("SLOW_OP_THRESHOLD_MS", "500"))
+SPAN_SAMPLE_RATE = float(os.getenv("SPAN_SAMPLE_RATE", "1"))
+
+logger = logging.getLogger("apaplan.slow_ops")
+if not logger.handlers:
+    # Plain JSON lines, without the usual "LEVEL:name:" prefix
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+_NOT_SAMPLED = object()
+_current = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    __slots__ = ("function", "path", "ops", "started")
+
+    def __init__(self, function, path):
+        self.function = function
+        self.path = path
+        self.ops = 0
+        self.started = time.perf_counter()
+
+
+def add_ops(amount):
+    """Adds backend operations to the span that is running, if any."""
+    span = _current.get()
+    if span is not None and span is not _NOT_SAMPLED:
+        span.ops += amount
+
+
+def _emit(span, duration_ms):
+    logger.warning(json.dumps({
+        "severity": "WARNING",
+        "message": "slow_op",
+        "function": span.function,
+        "path": span.path,
+        "ops": span.ops,
+        "duration_ms": round(duration_ms, 1),
+    }))
+
+
+def _path_getter(func, template):
+    """Returns a function building the document path from a call's arguments."""
+    if template is None:
+        return lambda args, kwargs: None
+    names = [field for _, field, _, _ in string.Formatter().parse(template) if field]
+    params = list(inspect.signature(func).parameters)
+    positions = {name: params.index(name) for name in names}
+
+    def get_path(args, kwargs):
+        values = {}
+        for name, position in positions.items():
+            if name in kwargs:
+                values[name] = kwargs[name]
+            elif position < len(args):
+                values[name] = args[position]
+            else:
+                values[name] = None
+        return template.format(**values)
+
+    return get_path
+
+
+def timed(path=None):
+    """
+    Decorator making every call of a function a span. `path` is an optional
+    template for the document or collection it works on, filled in from the
+    function's arguments, e.g. "travelJournals/{journal_id}".
+    """
+    def decorate(func):
+        name = func.__name__
+        get_path = _path_getter(func, path)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            parent = _current.get()
+            if parent is _NOT_SAMPLED or (
+                parent is None and SPAN_SAMPLE_RATE < 1 and random.random() >= SPAN_SAMPLE_RATE
+            ):
+                token = _current.set(_NOT_SAMPLED)
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    _current.reset(token)
+
+            span = Span(name, get_path(args, kwargs))
+            token = _current.set(span)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _current.reset(token)
+                duration_ms = (time.perf_counter() - span.started) * 1000
+                if parent is not None:
+                    parent.ops += span.ops
+                if duration_ms >= SLOW_OP_THRESHOLD_MS:
+                    _emit(span, duration_ms)
+
+        return wrapper
+
+    return decorate
@@ -0,0 +1,182 @@
+"""
+Garbage collector for orphaned Storage blobs.
+
+Cover re-uploads leave the previous cover behind, deleted journals used to
+leave their covers, and avatar uploads leave old file names. This job lists
+the journal_covers/ and avatars/ prefixes page by page and deletes every blob
+that no journal or user document points at, once it is older than a grace
+period. The grace period protects uploads whose URL has not been saved yet.
+
+Usage (from the ApaPlan_OJT directory):
+    python -m src.shared.storage_gc                  # dry run, prints a report
+    python -m src.shared.storage_gc --delete         # actually delete
+    python -m src.shared.storage_gc --grace-hours 72 --prefix avatars/
+
+The bucket is only used through list_blobs(prefix=..., page_size=...).pages,
+delete_blobs(blobs, on_error=...) and the blobs' name, size and time_created
+attributes, so the job can be run against a local fake bucket.
+"""
+import argparse
+import json
+import logging
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from urllib.parse import unquote
+
+GC_PREFIXES = ("journal_covers/", "avatars/")
+DEFAULT_GRACE_PERIOD = timedelta(hours=24)
+
+# Firestore documents and the field holding a Storage URL
+URL_FIELDS = (
+    ("travelJournals", "cover_image_url"),
+    ("users", "avatar_url"),
+)
+
+
+def blob_name_from_url(url, bucket_name):
+    """
+    Extracts the blob name from a public Storage URL
+    (https://storage.googleapis.com/<bucket>/<name>) or a Firebase download
+    URL (https://firebasestorage.googleapis.com/v0/b/<bucket>/o/<name>).
+    Returns None for URLs that point somewhere else.
+    """
+    if not url:
+        return None
+    url = url.split("?")[0]
+    match = re.search(
+        rf"storage\.googleapis\.com/{re.escape(bucket_name)}/(.+)", url
+    )
+    if match:
+        return unquote(match.group(1))
+    match = re.search(
+        rf"firebasestorage\.googleapis\.com/v0/b/{re.escape(bucket_name)}/o/(.+)", url
+    )
+    if match:
+        return unquote(match.group(1))
+    return None
+
+
+def collect_live_blob_names(db, bucket_name):
+    """
+    Returns the set of blob names referenced by any journal cover or user
+    avatar. Only the URL field of each document is read.
+    """
+    live = set()
+    for collection, field in URL_FIELDS:
+        for doc in db.collection(collection).select([field]).stream():
+            name = blob_name_from_url(doc.to_dict().get(field), bucket_name)
+            if name:
+                live.add(name)
+    return live
+
+
+def iter_blob_pages(bucket, prefix, page_size):
+    """Yields the blobs under a prefix one listing page at a time."""
+    for page in bucket.list_blobs(prefix=prefix, page_size=page_size).pages:
+        yield list(page)
+
+
+def collect_garbage(
+    bucket,
+    live_blob_names,
+    prefixes=GC_PREFIXES,
+    grace_period=DEFAULT_GRACE_PERIOD,
+    dry_run=True,
+    page_size=1000,
+    delete_batch_size=100,
+    now=None,
+):
+    """
+    Deletes unreferenced blobs older than the grace period under each prefix.
+    With dry_run, nothing is deleted and the report lists what would be.
+    Returns a report with counts, bytes and throughput.
+    """
+    now = now or datetime.now(timezone.utc)
+    cutoff = now - grace_period
+    report = {
+        "dry_run": dry_run,
+        "prefixes": list(prefixes),
+        "scanned": 0,
+        "referenced": 0,
+        "too_recent": 0,
+        "orphaned": 0,
+        "orphaned_bytes": 0,
+        "deleted": 0,
+        "failed": 0,
+        "sample_orphans": [],
+    }
+    failed = []
+    started = time.perf_counter()
+
+    def delete(batch):
+        if dry_run or not batch:
+            return
+        before = len(failed)
+        bucket.delete_blobs(batch, on_error=failed.append)
+        report["deleted"] += len(batch) - (len(failed) - before)
+
+    for prefix in prefixes:
+        pending = []
+        for page in iter_blob_pages(bucket, prefix, page_size):
+            for blob in page:
+                report["scanned"] += 1
+                if blob.name in live_blob_names:
+                    report["referenced"] += 1
+                    continue
+                if blob.time_created and blob.time_created > cutoff:
+                    report["too_recent"] += 1
+                    continue
+                report["orphaned"] += 1
+                report["orphaned_bytes"] += blob.size or 0
+                if len(report["sample_orphans"]) < 20:
+                    report["sample_orphans"].append(blob.name)
+                pending.append(blob)
+                if len(pending) >= delete_batch_size:
+                    delete(pending)
+                    pending = []
+        delete(pending)
+
+    elapsed = time.perf_counter() - started
+    report["failed"] = len(failed)
+    report["duration_s"] = round(elapsed, 3)
+    report["blobs_per_second"] = round(report["scanned"] / elapsed, 1) if elapsed else None
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--delete", action="store_true", help="Delete orphans (default is a dry run)")
+    parser.add_argument("--grace-hours", type=float, default=DEFAULT_GRACE_PERIOD.total_seconds() / 3600)
+    parser.add_argument("--prefix", action="append", help="Prefix to scan (repeatable)")
+    parser.add_argument("--page-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    import firebase_config
+    from firebase_admin import storage
+
+    logging.basicConfig(level=logging.INFO)
+    db = firebase_config.init_firebase_admin()
+    bucket = storage.bucket()
+
+    started = time.perf_counter()
+    live = collect_live_blob_names(db, bucket.name)
+    logging.info(
+        f"Collected {len(live)} referenced blobs in {time.perf_counter() - started:.2f}s"
+    )
+
+    report = collect_garbage(
+        bucket,
+        live,
+        prefixes=args.prefix or GC_PREFIXES,
+        grace_period=timedelta(hours=args.grace_hours),
+        dry_run=not args.delete,
+        page_size=args.page_size,
+    )
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+import re
+from collections import Counter
+from datetime import datetime, timedelta
+from src.shared.journal_utils import (
+    journal_cache,
+    get_journal,
+    cached_journal_places,
+    journal_aggregates,
+    rebuild_journal_aggregates,
+    AGGREGATES_FIELD,
+    REVISION_FIELD,
+)
+from src.shared.shared_cache import LockedTTLCache
+
+# Summaries keyed by (journal_id, revision). Moves within a day reorder the
+# places without a new revision, so a journal's summaries are also dropped
+# whenever it is cleared from journal_cache.
+summary_cache = LockedTTLCache(maxsize=256, ttl=3600)
+
+
+def _drop_summaries(journal_id):
+    summary_cache.discard_where(lambda key: key[0] == journal_id)
+
+
+# Run in every worker when any worker clears a journal
+journal_cache.on_invalidate(_drop_summaries)
+
+_POSTCODE_RE = re.compile(r"\b\d[\d\s-]*\b")
+
+
+def region_from_address(address):
+    """
+    Best-effort region of a formatted address: the part before the country,
+    without postcodes ("..., 50450 Kuala Lumpur, Malaysia" -> "Kuala Lumpur").
+    """
+    if not address:
+        return None
+    parts = [part.strip() for part in address.split(",") if part.strip()]
+    if len(parts) < 2:
+        return None
+    region = _POSTCODE_RE.sub("", parts[-2]).strip()
+    return region or None
+
+
+def _trip_dates(start_date_str, days):
+    try:
+        start_date = datetime.strptime(start_date_str.split("T")[0], "%Y-%m-%d")
+    except (ValueError, AttributeError):
+        return []
+    return [
+        (start_date + timedelta(days=i)).strftime("%Y-%m-%d")
+        for i in range(days or 0)
+    ]
+
+
+def _costs(journal, days):
+    total = journal.get("total_cost")
+    costs = {"total": total, "currency": journal.get("currency"), "per_day": None}
+    if isinstance(total, (int, float)) and days:
+        costs["per_day"] = round(total / days, 2)
+    return costs
+
+
+def build_summary(journal, places=None):
+    """
+    Builds a structured day-by-day summary of a journal. With the journal's
+    places, each day lists its place names and regions; without them, the
+    journal's aggregates give the per-day counts, names and categories.
+    """
+    aggregates = journal_aggregates(journal) or {
+        "place_count": 0,
+        "per_day_counts": {},
+        "place_names": {},
+        "category_histogram": {},
+    }
+    trip_dates = _trip_dates(journal.get("start_date"), journal.get("days"))
+
+    if places is not None:
+        places_by_date = {}
+        for place in places:
+            places_by_date.setdefault(place.get("date"), []).append(place)
+        regions = Counter(
+            region
+            for place in places
+            if (region := region_from_address(place.get("address")))
+        )
+        days = []
+        for number, date in enumerate(trip_dates, start=1):
+            day_places = places_by_date.get(date, [])
+            days.append({
+                "day": number,
+                "date": date,
+                "place_count": len(day_places),
+                "places": [p.get("name") for p in day_places if p.get("name")],
+                "regions": list(dict.fromkeys(
+                    region
+                    for p in day_places
+                    if (region := region_from_address(p.get("address")))
+                )),
+            })
+        place_count = len(places)
+        place_names = sorted({p.get("name") for p in places if p.get("name")})
+    else:
+        regions = Counter()
+        days = [
+            {
+                "day": number,
+                "date": date,
+                "place_count": aggregates["per_day_counts"].get(date, 0),
+                "places": [],
+                "regions": [],
+            }
+            for number, date in enumerate(trip_dates, start=1)
+        ]
+        place_count = aggregates["place_count"]
+        place_names = sorted(aggregates["place_names"])
+
+    return {
+        "title": journal.get("title"),
+        "detailed": places is not None,
+        "place_count": place_count,
+        "place_names": place_names,
+        "days": days,
+        "regions": [region for region, _ in regions.most_common()],
+        "categories": dict(Counter(aggregates["category_histogram"]).most_common()),
+        "costs": _costs(journal, len(trip_dates)),
+    }
+
+
+def _join(items):
+    items = list(items)
+    if len(items) <= 1:
+        return "".join(items)
+    return f"{', '.join(items[:-1])} and {items[-1]}"
+
+
+def render_summary(summary):
+    """Turns a structured summary into the text shown in the summary field."""
+    if not summary["place_count"]:
+        return "No places found to generate a summary."
+
+    day_count = len(summary["days"])
+    opening = f"A {day_count}-day journey" if day_count else "A journey"
+    if summary["regions"]:
+        opening += f" through {_join(summary['regions'][:3])}"
+    sentences = [f"{opening} with {summary['place_count']} stops."]
+
+    for day in summary["days"]:
+        if day["places"]:
+            sentences.append(f"Day {day['day']}: {_join(day['places'])}.")
+    if not any(day["places"] for day in summary["days"]) and summary["place_names"]:
+        sentences.append(f"This journey includes visits to: {', '.join(summary['place_names'])}.")
+
+    if summary["categories"]:
+        top = [f"{name.lower()} ({count})" for name, count in list(summary["categories"].items())[:3]]
+        sentences.append(f"Highlights: {_join(top)}.")
+
+    costs = summary["costs"]
+    if costs["total"]:
+        budget = f"Budget: {costs['total']} {costs['currency'] or ''}".rstrip()
+        if costs["per_day"] is not None:
+            budget += f" (about {costs['per_day']} per day)"
+        sentences.append(budget + ".")
+    return " ".join(sentences)
+
+
+def summarize_journal(journal_id):
+    """
+    Returns the structured summary of a journal, or None if it does not
+    exist. Uses the journal's cached places when this worker has them and
+    its aggregates otherwise, and memoizes the result per revision, so
+    repeated calls on an unchanged journal cost one document read.
+    """
+    journal = get_journal(journal_id)
+    if not journal:
+        return None
+
+    revision = journal.get(REVISION_FIELD, 0)
+    key = (journal_id, revision)
+    places = cached_journal_places(journal_id, revision)
+    summary = summary_cache.get(key)
+    # A summary built from aggregates alone is redone once places are cached
+    if summary is not None and (summary["detailed"] or places is None):
+        return summary
+
+    if journal_aggregates(journal) is None:
+        journal[AGGREGATES_FIELD] = rebuild_journal_aggregates(journal_id)
+
+    summary = build_summary(journal, places)
+    summary_cache[key] = summary
+    return summary
@@ -0,0 +1,114 @@
+"""
+Warm-up of a worker: opens its Firestore channel and fills its caches before
+it takes traffic. gunicorn runs it in each worker as it starts
+(post_worker_init in gunicorn.conf.py); GET /warmup reports the result and
+is the Cloud Run startup probe.
+"""
+import time
+import logging
+import threading
+from firebase_admin import firestore
+from src.shared.search_index import get_search_index
+from src.shared.geo_index import get_place_index
+from src.shared.journal_utils import (
+    get_all_journals,
+    get_user_profiles_by_ids,
+    get_currency_data,
+    discover_cache,
+    DISCOVER_CACHE_KEY,
+)
+
+# A degraded warm-up is retried by warmup_report() at most this often
+RETRY_INTERVAL_S = 30
+
+_warmup_lock = threading.Lock()
+_last_warmup = None
+_last_attempt = None
+
+
+def _open_firestore_channel():
+    """Opens the Firestore gRPC channel with a single one-document read."""
+    db = firestore.client()
+    list(db.collection("travelJournals").limit(1).stream())
+
+
+def _prime_discover_feed():
+    """
+    Loads the public journals and their authors into the same caches
+    display_all_journals reads from.
+    """
+    journals = get_all_journals()
+    # get_all_journals returns [] on errors too; only a successful read is cached
+    if discover_cache.get(DISCOVER_CACHE_KEY) is None:
+        raise RuntimeError("could not load the public journals")
+    author_ids = [journal.get("user_id") for journal in journals]
+    get_user_profiles_by_ids(author_ids)
+
+
+WARMUP_STEPS = [
+    ("firestore_channel", _open_firestore_channel),
+    ("discover_feed", _prime_discover_feed),
+    ("currency_data", get_currency_data),
+    # These two only start building the indexes, in background threads
+    ("search_index", get_search_index),
+    ("place_index", get_place_index),
+]
+
+
+def _run_steps(progress):
+    global _last_warmup, _last_attempt
+    _last_attempt = time.monotonic()
+    steps = []
+    started = time.perf_counter()
+    for name, step in WARMUP_STEPS:
+        step_started = time.perf_counter()
+        result = {"step": name, "status": "ok"}
+        try:
+            step()
+        except Exception as e:
+            logging.warning(f"Warm-up step {name} failed: {e}")
+            result["status"] = "error"
+            result["error"] = str(e)
+        result["duration_ms"] = round((time.perf_counter() - step_started) * 1000, 1)
+        steps.append(result)
+        if progress is not None:
+            progress()
+
+    failed = any(step["status"] == "error" for step in steps)
+    _last_warmup = {
+        "status": "degraded" if failed else "ok",
+        "total_ms": round((time.perf_counter() - started) * 1000, 1),
+        "steps": steps,
+    }
+    return _last_warmup
+
+
+def run_warmup(progress=None):
+    """
+    Runs every warm-up step and reports how long each one took, calling
+    progress() after each step (gunicorn's worker heartbeat). A failing step
+    is reported but does not stop the others; the warm-up is then "degraded".
+    """
+    with _warmup_lock:
+        return _run_steps(progress)
+
+
+def warmup_report():
+    """
+    The report of this worker's last warm-up. Runs the warm-up if it has not
+    run yet (the dev server has no post_worker_init), and re-runs a degraded
+    one at most every RETRY_INTERVAL_S, so repeated calls stay cheap.
+    Concurrent callers wait for the run in progress and share its report.
+    """
+    with _warmup_lock:
+        if _last_warmup is None or (
+            _last_warmup["status"] != "ok"
+            and time.monotonic() - _last_attempt >= RETRY_INTERVAL_S
+        ):
+            _run_steps(None)
+        return _last_warmup
+
+
+def is_warm():
+    """Returns True once a warm-up has completed in this process without errors."""
+    return _last_warmup is not None and _last_warmup["status"] == "ok"
@@ -0,0 +1,52 @@
+import os
+import sys
+
+import pytest
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+# The in-memory Firestore used by the benchmarks
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "benchmarks"))
+
+
+def clear_caches():
+    from src.shared import journal_utils, summary, session_store
+
+    for cache in (
+        journal_utils.journal_cache,
+        journal_utils.user_profile_cache,
+        journal_utils.place_cache,
+    ):
+        cache.clear()
+    for cache in (
+        journal_utils.discover_cache,
+        journal_utils.journal_places_cache,
+        summary.summary_cache,
+        session_store.journal_snapshots,
+    ):
+        cache.clear()
+
+
+@pytest.fixture
+def db():
+    """A fresh in-memory Firestore behind firestore.client(), with empty caches."""
+    import fake_firestore
+    from src.shared import journal_utils
+
+    client = fake_firestore.install(modules=[journal_utils])
+    clear_caches()
+    return client
+
+
+@pytest.fixture(scope="module")
+def server():
+    """
+    The app's Flask server over a freshly seeded in-memory Firestore, with
+    Firebase Auth stubbed as in the load test: user{i:06d} signs in with the
+    id token "token-user{i:06d}" and owns journal loadtest{i:04d}.
+    """
+    import loadtest
+
+    app_server = loadtest.create_server("small", users=2)
+    clear_caches()
+    return app_server
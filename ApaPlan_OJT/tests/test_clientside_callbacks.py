@@ -0,0 +1,56 @@
+import pytest
+
+# Pure UI toggles, keyed by their output as Dash registers it. They must stay
+# clientside: as server callbacks every click is a round trip to a worker.
+CLIENTSIDE_TOGGLES = {
+    "signup_modal.opened",
+    "reset_modal.opened",
+    "journal-modal.opened",
+    "..delete-confirm-modal.opened...journal-to-delete-store.data..",
+    "edit-mode-store.data",
+    "..profile-view-mode.style...profile-edit-mode.style..",
+    "password-modal.opened",
+    "add-place-modal.opened",
+}
+
+# Callbacks that need the server and must not move to the browser
+SERVER_CALLBACKS = {
+    "journal-summary-input.value",
+    "signup_status.children",
+    "reset_status.children",
+}
+
+
+def _base_output(output):
+    # allow_duplicate outputs are registered as "<id>.<prop>@<hash>"
+    return output.split("@")[0]
+
+
+@pytest.fixture(scope="module")
+def app(server):
+    from src import main
+
+    return main.app
+
+
+def test_modal_toggles_are_clientside(app):
+    clientside = {
+        _base_output(callback["output"])
+        for callback in app._callback_list
+        if callback.get("clientside_function")
+    }
+    assert CLIENTSIDE_TOGGLES <= clientside
+
+    for output, entry in app.callback_map.items():
+        if _base_output(output) in CLIENTSIDE_TOGGLES:
+            assert "callback" not in entry, f"{output} has a server-side callback"
+
+
+def test_server_callbacks_stay_on_the_server(app):
+    server_side = {
+        _base_output(output)
+        for output, entry in app.callback_map.items()
+        if "callback" in entry
+    }
+    assert SERVER_CALLBACKS <= server_side
+    assert not server_side & CLIENTSIDE_TOGGLES
@@ -0,0 +1,74 @@
+import os
+import threading
+import time
+
+import diskcache
+import pytest
+
+from src.shared.job_manager import ThreadJobManager
+
+
+@pytest.fixture
+def manager(tmp_path):
+    return ThreadJobManager(diskcache.Cache(str(tmp_path)), max_workers=2)
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.01)
+
+
+def test_job_runs_in_this_process_and_stores_its_result(manager):
+    def job_fn(key, progress_key, args, context):
+        manager.handle.set(key, {"pid": os.getpid(), "args": args})
+
+    job = manager.call_job_fn("result", job_fn, [1, 2], {})
+
+    wait_until(lambda: manager.result_ready("result"))
+    wait_until(lambda: not manager.job_running(job))
+    assert manager.get_result("result", job) == {"pid": os.getpid(), "args": [1, 2]}
+
+
+def test_job_is_running_until_it_finishes(manager):
+    release = threading.Event()
+
+    def job_fn(key, progress_key, args, context):
+        release.wait(5)
+        manager.handle.set(key, "done")
+
+    job = manager.call_job_fn("result", job_fn, [], {})
+    assert manager.job_running(job)
+    # Another worker polling sees the same marker in the shared cache
+    other_worker = ThreadJobManager(manager.handle)
+    assert other_worker.job_running(job)
+
+    release.set()
+    wait_until(lambda: not manager.job_running(job))
+    assert manager.get_result("result", job) == "done"
+
+
+def test_job_of_a_dead_worker_is_not_running(manager):
+    manager.handle.set(manager._marker_key(42), 2 ** 22 + 12345)  # no such pid
+    assert not manager.job_running(42)
+    assert manager.terminate_unhealthy_job(42)
+
+
+def test_terminated_job_stops_counting_as_running(manager):
+    release = threading.Event()
+
+    def job_fn(key, progress_key, args, context):
+        release.wait(5)
+
+    job = manager.call_job_fn("result", job_fn, [], {})
+    manager.terminate_job(job)
+    assert not manager.job_running(job)
+    release.set()
+
+
+def test_new_job_does_not_see_a_stale_result(manager):
+    manager.handle.set("result", "left by a cancelled job")
+    manager.call_job_fn("result", lambda *args: None, [], {})
+    assert manager.handle.get("result") is None
@@ -0,0 +1,91 @@
+import json
+from collections import defaultdict
+
+import pytest
+
+from loadtest import Dependencies, VirtualUser, edit_journal_id
+from loadtest import TestClientTransport as Transport  # not a test class
+from src.shared import journal_utils
+
+OWNER_TOKEN = "token-user000000"
+OTHER_TOKEN = "token-user000001"
+DELETE_BUTTONS = '{"index":["ALL"],"type":"delete-place-btn"}.n_clicks'
+OPTIMIZE_BUTTONS = '{"date":["ALL"],"type":"optimize-day-btn"}.n_clicks'
+
+
+@pytest.fixture(scope="module")
+def user(server):
+    transport = Transport(server)
+    _, specs = transport.get("/_dash-dependencies")
+    return VirtualUser(transport, Dependencies(json.loads(specs)), None, 0, defaultdict(list))
+
+
+@pytest.fixture
+def journal_id(server):
+    return edit_journal_id(0)
+
+
+def place_ids(journal_id):
+    return [place["journal_place_doc_id"] for place in journal_utils.fetch_all_journal_places(journal_id)]
+
+
+def click(user, name, buttons, button, journal_id, id_token):
+    return user.call(
+        name, "edit-notification.children", buttons,
+        {
+            buttons: [(button, 1)],
+            "url.pathname": f"/journal/{journal_id}/edit",
+            "auth-store.data": {"idToken": id_token} if id_token else None,
+        },
+        changed=f'{json.dumps(button, sort_keys=True, separators=(",", ":"))}.n_clicks',
+    )
+
+
+def delete_place(user, journal_id, doc_id, id_token):
+    button = {"index": doc_id, "type": "delete-place-btn"}
+    return click(user, "handle_delete_place", DELETE_BUTTONS, button, journal_id, id_token)
+
+
+def optimize_day(user, journal_id, date, id_token):
+    button = {"date": date, "type": "optimize-day-btn"}
+    return click(user, "handle_optimize_day", OPTIMIZE_BUTTONS, button, journal_id, id_token)
+
+
+@pytest.mark.parametrize("id_token", [OTHER_TOKEN, None])
+def test_only_the_owner_can_delete_a_place(user, journal_id, id_token):
+    doc_id = place_ids(journal_id)[0]
+
+    updated = delete_place(user, journal_id, doc_id, id_token)
+
+    assert updated["edit-notification.color"] == "red"
+    assert doc_id in place_ids(journal_id)
+
+
+def test_owner_deletes_a_place(user, journal_id):
+    doc_id = place_ids(journal_id)[0]
+
+    updated = delete_place(user, journal_id, doc_id, OWNER_TOKEN)
+
+    assert updated["edit-notification.color"] == "blue"
+    assert doc_id not in place_ids(journal_id)
+
+
+@pytest.mark.parametrize("id_token", [OTHER_TOKEN, None])
+def test_only_the_owner_can_optimize_a_day(user, journal_id, id_token):
+    date = journal_utils.fetch_all_journal_places(journal_id)[0]["date"]
+    revision = journal_utils.get_journal_revision(journal_id)
+
+    updated = optimize_day(user, journal_id, date, id_token)
+
+    assert updated["edit-notification.color"] == "red"
+    assert journal_utils.get_journal_revision(journal_id) == revision
+
+
+def test_owner_optimizes_a_day(user, journal_id):
+    date = journal_utils.fetch_all_journal_places(journal_id)[0]["date"]
+    revision = journal_utils.get_journal_revision(journal_id)
+
+    updated = optimize_day(user, journal_id, date, OWNER_TOKEN)
+
+    assert updated["edit-notification.color"] == "green"
+    assert journal_utils.get_journal_revision(journal_id) > revision
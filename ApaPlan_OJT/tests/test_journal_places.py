@@ -0,0 +1,57 @@
+import pytest
+
+from src.shared import journal_utils
+
+
+def place(place_id, date):
+    return {"place_id": place_id, "name": place_id, "date": date, "category": "food"}
+
+
+@pytest.fixture
+def journal(db):
+    db.collection("travelJournals").document("j1").set(
+        {"user_id": "u1", "journal_name": "Trip", "revision": 0}
+    )
+    return "j1"
+
+
+def day_names(journal_id, date):
+    return [p["name"] for p in journal_utils.fetch_journal_places(journal_id, date)]
+
+
+def test_added_places_go_after_the_last_place_of_their_day(journal):
+    assert journal_utils.save_places_to_journal(
+        journal, [place("a", "2026-01-01"), place("b", "2026-01-01"), place("x", "2026-01-02")]
+    )
+    assert journal_utils.save_places_to_journal(journal, [place("c", "2026-01-01")])
+
+    assert day_names(journal, "2026-01-01") == ["a", "b", "c"]
+    assert day_names(journal, "2026-01-02") == ["x"]
+
+
+def test_added_place_goes_after_a_place_moved_to_the_end(journal):
+    journal_utils.save_places_to_journal(
+        journal, [place("a", "2026-01-01"), place("b", "2026-01-01")]
+    )
+    a, b = (p["journal_place_doc_id"] for p in journal_utils.fetch_journal_places(journal, "2026-01-01"))
+    assert journal_utils.move_journal_place(journal, a, after_doc_id=b)
+
+    journal_utils.save_places_to_journal(journal, [place("c", "2026-01-01")])
+
+    assert day_names(journal, "2026-01-01") == ["b", "a", "c"]
+
+
+def test_added_place_goes_after_places_without_a_rank(db, journal):
+    places = db.collection("travelJournals").document(journal).collection("journalPlaces")
+    for order, name in enumerate(["old1", "old2"]):
+        db.collection("places").document(name).set({"name": name})
+        places.document(name).set({
+            "placeRef": db.collection("places").document(name),
+            "name": name,
+            "date": "2026-01-01",
+            "order": order,
+        })
+
+    journal_utils.save_places_to_journal(journal, [place("new", "2026-01-01")])
+
+    assert day_names(journal, "2026-01-01") == ["old1", "old2", "new"]
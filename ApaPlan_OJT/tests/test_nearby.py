@@ -0,0 +1,82 @@
+import time
+
+import pytest
+from firebase_admin import firestore
+
+from src.shared import geo_index
+
+AUTH = {"Authorization": "Bearer token-user000000"}
+
+
+def reset_index():
+    with geo_index._index_lock:
+        geo_index._index = None
+        geo_index._rebuilding = False
+        geo_index._build_started_at = None
+
+
+@pytest.fixture
+def client(server):
+    reset_index()
+    yield server.test_client()
+    reset_index()
+
+
+@pytest.fixture
+def seeded_place(server):
+    for doc in firestore.client().collection("places").stream():
+        coordinates = doc.to_dict().get("coordinates")
+        if coordinates is not None:
+            return doc.id, coordinates.latitude, coordinates.longitude
+    raise AssertionError("no seeded place has coordinates")
+
+
+def nearby(client, lat, lng, headers=AUTH, **params):
+    query = {"lat": lat, "lng": lng, "radius_km": 5, **params}
+    return client.get("/api/places/nearby", query_string=query, headers=headers)
+
+
+def wait_for_index():
+    deadline = time.monotonic() + 10
+    while geo_index._index is None:
+        assert time.monotonic() < deadline, "the place index was not built"
+        time.sleep(0.01)
+
+
+def test_nearby_requires_a_valid_id_token(client, seeded_place):
+    _, lat, lng = seeded_place
+
+    assert nearby(client, lat, lng, headers={}).status_code == 401
+    assert nearby(client, lat, lng, headers={"Authorization": "Bearer nope"}).status_code == 401
+    response = client.get("/api/journals/nearby", query_string={"lat": lat, "lng": lng})
+    assert response.status_code == 401
+
+
+def test_radius_is_capped(client, seeded_place):
+    _, lat, lng = seeded_place
+
+    assert nearby(client, lat, lng, radius_km=1000).status_code == 400
+
+
+def test_index_is_built_in_the_background(client, seeded_place):
+    place_id, lat, lng = seeded_place
+
+    response = nearby(client, lat, lng)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"]
+
+    wait_for_index()
+    response = nearby(client, lat, lng)
+    assert response.status_code == 200
+    assert place_id in [place["place_id"] for place in response.get_json()]
+
+
+def test_limit_is_capped(client, seeded_place):
+    _, lat, lng = seeded_place
+    nearby(client, lat, lng)
+    wait_for_index()
+
+    response = nearby(client, lat, lng, radius_km=100, limit=100000)
+
+    assert response.status_code == 200
+    assert len(response.get_json()) == 100
@@ -0,0 +1,74 @@
+import time
+
+import pytest
+from firebase_admin import firestore
+
+from src.shared import search_index
+
+
+def reset_index():
+    with search_index._index_lock:
+        search_index._index.replace_all({})
+        search_index._index_ready = False
+        search_index._rebuilding = False
+        search_index._build_started_at = None
+
+
+@pytest.fixture
+def fresh_index(server, monkeypatch):
+    # Always build from the seeded Firestore, never from or into a snapshot
+    monkeypatch.setattr(search_index._index, "load", lambda *args, **kwargs: False)
+    monkeypatch.setattr(search_index._index, "schedule_snapshot", lambda: None)
+    reset_index()
+    yield
+    reset_index()
+
+
+@pytest.fixture
+def public_journal(server):
+    query = firestore.client().collection("travelJournals").where("status", "==", "public")
+    for doc in query.stream():
+        title = doc.to_dict().get("title")
+        if title:
+            return doc.id, title
+    raise AssertionError("no seeded public journal has a title")
+
+
+def wait_for_index():
+    deadline = time.monotonic() + 10
+    while not search_index._index_ready:
+        assert time.monotonic() < deadline, "the search index was not built"
+        time.sleep(0.01)
+
+
+def test_index_is_built_in_the_background(fresh_index, public_journal):
+    journal_id, title = public_journal
+
+    assert search_index.search_journals(title) == []
+
+    wait_for_index()
+    assert journal_id in [result["id"] for result in search_index.search_journals(title)]
+    assert not search_index._rebuilding
+
+
+def test_failed_build_is_retried_later(fresh_index, public_journal, monkeypatch):
+    _, title = public_journal
+    real_build = search_index.build_from_firestore
+    monkeypatch.setattr(search_index, "build_from_firestore", lambda: 1 / 0)
+
+    search_index.get_search_index()
+    deadline = time.monotonic() + 10
+    while search_index._rebuilding:
+        assert time.monotonic() < deadline, "the failed build did not finish"
+        time.sleep(0.01)
+    assert not search_index._index_ready
+
+    monkeypatch.setattr(search_index, "build_from_firestore", real_build)
+    search_index.get_search_index()
+    assert not search_index._rebuilding  # not retried before SEARCH_INDEX_RETRY_S
+
+    monkeypatch.setattr(search_index, "SEARCH_INDEX_RETRY_S", 0)
+    time.sleep(0.01)
+    search_index.get_search_index()
+    wait_for_index()
+    assert search_index.search_journals(title)
@@ -0,0 +1,88 @@
+from datetime import datetime, timezone
+
+import pytest
+from google.cloud.firestore_v1._helpers import GeoPoint
+
+from src.shared import shared_cache
+from src.shared.models import Place
+from src.shared.shared_cache import MemoryBackend, RedisBackend, TwoLevelCache
+
+
+def memory_backend():
+    return MemoryBackend()
+
+
+def redis_backend():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")  # fakeredis runs Lua scripts with it
+    return RedisBackend(fakeredis.FakeRedis())
+
+
+@pytest.fixture(params=[memory_backend, redis_backend])
+def backend(request):
+    backend = request.param()
+    shared_cache.configure(backend)
+    yield backend
+    shared_cache.configure(None)
+
+
+def two_workers(name):
+    """Two caches with the same name over one shared tier, as in two workers."""
+    first = TwoLevelCache(name, maxsize=10, ttl=60)
+    second = TwoLevelCache(name, maxsize=10, ttl=60)
+    return first, second
+
+
+def test_load_overlapping_an_invalidation_elsewhere_is_not_shared(backend):
+    first, second = two_workers("race")
+
+    def load_many(keys):
+        # Another worker writes and invalidates while this load is reading
+        second.invalidate("k")
+        return {"k": "old"}
+
+    assert first.get_many_or_load(["k"], load_many) == {"k": "old"}
+
+    assert second.get("k") is None
+    assert second.get_or_load("k", lambda: "new") == "new"
+    first.clear()
+    assert first.get("k") == "new"
+
+
+def test_load_is_shared_when_nothing_changed(backend):
+    first, second = two_workers("shared")
+    second.invalidate("k")  # an older invalidation does not block later loads
+
+    first.get_or_load("k", lambda: "value")
+
+    assert second.get("k") == "value"
+
+
+def test_firestore_values_round_trip(backend):
+    first, second = two_workers("places")
+    created = datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    place = Place.from_dict("abc", {
+        "name": "Cafe",
+        "coordinates": GeoPoint(3.1, 101.6),
+        "created_at": created,
+        "opening_hours": {"mon": ["09:00", "17:00"]},
+    })
+
+    first.set_many({"places/abc": place, "profile": {"joined": created}})
+
+    shared = second.get("places/abc")
+    assert isinstance(shared, Place)
+    assert shared.id == "abc"
+    assert shared["coordinates"] == GeoPoint(3.1, 101.6)
+    assert shared["created_at"] == created
+    assert shared["opening_hours"] == {"mon": ["09:00", "17:00"]}
+    assert second.get("profile") == {"joined": created}
+
+
+def test_values_that_cannot_be_encoded_stay_local(backend):
+    first, second = two_workers("local")
+
+    first.set("k", object())
+
+    assert first.get("k") is not None
+    assert second.get("k") is None
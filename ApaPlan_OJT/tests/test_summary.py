@@ -0,0 +1,55 @@
+import pytest
+
+from src.shared import journal_utils
+from src.shared.summary import summarize_journal
+
+DATE = "2026-01-01"
+
+
+@pytest.fixture
+def journal(db):
+    db.collection("travelJournals").document("j1").set({
+        "user_id": "u1",
+        "title": "Trip",
+        "start_date": DATE,
+        "days": 1,
+        "revision": 0,
+    })
+    journal_utils.save_places_to_journal("j1", [
+        {"place_id": name, "name": name, "date": DATE, "category": "food"}
+        for name in ("a", "b", "c")
+    ])
+    return "j1"
+
+
+def day_places(journal_id):
+    # Summaries list a day's places once this worker has them cached
+    journal_utils.fetch_all_journal_places(journal_id)
+    return summarize_journal(journal_id)["days"][0]["places"]
+
+
+def doc_ids(journal_id):
+    return [
+        place["journal_place_doc_id"]
+        for place in journal_utils.fetch_journal_places(journal_id, DATE)
+    ]
+
+
+def test_summary_follows_a_move_within_the_day(journal):
+    assert day_places(journal) == ["a", "b", "c"]
+    a, b, c = doc_ids(journal)
+
+    assert journal_utils.move_journal_place(journal, c, before_doc_id=a)
+
+    assert day_places(journal) == ["c", "a", "b"]
+
+
+def test_summary_follows_a_rebalance(journal):
+    a, b, c = doc_ids(journal)
+    journal_utils.move_journal_place(journal, a, after_doc_id=c)
+    assert day_places(journal) == ["b", "c", "a"]
+
+    assert journal_utils.rebalance_day_ranks(journal, DATE)
+    journal_utils.move_journal_place(journal, b, after_doc_id=a)
+
+    assert day_places(journal) == ["c", "a", "b"]